@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -5,17 +6,58 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from app.routers import index, athlete_search, race_search, athlete_page, race_page, leaderboard, comparison, about, robots
-from config import RUNTIME_DATA_DIR, STATIC_BASE_URL
+from app.routers import index, athlete_search, race_search, athlete_page, race_page, leaderboard, comparison, about, robots, health
+from config import RUNTIME_DATA_DIR, STATIC_BASE_URL, PREWARM_PAGES
+from stats.cache import WARM_LOADERS, get_athlete_lookup, get_race_listing
+from stats.generation import GenerationWatcher, pinned_generation
+from app.response_cache import cache_response
 
 BASE_DIR = Path(__file__).resolve().parent.parent # Project root
 
-app = FastAPI()
+def prewarm_pages() -> None:
+    """ Load the PREWARM_PAGES top rated athletes and most recent races into the page routers' caches """
+    if PREWARM_PAGES <= 0:
+        return
+
+    # A page that can't be loaded is left to fail on request as usual rather than failing the generation
+    loads = [(athlete_page.load_athlete_cached, int(athlete_id)) for athlete_id in get_athlete_lookup().index[:PREWARM_PAGES]]
+    loads += [(race_page.load_race_cached, race["race_id"]) for race in get_race_listing()[:PREWARM_PAGES]]
+    failed = 0
+    for load, object_id in loads:
+        try:
+            load(object_id)
+        except Exception:
+            failed += 1
+    print(f"Pre-warmed {len(loads) - failed} athlete and race pages ({failed} failed)")
+
+# Also warmed up by the gunicorn master before forking workers, see gunicorn.conf.py
+watcher = GenerationWatcher([*WARM_LOADERS, prewarm_pages])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load everything in the background while accepting traffic (/ready reports when done), a no-op
+    # if the data was preloaded before fork. Then pick up rebuilt data without a restart, see stats/generation.py
+    watcher.start()
+    yield
+    watcher.stop()
+
+app = FastAPI(lifespan = lifespan)
+app.state.watcher = watcher
 app.mount("/static", StaticFiles(directory = BASE_DIR / "static"), name = "static")
 app.mount("/data", StaticFiles(directory = RUNTIME_DATA_DIR), name = "data")
 templates = Jinja2Templates(directory = BASE_DIR / "templates")
 templates.env.globals["STATIC_BASE_URL"] = STATIC_BASE_URL
 
+# Serve data-derived pages from a per-generation response cache with ETags, see app/response_cache.py.
+# Added first so it runs inside the generation pin below (the last middleware added runs outermost)
+app.middleware("http")(cache_response)
+
+# Serve each request from a single data generation even if a new one is swapped in meanwhile
+@app.middleware("http")
+async def pin_data_generation(request: Request, call_next):
+    with pinned_generation():
+        return await call_next(request)
+
 # Render HTTP errors with a shared template
 @app.exception_handler(StarletteHTTPException)
 async def http_error_handler(request: Request, exc: StarletteHTTPException):
@@ -55,6 +97,7 @@ app.include_router(leaderboard.router)
 app.include_router(comparison.router)
 app.include_router(about.router)
 app.include_router(robots.router)
+app.include_router(health.router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+import re
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from config import RESPONSE_CACHE_MB
+from stats.generation import Generation, active_generation, generation_cached
+
+"""
+Rendered pages that only depend on the data (athlete, race and comparison pages) are cached per data
+generation, so a new generation starts with an empty cache. Responses carry an ETag and Last-Modified
+(when the data was published) so browsers and CDNs revalidate with a 304 instead of downloading, and a
+cached page is served without running the route at all.
+
+As the pages only change with the data, the ETag is a hash of the data version and the URL. A
+revalidation is answered before looking at the cache, so it never renders the page even if the page
+has been evicted. Without a data version the ETag falls back to a hash of the body.
+"""
+
+CACHED_PATHS = re.compile(r"^/(athlete/\d+|race/\d+|compare/\d+/\d+)$")
+
+# Set by the middleware on every response, not replayed from the cache
+OWN_HEADERS = {b"content-length", b"etag", b"last-modified", b"cache-control"}
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: List[Tuple[bytes, bytes]] # Raw headers of the rendered response, without OWN_HEADERS
+
+class ResponseCache:
+    """ LRU cache of rendered responses bounded by total body size """
+    def __init__(self, max_bytes: int):
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self.entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: CachedResponse) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.body)
+            self.entries[key] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last = False)
+                self.size -= len(evicted.body)
+
+@generation_cached
+def get_response_cache() -> ResponseCache:
+    return ResponseCache(RESPONSE_CACHE_MB * 2**20)
+
+def make_etag(data: bytes) -> str:
+    return f'"{hashlib.blake2b(data, digest_size = 16).hexdigest()}"'
+
+def make_generation_etag(generation: Generation, key: tuple) -> Optional[str]:
+    """ ETag of the page at key for this data generation, None if the data has no version """
+    if generation.version is None:
+        return None
+    return make_etag(repr((generation.version, key)).encode())
+
+def is_not_modified(request: Request, etag: str, generation: Generation) -> bool:
+    """ Conditional GET, If-None-Match takes precedence over If-Modified-Since (RFC 9110) """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, so a W/ prefix added by a proxy still matches
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and generation.modified is not None:
+        try:
+            return int(generation.modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def cache_response(request: Request, call_next) -> Response:
+    """ Middleware serving CACHED_PATHS from the response cache of the request's data generation """
+    if request.method != "GET" or not CACHED_PATHS.match(request.url.path):
+        return await call_next(request)
+
+    generation = active_generation()
+    cache = get_response_cache()
+    # Host is part of the key as pages contain absolute URLs (url_for)
+    key = (request.url.scheme, request.url.netloc, request.url.path, tuple(sorted(request.query_params.multi_items())))
+
+    headers = {"Cache-Control": "no-cache"}
+    if generation.modified is not None:
+        headers["Last-Modified"] = formatdate(generation.modified, usegmt = True)
+
+    # Revalidation of a page from this generation, nothing to render or look up
+    etag = make_generation_etag(generation, key)
+    if etag is not None and is_not_modified(request, etag, generation):
+        return Response(status_code = 304, headers = {**headers, "ETag": etag})
+
+    entry = cache.get(key)
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        replayed = [(name, value) for name, value in response.raw_headers if name.lower() not in OWN_HEADERS]
+        entry = CachedResponse(body, etag or make_etag(body), replayed)
+        cache.put(key, entry)
+
+    headers["ETag"] = entry.etag
+    if is_not_modified(request, entry.etag, generation):
+        return Response(status_code = 304, headers = headers)
+
+    response = Response(content = entry.body, headers = headers)
+    response.raw_headers.extend(entry.headers)
+    return response
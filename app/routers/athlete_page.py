@@ -1,15 +1,12 @@
-import pickle
-from functools import lru_cache
 from typing import List, Tuple
 from collections import OrderedDict
-import pandas as pd
+import math
 import time
-import numpy as np
 
 from stats.athlete import Athlete
-from stats.cache import get_race_lookup
-
-from config import RUNTIME_ATHLETES_DIR
+from stats.athlete_charts import AthleteChartSeries, make_chart_series
+from stats.cache import get_race_lookup, get_athlete_store, get_athlete_charts
+from stats.generation import generation_cached
 
 from app.routers.router_utils import format_time, format_time_behind, format_rating_change, format_1yr_rating_change
 
@@ -22,29 +19,19 @@ templates = Jinja2Templates(directory = "templates")
 templates.env.globals["STATIC_BASE_URL"] = STATIC_BASE_URL
 router = APIRouter()
 
-class RenameUnpickler(pickle.Unpickler):
-    def find_class(self, module, name):
-        # Redirect old module references to the correct one
-        if module == 'athlete':
-            module = 'stats.athlete'
-        return super().find_class(module, name)
-    
 def load_athlete(athlete_id: int) -> Athlete:
-    """ Load athlete data from pickle file """
-    file_path = RUNTIME_ATHLETES_DIR / f"{athlete_id}.pkl"
-    
-    if not file_path.exists():
-        # TODO: Add 404 page
-        raise HTTPException(status_code = 404, detail = f"Athlete {athlete_id} not found")
-    
+    """ Load athlete data from the athlete store """
     try:
-        with open(file_path, 'rb') as f:
-            return RenameUnpickler(f).load()
-            
+        athlete = get_athlete_store().get(athlete_id)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Error loading athlete data: {str(e)}")
+    
+    if athlete is None:
+        # TODO: Add 404 page
+        raise HTTPException(status_code = 404, detail = f"Athlete {athlete_id} not found")
+    return athlete
 
-@lru_cache(maxsize=32)
+@generation_cached(maxsize = 32)
 def load_athlete_cached(athlete_id: int) -> Athlete:
     return load_athlete(athlete_id)
 
@@ -260,19 +247,11 @@ def get_rating_history(athlete: Athlete, race_lookup: dict) -> List[dict]:
         
     return formatted_ratings
 
-def get_pct_behind_leaders_chart(athlete: Athlete, race_lookup: dict) -> dict:
-    times_df: pd.DataFrame = athlete.get_times_df()
-    
-    dates = times_df['race_date'].dt.strftime('%Y-%m-%d').tolist()
-    race_ids = times_df['race_id'].tolist()
-    race_names = [
-        race_lookup.get(race_id, ['', ''])[1] for race_id in race_ids
-    ]
+def get_pct_behind_leaders_chart(series: AthleteChartSeries) -> dict:
+    dates = series.result_dates
+    race_names = series.result_race_names
     
-    overall_pcts = times_df['overall_pct_behind'].astype(float).replace({np.nan: None}).tolist()
-    swim_pcts = times_df['swim_pct_behind'].astype(float).replace({np.nan: None}).tolist()
-    bike_pcts = times_df['bike_pct_behind'].astype(float).replace({np.nan: None}).tolist()
-    run_pcts = times_df['run_pct_behind'].astype(float).replace({np.nan: None}).tolist()
+    overall_pcts, swim_pcts, bike_pcts, run_pcts = series.pct_behind.T.tolist()
     
     return {
         "overall": {
@@ -280,9 +259,9 @@ def get_pct_behind_leaders_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 {
                     "label": "Overall % Behind Leader",
                     "data": [
-                        {"x": date, "y": round(pct * 100, 1), "race_name": race_name}
+                        {"x": date, "y": round(pct, 1), "race_name": race_name}
                         for date, pct, race_name in zip(dates, overall_pcts, race_names)
-                        if pct is not None
+                        if not math.isnan(pct)
                     ],
                     "borderColor": "#4CAF50",
                     "backgroundColor": "rgba(76, 175, 80, 0.1)",
@@ -296,9 +275,9 @@ def get_pct_behind_leaders_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 {
                     "label": "Swim % Behind Leader",
                     "data": [
-                    {"x": date, "y": round(pct * 100, 1), "race_name": race_name}
+                    {"x": date, "y": round(pct, 1), "race_name": race_name}
                     for date, pct, race_name in zip(dates, swim_pcts, race_names)
-                    if pct is not None
+                    if not math.isnan(pct)
                 ],
                 "borderColor": "#357ABD",
                 "backgroundColor": "rgba(53, 122, 189, 0.1)",
@@ -312,9 +291,9 @@ def get_pct_behind_leaders_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 {
                     "label": "Bike % Behind Leader",
                 "data": [
-                    {"x": date, "y": round(pct * 100, 1), "race_name": race_name}
+                    {"x": date, "y": round(pct, 1), "race_name": race_name}
                     for date, pct, race_name in zip(dates, bike_pcts, race_names)
-                    if pct is not None
+                    if not math.isnan(pct)
                 ],
                 "borderColor": "#FF9800",
                 "backgroundColor": "rgba(255, 152, 0, 0.1)",
@@ -328,9 +307,9 @@ def get_pct_behind_leaders_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 {
                     "label": "Run % Behind Leader",
                     "data": [
-                    {"x": date, "y": round(pct * 100, 1), "race_name": race_name}
+                    {"x": date, "y": round(pct, 1), "race_name": race_name}
                     for date, pct, race_name in zip(dates, run_pcts, race_names)
-                    if pct is not None
+                    if not math.isnan(pct)
                 ],
                 "borderColor": "#4CAF50",
                 "backgroundColor": "rgba(76, 175, 80, 0.1)",
@@ -341,19 +320,12 @@ def get_pct_behind_leaders_chart(athlete: Athlete, race_lookup: dict) -> dict:
         }
     }
 
-def get_splits_chart(athlete: Athlete, race_lookup: dict) -> dict:
-    times_df: pd.DataFrame = athlete.get_times_df()
-    
-    # Prepare date strings and race names once
-    dates = times_df['race_date'].dt.strftime('%Y-%m-%d').tolist()
-    race_ids = times_df['race_id'].tolist()
-    race_names = [
-        race_lookup.get(race_id, ['', ''])[1] for race_id in race_ids
-    ]
+def get_splits_chart(series: AthleteChartSeries) -> dict:
+    dates = series.result_dates
+    race_names = series.result_race_names
     
-    swim_times = times_df['swim_s'].astype(int).tolist()
-    bike_times = times_df['bike_s'].astype(int).tolist()
-    run_times = times_df['run_s'].astype(int).tolist()
+    # Splits are float32, round so fractional seconds don't carry float32 noise into the JSON
+    swim_times, bike_times, run_times = series.splits.T.astype(float).round(1).tolist()
     
     return {
         "swim": {
@@ -442,22 +414,15 @@ def get_splits_chart(athlete: Athlete, race_lookup: dict) -> dict:
         }
     }
 
-def get_ratings_chart(athlete: Athlete, race_lookup: dict) -> dict:
+def get_ratings_chart(series: AthleteChartSeries) -> dict:
     """
     Prepare historical rating data for Chart.js.
     """
-    ratings_df: pd.DataFrame = athlete.get_ratings_df()
-
-    # Get race IDs and look up race names
-    race_ids = ratings_df['race_id'].tolist()
-    race_names = [
-        race_lookup.get(rid, ['', ''])[1] for rid in race_ids
-    ]
-    # Ensure race_date is a datetime series before using .dt accessor
-    # TODO: Check, this was being weird
-    if not pd.api.types.is_datetime64_any_dtype(ratings_df['race_date']):
-        ratings_df['race_date'] = pd.to_datetime(ratings_df['race_date'], errors='coerce')
-    race_dates = ratings_df['race_date'].dt.strftime('%Y-%m-%d').tolist()
+    race_dates = series.rating_dates
+    race_names = series.rating_race_names
+    overall_ratings, swim_ratings, bike_ratings, run_ratings, transition_ratings = (
+        series.ratings.astype(int).T.tolist()
+    )
     
     return {
         "datasets": [
@@ -465,11 +430,7 @@ def get_ratings_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 "label": "Overall Rating",
                 "data": [
                     {"x": date, "y": rating, "race_name": race_name}
-                    for date, rating, race_name in zip(
-                        race_dates,
-                        ratings_df['overall_rating'].astype(int),
-                        race_names
-                    )
+                    for date, rating, race_name in zip(race_dates, overall_ratings, race_names)
                 ],
                 "borderColor": "#357ABD",
                 "backgroundColor": "rgba(53, 122, 189, 0.1)",
@@ -480,11 +441,7 @@ def get_ratings_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 "label": "Swim Rating",
                 "data": [
                     {"x": date, "y": rating, "race_name": race_name}
-                    for date, rating, race_name in zip(
-                        race_dates,
-                        ratings_df['swim_rating'].astype(int),
-                        race_names
-                    )
+                    for date, rating, race_name in zip(race_dates, swim_ratings, race_names)
                 ],
                 "borderColor": "#4CAF50",
                 "backgroundColor": "rgba(76, 175, 80, 0.1)",
@@ -495,11 +452,7 @@ def get_ratings_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 "label": "Bike Rating",
                 "data": [
                     {"x": date, "y": rating, "race_name": race_name}
-                    for date, rating, race_name in zip(
-                        race_dates,
-                        ratings_df['bike_rating'].astype(int),
-                        race_names
-                    )
+                    for date, rating, race_name in zip(race_dates, bike_ratings, race_names)
                 ],
                 "borderColor": "#FF9800",
                 "backgroundColor": "rgba(255, 152, 0, 0.1)",
@@ -510,11 +463,7 @@ def get_ratings_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 "label": "Run Rating",
                 "data": [
                     {"x": date, "y": rating, "race_name": race_name}
-                    for date, rating, race_name in zip(
-                        race_dates,
-                        ratings_df['run_rating'].astype(int),
-                        race_names
-                    )
+                    for date, rating, race_name in zip(race_dates, run_ratings, race_names)
                 ],
                 "borderColor": "#E91E63",
                 "backgroundColor": "rgba(233, 30, 99, 0.1)",
@@ -525,11 +474,7 @@ def get_ratings_chart(athlete: Athlete, race_lookup: dict) -> dict:
                 "label": "Transition Rating",
                 "data": [
                     {"x": date, "y": rating, "race_name": race_name}
-                    for date, rating, race_name in zip(
-                        race_dates,
-                        ratings_df['transition_rating'].astype(int),
-                        race_names
-                    )
+                    for date, rating, race_name in zip(race_dates, transition_ratings, race_names)
                 ],
                 "borderColor": "#9C27B0",
                 "backgroundColor": "rgba(156, 39, 176, 0.1)",
@@ -558,12 +503,16 @@ async def get_athlete(request: Request, athlete_id: int):
     rating_peaks = get_best_ratings(athlete, race_lookup)
     best_performances = get_best_performances(athlete, race_lookup)
 
-    # Get jsons for rating and times charts
-    ratings_chart = get_ratings_chart(athlete, race_lookup)
-    splits_chart = get_splits_chart(athlete, race_lookup)
+    # Get jsons for rating and times charts from the series precomputed by stats/elo.py
+    chart_series = get_athlete_charts().get(athlete_id)
+    if chart_series is None:
+        print(f"No stored chart series for athlete {athlete_id}, building from the athlete record")
+        chart_series = make_chart_series(athlete, race_lookup)
+    ratings_chart = get_ratings_chart(chart_series)
+    splits_chart = get_splits_chart(chart_series)
     
     # Pct behind leader chart
-    pct_behind_leaders_chart = get_pct_behind_leaders_chart(athlete, race_lookup)
+    pct_behind_leaders_chart = get_pct_behind_leaders_chart(chart_series)
 
     # Format race splits and ratings for display
     race_history = get_race_history(athlete, race_lookup)
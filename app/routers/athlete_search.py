@@ -10,6 +10,8 @@ router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 templates.env.globals["STATIC_BASE_URL"] = STATIC_BASE_URL
 
+SEARCH_LIMIT = 50 # Results returned per search, best rated first
+
 def _get_podium(df: pd.DataFrame):
     if "overall_rank" in df.columns:
         df = df.sort_values("overall_rank")
@@ -44,9 +46,10 @@ async def search_athletes(q: str = ""):
         
         query = q.strip().lower()
 
-        # Get athlete lookup, lookup is pre-sorted by overall rating
+        # Top matches from the name index, positions follow the lookup's rating order
         athlete_lookup: pd.DataFrame = cache.get_athlete_lookup()
-        matches = athlete_lookup[athlete_lookup["name"].str.contains(query, case = False)]
+        positions = cache.get_athlete_name_index().search(query, SEARCH_LIMIT)
+        matches = athlete_lookup.iloc[positions]
 
         results = [
             {
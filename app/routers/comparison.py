@@ -1,18 +1,15 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Query, Request, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from config import STATIC_BASE_URL
 
 from stats import cache
 from stats.athlete import Athlete, RaceResult
+from stats.generation import generation_cached
 from app.routers import router_utils
 
-from config import RUNTIME_ATHLETES_DIR
-
 from app.routers.router_utils import format_1yr_rating_change, format_rating
 
-import pickle
-from functools import lru_cache
 from typing import Dict, List
 import pandas as pd
 
@@ -20,28 +17,21 @@ router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 templates.env.globals["STATIC_BASE_URL"] = STATIC_BASE_URL
 
-class RenameUnpickler(pickle.Unpickler):
-    def find_class(self, module, name):
-        # Redirect old module references to the correct one
-        if module == 'athlete':
-            module = 'stats.athlete'
-        return super().find_class(module, name)
-    
+SEARCH_LIMIT = 50 # Results returned per search, best rated first
+RIVALS_LIMIT = 50 # Most rivals returned by /compare/rivals
+
 def load_athlete(athlete_id: int) -> Athlete:
-    """ Load athlete data from pickle file """
-    file_path = RUNTIME_ATHLETES_DIR / f"{athlete_id}.pkl"
-    
-    if not file_path.exists():
-        raise HTTPException(status_code = 404, detail = f"Athlete {athlete_id} not found")
-    
+    """ Load athlete data from the athlete store """
     try:
-        with open(file_path, 'rb') as f:
-            return RenameUnpickler(f).load()
-            
+        athlete = cache.get_athlete_store().get(athlete_id)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Error loading athlete data: {str(e)}")
+    
+    if athlete is None:
+        raise HTTPException(status_code = 404, detail = f"Athlete {athlete_id} not found")
+    return athlete
 
-@lru_cache(maxsize=32)
+@generation_cached(maxsize = 32)
 def load_athlete_cached(athlete_id: int) -> Athlete:
     return load_athlete(athlete_id)
 
@@ -122,9 +112,10 @@ async def search_athletes_for_compare(q: str = ""):
         
         query: str = q.strip().lower()
 
-        # Get athlete lookup, pre-sorted by overall rating
+        # Top matches from the name index, positions follow the lookup's rating order
         athlete_lookup: pd.DataFrame = cache.get_athlete_lookup()
-        matches = athlete_lookup[athlete_lookup["name"].str.contains(query, case = False)]
+        positions = cache.get_athlete_name_index().search(query, SEARCH_LIMIT)
+        matches = athlete_lookup.iloc[positions]
 
         # Search through athletes
         results = [
@@ -163,6 +154,31 @@ async def get_athlete_for_compare(athlete_id: int):
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+@router.get("/compare/rivals/{athlete_id}")
+async def get_rivals(athlete_id: int, limit: int = Query(10, ge = 1, le = RIVALS_LIMIT)):
+    """ API endpoint for the athletes an athlete has raced most often, from the precomputed h2h table """
+    try:
+        rivals = cache.get_h2h_pairs().rivals(athlete_id, limit)
+        athlete_lookup: pd.DataFrame = cache.get_athlete_lookup()
+        details = athlete_lookup.reindex([rival.rival_id for rival in rivals])[["name", "country_emoji"]]
+
+        return JSONResponse([
+            {
+                "athlete_id": rival.rival_id,
+                "name": None if pd.isna(name) else name,
+                "country_emoji": None if pd.isna(country_emoji) else country_emoji,
+                "races": rival.races,
+                "wins": rival.wins,
+                "losses": rival.losses,
+                "last_race_id": rival.last_race_id,
+                "last_race_date": rival.last_date.isoformat()
+            }
+            for rival, name, country_emoji in zip(rivals, details["name"].tolist(), details["country_emoji"].tolist())
+        ])
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
 def get_basic_h2h_data(athlete: Athlete) -> Dict:
     """ Get and format basic data for athlete in h2h comparison """
     return {
@@ -179,41 +195,44 @@ def get_basic_h2h_data(athlete: Athlete) -> Dict:
         }
     }
 
+@generation_cached(maxsize = 32)
+def get_results_by_race(athlete_id: int) -> Dict[int, RaceResult]:
+    """ Athlete's results keyed by race_id, built once per loaded athlete. First result kept if repeated """
+    return {r.race_id: r for r in reversed(load_athlete_cached(athlete_id).race_results)}
+
 def get_h2h_race_results(athlete1: Athlete, athlete2: Athlete) -> List[Dict]:
-    """ Format head-to-head info for two athletes """
-    # Get race results for both
-    athlete1_results: List[RaceResult] = athlete1.race_results
-    athlete2_results: List[RaceResult] = athlete2.race_results
-    
-    # Find head-to-head races (races where both competed)
-    athlete1_race_ids = {r.race_id for r in athlete1_results}
-    athlete2_race_ids = {r.race_id for r in athlete2_results}
-    common_race_ids = athlete1_race_ids & athlete2_race_ids
+    """ Format head-to-head info for two athletes, race by race """
+    # Walk the smaller career and look each race up in the other
+    athlete1_results = get_results_by_race(athlete1.athlete_id)
+    athlete2_results = get_results_by_race(athlete2.athlete_id)
+    swapped = len(athlete2_results) < len(athlete1_results)
+    outer, inner = (athlete2_results, athlete1_results) if swapped else (athlete1_results, athlete2_results)
 
     head_to_head = []
     race_lookup: dict = cache.get_race_lookup()
     
-    for race_id in common_race_ids:
-        r1 = next((r for r in athlete1_results if r.race_id == race_id), None)
-        r2 = next((r for r in athlete2_results if r.race_id == race_id), None)
+    for race_id, outer_result in outer.items():
+        inner_result = inner.get(race_id)
+        if inner_result is None:
+            continue
+        r1, r2 = (inner_result, outer_result) if swapped else (outer_result, inner_result)
+
+        athlete1_time, athlete2_time = format_h2h_times(r1.overall_s, r2.overall_s)
         
-        if r1 and r2:
-            athlete1_time, athlete2_time = format_h2h_times(r1.overall_s, r2.overall_s)
-            
-            # Format time diffs as strings
-            athlete1_behind, athlete2_behind = get_time_behind(r1.overall_s, r2.overall_s)
-
-            head_to_head.append({
-                "race_id": r1.race_id,
-                "race_name": race_lookup.get(race_id, ["", ""])[1],
-                "race_date": r1.race_date,
-                "athlete1_position": r1.position,
-                "athlete1_time": athlete1_time,
-                "athlete1_behind": athlete1_behind,
-                "athlete2_position": r2.position,
-                "athlete2_time": athlete2_time,
-                "athlete2_behind": athlete2_behind
-            })
+        # Format time diffs as strings
+        athlete1_behind, athlete2_behind = get_time_behind(r1.overall_s, r2.overall_s)
+
+        head_to_head.append({
+            "race_id": r1.race_id,
+            "race_name": race_lookup.get(race_id, ["", ""])[1],
+            "race_date": r1.race_date,
+            "athlete1_position": r1.position,
+            "athlete1_time": athlete1_time,
+            "athlete1_behind": athlete1_behind,
+            "athlete2_position": r2.position,
+            "athlete2_time": athlete2_time,
+            "athlete2_behind": athlete2_behind
+        })
         
     # Sort head-to-head by date (most recent first)
     head_to_head.sort(key = lambda x: x["race_date"], reverse = True)
@@ -335,7 +354,7 @@ async def get_comparison_html(request: Request, athlete1_id: int, athlete2_id: i
     Returns rendered template with comparison data.
     """
     try:
-        # Load athlete data from pickle files
+        # Load athlete data from the athlete store
         athlete1: Athlete = load_athlete_cached(athlete1_id)
         athlete2: Athlete = load_athlete_cached(athlete2_id)
         
@@ -343,16 +362,13 @@ async def get_comparison_html(request: Request, athlete1_id: int, athlete2_id: i
         athlete1_data = get_basic_h2h_data(athlete1)
         athlete2_data = get_basic_h2h_data(athlete2)
 
-        # Get head-to-head race results and calculate H2H wins
+        # H2H wins from the table precomputed by stats/elo.py, the races themselves from both careers
+        summary = cache.get_h2h_pairs().get(athlete1_id, athlete2_id)
+        if summary is not None:
+            athlete1_data["stats"]["h2h_wins"], athlete2_data["stats"]["h2h_wins"] = summary.wins, summary.losses
         head_to_head = get_h2h_race_results(athlete1, athlete2)
         head_to_head_ratings = get_h2h_ratings(athlete1, athlete2)
 
-        for race in head_to_head:
-            if race["athlete1_time"]["css_class"] == "h2h-winner":
-                athlete1_data["stats"]["h2h_wins"] += 1
-            elif race["athlete2_time"]["css_class"] == "h2h-winner":
-                athlete2_data["stats"]["h2h_wins"] += 1
-
         race_lookup = cache.get_race_lookup()
         h2h_ratings_chart = get_h2h_rating_chart(athlete1, athlete2, race_lookup)
 
@@ -375,3 +391,32 @@ async def get_comparison_html(request: Request, athlete1_id: int, athlete2_id: i
     
     except Exception as e:
         raise HTTPException(status_code = 500, detail = str(e))
+
+@router.get("/compare/{athlete1_id}/{athlete2_id}/summary")
+async def get_comparison_summary(athlete1_id: int, athlete2_id: int):
+    """ API endpoint for the head-to-head record of two athletes, without loading either """
+    try:
+        summary = cache.get_h2h_pairs().get(athlete1_id, athlete2_id)
+        if summary is None:
+            return JSONResponse({
+                "athlete1_id": athlete1_id,
+                "athlete2_id": athlete2_id,
+                "races": 0,
+                "athlete1_wins": 0,
+                "athlete2_wins": 0,
+                "last_race_id": None,
+                "last_race_date": None
+            })
+
+        return JSONResponse({
+            "athlete1_id": athlete1_id,
+            "athlete2_id": athlete2_id,
+            "races": summary.races,
+            "athlete1_wins": summary.wins,
+            "athlete2_wins": summary.losses,
+            "last_race_id": summary.last_race_id,
+            "last_race_date": summary.last_date.isoformat()
+        })
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from stats.generation import current_generation
+
+router = APIRouter()
+
+@router.get("/ready")
+async def ready(request: Request) -> JSONResponse:
+    """ 200 once a data generation has been fully loaded, 503 while warming up or if loading failed """
+    watcher = request.app.state.watcher
+    status = watcher.status()
+    if status != "ready":
+        return JSONResponse({"status": status, "generation": watcher.loading_version or watcher.failed_version}, status_code = 503)
+    return JSONResponse({"status": "ready", "generation": current_generation().version})
@@ -1,18 +1,72 @@
-import pandas as pd
-
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from fastapi import APIRouter, Query, Request
 from fastapi.templating import Jinja2Templates
 from config import STATIC_BASE_URL
 
-from stats.cache import get_male_short_leaderboard, get_female_short_leaderboard, get_country_list
+from stats.cache import get_male_short_leaderboard_index, get_female_short_leaderboard_index, get_country_list
+from stats.leaderboard_index import LeaderboardIndex, SelectionCache
+from stats.generation import generation_cached
 from app.routers.router_utils import format_rating_change
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 templates.env.globals["STATIC_BASE_URL"] = STATIC_BASE_URL
 
+PAGE_SIZE = 50
+
+@generation_cached
+def get_selection_cache() -> SelectionCache:
+    """ Filtered orderings of recent requests, so "load more" slices instead of re-filtering every page """
+    return SelectionCache(maxsize = 64, ttl = 600)
+
+def make_cursor(token: str, offset: int) -> str:
+    return f"{token}.{offset}"
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """ Token and offset from a cursor, (None, None) if missing or malformed """
+    token, _, offset = (cursor or "").partition(".")
+    if not token or not offset.isdigit():
+        return None, None
+    return token, int(offset)
+
+def get_leaderboard_athletes(gender: str, disc: str, order: str, country: str, yob_start: Optional[int], yob_end: Optional[int], active_only: bool, offset: int = 0, token: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Get 50 athletes of the filtered leaderboard starting at offset, with rank within the selection.
+    The selection is taken from the cache under token when present, otherwise computed and cached.
+
+    Returns:
+        Athletes and the cursor for the next page, None if this is the last page
+    """
+    # Load appropriate leaderboard index based on gender, all orderings are precomputed
+    if gender == "male":
+        leaderboard_index: LeaderboardIndex = get_male_short_leaderboard_index()
+    else:
+        leaderboard_index: LeaderboardIndex = get_female_short_leaderboard_index()
+
+    # Filter by active status, country ('all' for no filtering) and year of birth range along the
+    # ordering for this discipline. Hot only includes those that had a change last year
+    # The first page looks the selection up by its filters, so it is shared across visitors
+    key = (gender, disc, order, country, yob_start or None, yob_end or None, bool(active_only))
+    selection_cache = get_selection_cache()
+    token = token or selection_cache.make_token(key)
+    positions = selection_cache.get(token, key)
+    if positions is None:
+        positions = leaderboard_index.select(disc, order, country, yob_start, yob_end, active_only)
+        token = selection_cache.put(key, positions)
+
+    athletes = leaderboard_index.get_page(positions, offset, PAGE_SIZE)
+
+    if order == "hot":
+        # Format rating changes to correct strings for hot leaderboard
+        for athlete in athletes:
+            for d in ["overall", "swim", "bike", "run", "transition"]:
+                athlete[f"{d}_change"] = format_rating_change(athlete[f"{d}_change"])
+
+    next_offset = offset + PAGE_SIZE
+    next_cursor = make_cursor(token, next_offset) if next_offset < len(positions) else None
+    return athletes, next_cursor
+
 @router.get("/leaderboard/more")
 async def leaderboard_more(
     request: Request,
@@ -24,52 +78,18 @@ async def leaderboard_more(
     yob_end: int = Query(2010),
     active_only: bool = Query(False),
     offset: int = Query(0),
+    cursor: Optional[str] = Query(None)
     ):
     """
-    Load next 50 results from leaderboard
+    Load next 50 results from leaderboard. The cursor (from the previous page) points into the
+    cached selection, the filter params are used to recompute it if it has expired
     """
-    # Load appropriate leaderboard based on gender, leaderboard are pre-sorted by overall-rank
-    if gender == "male":
-        leaderboard_df: pd.DataFrame = get_male_short_leaderboard()
-    else:
-        leaderboard_df: pd.DataFrame = get_female_short_leaderboard()
-
-    # Filter by active status
-    if active_only:
-        leaderboard_df = leaderboard_df[leaderboard_df["active"]]
-    
-    # Filter by country, default value for no filtering is 'all'
-    if country != "all":
-        leaderboard_df = leaderboard_df[leaderboard_df["country_full"] == country]
-
-    # Filter by year of birth range
-    if yob_start:
-        leaderboard_df = leaderboard_df[leaderboard_df["year_of_birth"] >= yob_start]
-    if yob_end:
-        leaderboard_df = leaderboard_df[leaderboard_df["year_of_birth"] <= yob_end]
-
-    if order == "top":
-        # Order by overall rank
-        leaderboard_df.sort_values(f"{disc}_rank", inplace = True)
-    if order == "hot":
-        # Order by last year increase (for those that had a change last year) 
-        leaderboard_df = leaderboard_df[leaderboard_df[f"{disc}_change"] != 0]
-        leaderboard_df.sort_values(f"{disc}_change_rank", inplace = True)
-
-    # Add new rank numbers (may be different from global rank if selections applied) to requested chunk
-    chunk = leaderboard_df.iloc[offset:offset+50].copy()
-    chunk.loc[:, "rank"] = range(offset + 1, offset + 51)
-
-    # Convert to dict for FastAPI
-    chunk = chunk.reset_index().to_dict(orient = "records")
-
-    if order == "hot":
-        # Format rating changes to correct strings for hot leaderboard
-        for athlete in chunk:
-            for d in ["overall", "swim", "bike", "run", "transition"]:
-                athlete[f"{d}_change"] = format_rating_change(athlete[f"{d}_change"])
+    token, cursor_offset = parse_cursor(cursor)
+    if cursor_offset is not None:
+        offset = cursor_offset
+    chunk, next_cursor = get_leaderboard_athletes(gender, disc, order, country, yob_start, yob_end, active_only, offset, token)
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "partials/more_athlete_leaderboard.html",
         {
             "request": request,
@@ -77,7 +97,9 @@ async def leaderboard_more(
             "disc": disc,
             "order": order
         }
-    )        
+    )
+    response.headers["X-Next-Cursor"] = next_cursor or ""
+    return response
 
 @router.get("/leaderboard")
 async def leaderboard(
@@ -90,47 +112,7 @@ async def leaderboard(
     yob_end: Optional[int] = Query(2010, ge=1950, le=2010),
     active_only: bool = Query(False)
     ):
-    # Load appropriate leaderboard based on gender
-    if gender == "male":
-        leaderboard_df: pd.DataFrame = get_male_short_leaderboard()
-    else:
-        leaderboard_df: pd.DataFrame = get_female_short_leaderboard()
-
-    # Filter by active status
-    if active_only:
-        leaderboard_df = leaderboard_df[leaderboard_df["active"]]
-    
-    # Filter by country, default value for no filtering is 'all'
-    if country != "all":
-        leaderboard_df = leaderboard_df[leaderboard_df["country_full"] == country]
-
-    # Filter by year of birth range
-    if yob_start:
-        leaderboard_df = leaderboard_df[leaderboard_df["year_of_birth"] >= yob_start]
-    if yob_end:
-        leaderboard_df = leaderboard_df[leaderboard_df["year_of_birth"] <= yob_end]
-
-    if order == "top":
-        # Order by overall rank
-        leaderboard_df.sort_values(f"{disc}_rank", inplace = True)
-    if order == "hot":
-        # Order by last year increase (for those that had a change last year) 
-        leaderboard_df = leaderboard_df[leaderboard_df[f"{disc}_change"] != 0]
-        leaderboard_df.sort_values(f"{disc}_change_rank", inplace = True)
-
-    # Add new rank numbers (may be different from global rank if selections applied) to returned athletes
-    leaderboard_df = leaderboard_df.head(50).copy()
-    leaderboard_df.loc[:, "rank"] = range(1, len(leaderboard_df) + 1)
-
-    # Convert to dict for FastAPI
-    athletes = leaderboard_df.reset_index().to_dict(orient = "records")
- 
-    if order == "hot":
-            # Format rating changes to correct strings for hot leaderboard
-            for athlete in athletes:
-                for d in ["overall", "swim", "bike", "run", "transition"]:
-                    athlete[f"{d}_change"] = format_rating_change(athlete[f"{d}_change"])
-
+    athletes, next_cursor = get_leaderboard_athletes(gender, disc, order, country, yob_start, yob_end, active_only)
 
     return templates.TemplateResponse(
         "leaderboard.html",
@@ -138,6 +120,7 @@ async def leaderboard(
             "request": request,
             "active_page": "athletes",
             "athletes": athletes,
+            "next_cursor": next_cursor,
             "all_countries": sorted(get_country_list()),
             "gender": gender,
             "disc": disc,
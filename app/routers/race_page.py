@@ -1,15 +1,18 @@
 import pickle
-from functools import lru_cache
+from typing import Dict, List
 
-import pandas as pd
+import numpy as np
 
 from config import RUNTIME_RACES_DIR
 
-from app.routers.router_utils import format_time, format_time_behind, format_rating, format_rating_change
+from app.routers.router_utils import (
+    format_time, format_rating, format_rating_change, format_times, format_times_behind, format_ratings, format_rating_changes
+)
 
 from stats.athlete import Athlete
-from stats.race import Race
+from stats.race import Race, TIME_FIELDS, TIME_DISCIPLINES, RATING_FIELDS, RATING_DISCIPLINES
 from stats.cache import get_athlete_lookup, get_athlete_name
+from stats.generation import generation_cached
 
 from fastapi import HTTPException, Request, APIRouter
 from fastapi.responses import HTMLResponse
@@ -42,10 +45,36 @@ def load_race(race_id: int) -> Race:
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Error loading race data: {str(e)}")
     
-@lru_cache(maxsize=32)
+@generation_cached(maxsize = 32)
 def load_race_cached(race_id: int) -> Race:
     return load_race(race_id)
 
+ATHLETE_COLUMNS = ["name", "country_alpha3", "country_emoji", "year_of_birth"]
+
+def get_athlete_columns(athlete_ids: List[int], race_year: int) -> Dict[str, list]:
+    """
+    Athlete details for each id in order, joined from the athlete lookup in one go. Athletes
+    missing from the lookup are shown unnamed rather than failing the page
+    """
+    athletes = get_athlete_lookup().reindex(athlete_ids)[ATHLETE_COLUMNS]
+    year_of_birth = athletes["year_of_birth"].fillna(0).astype(int)
+    return {
+        "athlete_id": list(athlete_ids),
+        "name": athletes["name"].fillna("Unknown athlete").tolist(),
+        "country_alpha3": athletes["country_alpha3"].fillna("").tolist(),
+        "country_emoji": athletes["country_emoji"].fillna("").tolist(),
+        "year_of_birth": year_of_birth.tolist(),
+        "age": (race_year - year_of_birth).tolist()
+    }
+
+def get_columns(items: list, fields: List[str]) -> np.ndarray:
+    """ (n x len(fields)) float array of the fields of each item, None becomes NaN """
+    return np.array([[getattr(item, field) for field in fields] for item in items], dtype = float).reshape(-1, len(fields))
+
+def to_rows(columns: Dict[str, list]) -> List[dict]:
+    """ Equal length columns to a list of row dicts """
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
 def get_race_standards(race: Race) -> dict:
     """ Format race standards """
     return {
@@ -85,7 +114,8 @@ def get_time_histograms(race: Race) -> dict:
         "t2": {"background": "#673AB7", "display_name": "Transition 2"}
     }
     
-    histograms: dict = race.get_time_histograms(20) # histograms has format returned by np.histogram
+    # (counts, bin_edges) per discipline, computed when the race was processed (older pickles lack them)
+    histograms: dict = getattr(race, "time_histograms", None) or race.get_time_histograms(20)
     chart_data = {}
     
     for discipline, (counts, bin_edges) in histograms.items():
@@ -94,7 +124,7 @@ def get_time_histograms(race: Race) -> dict:
             continue
         
         # Calculate bin centers (midpoints)
-        bin_centers = [(bin_edges[i] + bin_edges[i+1]) / 2 for i in range(len(counts))]
+        bin_centers = ((bin_edges[:-1] + bin_edges[1:]) / 2).tolist()
         bin_labels = []
         for i in range(len(bin_edges) - 1):
             if round(bin_edges[i+1]) - round(bin_edges[i]) <= 1:
@@ -110,8 +140,8 @@ def get_time_histograms(race: Race) -> dict:
                 {
                     "label": discipline_details[discipline]["display_name"],
                     "data": [
-                        {"x": center, "y": int(count), "label": label}
-                        for center, count, label in zip(bin_centers, counts, bin_labels)
+                        {"x": center, "y": count, "label": label}
+                        for center, count, label in zip(bin_centers, counts.tolist(), bin_labels)
                     ],
                     "backgroundColor": discipline_details[discipline]["background"],
                     "borderWidth": 0,
@@ -135,11 +165,11 @@ def get_rating_histograms(race: Race) -> dict:
         "transition": {"background": "#9C27B0"},
     }
 
-    histograms: dict = race.get_rating_histograms(20)
+    histograms: dict = getattr(race, "rating_histograms", None) or race.get_rating_histograms(20)
     chart_data = {}
 
     for discipline, (counts, bin_edges) in histograms.items():
-        bin_centers = [(bin_edges[i] + bin_edges[i+1]) / 2 for i in range(len(counts))]
+        bin_centers = ((bin_edges[:-1] + bin_edges[1:]) / 2).tolist()
         bin_labels = []
         for i in range(len(bin_edges) - 1):
             bin_labels.append(
@@ -152,8 +182,8 @@ def get_rating_histograms(race: Race) -> dict:
                 {
                     "label": discipline.capitalize(),
                     "data": [
-                        {"x": center, "y": int(count), "label": label}
-                        for center, count, label in zip(bin_centers, counts, bin_labels)
+                        {"x": center, "y": count, "label": label}
+                        for center, count, label in zip(bin_centers, counts.tolist(), bin_labels)
                     ],
                     "backgroundColor": discipline_details[discipline]["background"],
                     "borderWidth": 0,
@@ -171,66 +201,32 @@ async def get_race(request: Request, race_id: int):
     """
     race: Race = load_race_cached(race_id)
     
-    # Build athlete data
-    athlete_lookup: pd.DataFrame = get_athlete_lookup()
-    athlete_data = {}
-    for result in race.results:
-        athlete_id = result.athlete_id
-        athlete_info = athlete_lookup.loc[athlete_id]
-        athlete_data[athlete_id] = {
-            "athlete_id": athlete_id,
-            "name": athlete_info["name"],
-            "country_alpha3": athlete_info["country_alpha3"],
-            "country_emoji": athlete_info["country_emoji"],
-            "year_of_birth": athlete_info["year_of_birth"],
-            "age": race.date.year - athlete_info["year_of_birth"]
-        }
-        
+    # Tables are built column by column, athlete details come from one join with the athlete lookup
+    positions = [result.position for result in race.results]
+    times = get_columns(race.results, TIME_FIELDS)
+    behind = get_columns(race.results, [f"{discipline}_behind_s" for discipline in TIME_DISCIPLINES])
+
     # Build splits data
-    splits_data = []
-    positions = []
-    for result in race.results:
-        positions.append(result.position)
-        athlete_id = result.athlete_id
-        splits_data.append({
-            **athlete_data[athlete_id],
-            "position": result.position,
-            "overall_s": format_time(result.overall_s),
-            "overall_behind_s": format_time_behind(result.overall_behind_s),
-            "swim_s": format_time(result.swim_s),
-            "swim_behind_s": format_time_behind(result.swim_behind_s),
-            "bike_s": format_time(result.bike_s),
-            "bike_behind_s": format_time_behind(result.bike_behind_s),
-            "run_s": format_time(result.run_s),
-            "run_behind_s": format_time_behind(result.run_behind_s),
-            "t1_s": format_time(result.t1_s),
-            "t1_behind_s": format_time_behind(result.t1_behind_s),
-            "t2_s": format_time(result.t2_s),
-            "t2_behind_s": format_time_behind(result.t2_behind_s)
-        })
+    splits_data = to_rows({
+        **get_athlete_columns([result.athlete_id for result in race.results], race.date.year),
+        "position": positions,
+        **{field: format_times(column) for field, column in zip(TIME_FIELDS, times.T)},
+        **{f"{discipline}_behind_s": format_times_behind(column) for discipline, column in zip(TIME_DISCIPLINES, behind.T)}
+    })
             
     DNF_POSITIONS = set(['dnf', 'dns', 'dq', 'lap', 'nc'])
     dnf_count = len([r for r in positions if r.strip().lower() in DNF_POSITIONS])
     finish_count = len(positions) - dnf_count
 
     # Build ratings data
-    ratings_data = []
-    for pos, rating in zip(positions, race.ratings):
-        athlete_id = rating.athlete_id
-        ratings_data.append({
-            **athlete_data[athlete_id],
-            "position": pos,
-            "overall_rating": format_rating(rating.overall_rating),
-            "swim_rating": format_rating(rating.swim_rating),
-            "bike_rating": format_rating(rating.bike_rating),
-            "run_rating": format_rating(rating.run_rating),
-            "transition_rating": format_rating(rating.transition_rating),
-            "overall_change": format_rating_change(rating.overall_change),
-            "swim_change": format_rating_change(rating.swim_change),
-            "bike_change": format_rating_change(rating.bike_change),
-            "run_change": format_rating_change(rating.run_change),
-            "transition_change": format_rating_change(rating.transition_change),
-        })
+    ratings = get_columns(race.ratings, RATING_FIELDS)
+    changes = get_columns(race.ratings, [f"{discipline}_change" for discipline in RATING_DISCIPLINES])
+    ratings_data = to_rows({
+        **get_athlete_columns([rating.athlete_id for rating in race.ratings], race.date.year),
+        "position": positions,
+        **{field: format_ratings(column) for field, column in zip(RATING_FIELDS, ratings.T)},
+        **{f"{discipline}_change": format_rating_changes(column) for discipline, column in zip(RATING_DISCIPLINES, changes.T)}
+    })
         
     race_standards: dict = get_race_standards(race)
     best_performances: dict = get_best_performances(race)
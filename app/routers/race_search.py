@@ -1,5 +1,3 @@
-from datetime import datetime
-
 from fastapi import APIRouter, Query, Request, logger
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
@@ -10,40 +8,12 @@ router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 templates.env.globals["STATIC_BASE_URL"] = STATIC_BASE_URL
 RACE_PAGE_SIZE = 30
-
-
-def _get_sorted_races():
-    """Return races sorted by most recent program date."""
-    race_lookup = cache.get_race_lookup()
-    races = []
-
-    for race_id, race_data in race_lookup.items():
-        prog_date, race_title, race_handle, race_country, prog_name = race_data
-        race_date = (
-            prog_date.to_pydatetime()
-            if hasattr(prog_date, "to_pydatetime")
-            else prog_date
-        )
-
-        races.append(
-            {
-                "race_id": race_id,
-                "race_title": race_title,
-                "race_handle": race_handle,
-                "race_country": race_country,
-                "prog_name": prog_name,
-                "race_date": race_date,
-                "race_year": race_date.year if hasattr(race_date, "year") else "",
-            }
-        )
-
-    races.sort(key=lambda r: r["race_date"], reverse=True)
-    return races
+RACE_SEARCH_LIMIT = 20
 
 @router.get("/races", response_class=HTMLResponse)
 async def races_landing(request: Request):
     """Landing page for race search"""
-    races = _get_sorted_races()
+    races = cache.get_race_listing()
     initial_chunk = races[:RACE_PAGE_SIZE]
 
     return templates.TemplateResponse(
@@ -61,7 +31,7 @@ async def races_landing(request: Request):
 @router.get("/races/more", response_class=HTMLResponse)
 async def races_more(request: Request, offset: int = Query(0, ge=0)):
     """Return the next set of races for infinite scroll style loading."""
-    races = _get_sorted_races()
+    races = cache.get_race_listing()
     chunk = races[offset:offset + RACE_PAGE_SIZE]
 
     return templates.TemplateResponse(
@@ -79,38 +49,8 @@ async def search_races(q: str = ""):
         if not q or len(q.strip()) < 2:
             return JSONResponse([])
         
-        query = q.strip().lower()
-        
-        # Get race lookup
-        race_lookup = cache.get_race_lookup()
-        
-        # Search through races
-        results = []
-        for race_id, race_data in race_lookup.items():
-            prog_date, race_title, race_handle, race_country, prog_name = race_data
-            
-            # Search in race title and program name
-            if query in race_title.lower() or query in prog_name.lower() or query in race_country.lower():
-                results.append({
-                    'race_id': race_id,
-                    'race_title': race_title,
-                    'prog_name': prog_name,
-                    'race_country': race_country,
-                    'prog_date': datetime.strftime(prog_date, "%d %B %Y"), # Convert to string for JSON serialization
-                    'date_sort': datetime.strftime(prog_date, "%Y%m%d"), # For sorting before return
-                    'race_handle': race_handle
-                })
-                
-                # Limit to 20 results
-                if len(results) >= 20:
-                    break
-        
-        # Sort by date (most recent first)
-        results.sort(key=lambda x: x['date_sort'], reverse=True)
-        
-        # Remove date_sort from results
-        for r in results:
-            r.pop('date_sort', None)
+        # Newest matching races first, exact handle/venue matches ahead of them
+        results = cache.get_race_search_index().search(q.strip(), RACE_SEARCH_LIMIT)
 
         return JSONResponse(results)
         
@@ -1,7 +1,11 @@
+from typing import List
+
+import numpy as np
+
 # Formatting functions for FastAPI routers
 def format_time(seconds: int) -> str:
     """Convert seconds to HH:MM:SS or MM:SS format.""" 
-    if seconds == 0: return ""
+    if seconds == 0 or not np.isfinite(seconds): return ""
        
     hours = int(seconds // 3600)
     mins = int((seconds % 3600) // 60)
@@ -71,4 +75,47 @@ def format_1yr_rating_change(change: float) -> dict:
     return {
         "formatted_str": f"▼{-change:.1f} last year",
         "css_class": "negative"
-    }
\ No newline at end of file
+    }
+
+# Column versions of the above for whole tables (e.g. race results), same output per value.
+# Missing values (None/NaN/inf) are formatted as empty strings
+
+def format_times(seconds) -> List[str]:
+    seconds = np.asarray(seconds, dtype = float)
+    finite = np.isfinite(seconds)
+    empty = (~finite | (seconds == 0)).tolist()
+    seconds = np.where(finite, seconds, 0)
+    hours = (seconds // 3600).astype(int).tolist()
+    mins = ((seconds % 3600) // 60).astype(int).tolist()
+    secs = (seconds % 60).astype(int).tolist()
+
+    return [
+        "" if is_empty else f"{h}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
+        for is_empty, h, m, s in zip(empty, hours, mins, secs)
+    ]
+
+def format_times_behind(seconds_behind) -> List[str]:
+    seconds_behind = np.asarray(seconds_behind, dtype = float)
+    missing = (~np.isfinite(seconds_behind)).tolist()
+    leader = (seconds_behind == 0).tolist()
+
+    return [
+        "" if is_missing else "+00:00" if is_leader else f"+{time_fmt}"
+        for is_missing, is_leader, time_fmt in zip(missing, leader, format_times(seconds_behind))
+    ]
+
+def format_ratings(ratings) -> List[float]:
+    return [round(rating, 1) for rating in np.asarray(ratings, dtype = float).tolist()]
+
+NO_DATA_CHANGE = {"formatted_str": "", "css_class": "no-data"}
+NEUTRAL_CHANGE = {"formatted_str": "", "css_class": "rating-neutral"}
+
+def format_rating_changes(changes) -> List[dict]:
+    changes = np.asarray(changes, dtype = float)
+    return [
+        NO_DATA_CHANGE if change == float('-inf')
+        else NEUTRAL_CHANGE if change == 0
+        else {"formatted_str": f"▲{change:.1f}", "css_class": "rating-increase"} if change > 0
+        else {"formatted_str": f"▼{-change:.1f}", "css_class": "rating-decrease"}
+        for change in changes.tolist()
+    ]
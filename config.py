@@ -14,15 +14,31 @@ STATIC_BASE_URL = (
 )
 
 # Runtime data (local: ./data, render: /var/data via DATA_ROOT)
-RUNTIME_ATHLETES_DIR = RUNTIME_DATA_DIR / "athletes"
 RUNTIME_RACES_DIR = RUNTIME_DATA_DIR / "races"
 RUNTIME_ATHLETE_IMAGES_DIR = RUNTIME_DATA_DIR / "athlete_imgs"
+RUNTIME_ATHLETE_IMAGES_MANIFEST_PATH = RUNTIME_DATA_DIR / "athlete_imgs_manifest.json"
 
+RUNTIME_ATHLETE_STORE_PATH = RUNTIME_DATA_DIR / "athletes.store" # All athletes in one memory-mapped file
+RUNTIME_ATHLETE_CHARTS_PATH = RUNTIME_DATA_DIR / "athletes.charts" # Athlete page chart series, see stats/athlete_charts.py
+RUNTIME_H2H_PAIRS_PATH = RUNTIME_DATA_DIR / "athletes.h2h" # Head-to-head record of every pair of rivals, see stats/h2h_pairs.py
 RUNTIME_ATHLETE_LOOKUP_PATH = RUNTIME_DATA_DIR / "athlete_lookup.pkl"
 RUNTIME_FEMALE_SHORT_LEADERBOARD_PATH = RUNTIME_DATA_DIR / "female_short_leaderboard.pkl"
 RUNTIME_MALE_SHORT_LEADERBOARD_PATH = RUNTIME_DATA_DIR / "male_short_leaderboard.pkl"
 RUNTIME_RACE_LOOKUP_PATH = RUNTIME_DATA_DIR / "race_lookup.pkl"
+RUNTIME_RACE_LISTING_PATH = RUNTIME_DATA_DIR / "race_listing.pkl" # Date-sorted races for /races, see make_race_listing
 RUNTIME_COUNTRY_LIST_PATH = RUNTIME_DATA_DIR / "countries.pkl"
+RUNTIME_MANIFEST_PATH = RUNTIME_DATA_DIR / "manifest.json" # Written last by stats/elo.py, see stats/generation.py
+
+# ELO state snapshots, used for incremental rebuilds
+RUNTIME_FEMALE_SHORT_ELO_STATE_PATH = RUNTIME_DATA_DIR / "female_short_elo_state.pkl"
+RUNTIME_MALE_SHORT_ELO_STATE_PATH = RUNTIME_DATA_DIR / "male_short_elo_state.pkl"
+RUNTIME_ELO_CHECKPOINTS_DIR = RUNTIME_DATA_DIR / "elo_checkpoints"
+RUNTIME_FEMALE_SHORT_CHECKPOINTS_DIR = RUNTIME_ELO_CHECKPOINTS_DIR / "female_short"
+RUNTIME_MALE_SHORT_CHECKPOINTS_DIR = RUNTIME_ELO_CHECKPOINTS_DIR / "male_short"
+
+# Web app warm-up, top rated athletes and most recent races loaded into the page caches on startup/reload
+PREWARM_PAGES = int(os.getenv("PTD_PREWARM_PAGES", "0"))
+RESPONSE_CACHE_MB = int(os.getenv("PTD_RESPONSE_CACHE_MB", "64")) # Rendered athlete/race/compare pages per worker
 
 # About content
 ABOUT_DIR = STATIC_DIR / "about"
@@ -0,0 +1,26 @@
+import gc
+import os
+
+"""
+Production server config, run with: gunicorn app.main:app
+
+The app and its data are loaded once in the master and shared with the forked workers
+copy-on-write, so adding workers adds little memory. Start with `gunicorn app.main:app` from the
+project root (this file is picked up automatically).
+"""
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+def when_ready(server):
+    """ Runs in the master after the app is imported and before any worker is forked """
+    from app.main import watcher
+    watcher.warm_up()
+
+    # Move everything loaded so far out of the collector's reach. Otherwise each worker's first
+    # collections write to every object header and copy the shared pages
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded data, {gc.get_freeze_count()} objects frozen")
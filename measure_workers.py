@@ -0,0 +1,109 @@
+import argparse
+import os
+from pathlib import Path
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+"""
+Start gunicorn with gunicorn.conf.py against the data in DATA_ROOT, send a mix of page requests
+and report each process's memory from /proc/<pid>/smaps_rollup (Linux only):
+
+    DATA_ROOT=/var/data python measure_workers.py --workers 4
+
+private = Private_Clean + Private_Dirty, the memory a worker doesn't share with the master. With
+preload_app and gc.freeze (see gunicorn.conf.py) it should stay small and flat as traffic grows.
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+def get_paths(count: int, seed: int = 0) -> list:
+    """ Mixed leaderboard, search and listing requests """
+    rng = random.Random(seed)
+    templates = [
+        lambda: f"/leaderboard?gender={rng.choice(['male', 'female'])}&disc={rng.choice(['overall', 'swim', 'bike', 'run'])}",
+        lambda: f"/athletes/search?q={rng.choice(['al', 'mar', 'son', 'ton'])}",
+        lambda: f"/races/search?q={rng.choice(['world', 'cup', 'series'])}",
+        lambda: f"/compare/search?q={rng.choice(['al', 'be', 'ro'])}",
+        lambda: "/athletes",
+        lambda: "/races"
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+def get_memory_mb(pid: int) -> dict:
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, *values = line.split()
+            if values and values[-1] == "kB":
+                memory[key.rstrip(":")] = int(values[0]) / 1024
+    return {
+        "rss": memory["Rss"],
+        "pss": memory["Pss"],
+        "private": memory["Private_Clean"] + memory["Private_Dirty"]
+    }
+
+def wait_until_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout = 1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{base_url}/ready not ready after {timeout}s")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description = "Measure gunicorn worker memory under load")
+    parser.add_argument("--workers", type = int, default = 4)
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--requests", type = int, default = 800)
+    parser.add_argument("--timeout", type = float, default = 300, help = "Seconds to wait for /ready")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WEB_CONCURRENCY = str(args.workers), PORT = str(args.port))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "--bind", f"127.0.0.1:{args.port}"],
+        cwd = PROJECT_ROOT, env = env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        wait_until_ready(base_url, args.timeout)
+        # /ready answers as soon as one worker is up, give the rest time to start
+        time.sleep(2)
+
+        errors = 0
+        start = time.perf_counter()
+        for path in get_paths(args.requests):
+            try:
+                with urllib.request.urlopen(base_url + path, timeout = 30) as response:
+                    response.read()
+            except OSError:
+                errors += 1
+        print(f"{args.requests} requests in {time.perf_counter() - start:.1f}s, {errors} errors")
+
+        with open(f"/proc/{server.pid}/task/{server.pid}/children") as f:
+            worker_pids = [int(pid) for pid in f.read().split()]
+
+        master = get_memory_mb(server.pid)
+        print(f"master    rss {master['rss']:7.1f}  pss {master['pss']:7.1f}  private {master['private']:7.1f} MB")
+        total_pss = 0.0
+        for pid in worker_pids:
+            worker = get_memory_mb(pid)
+            total_pss += worker["pss"]
+            print(f"worker    rss {worker['rss']:7.1f}  pss {worker['pss']:7.1f}  private {worker['private']:7.1f} MB")
+        print(f"{len(worker_pids)} workers, {total_pss:.1f} MB pss in total")
+        return 1 if errors else 0
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout = 30)
+
+if __name__ == "__main__":
+    sys.exit(main())
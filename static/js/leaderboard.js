@@ -1,12 +1,11 @@
-let leaderboardOffset = 50;
-
 function initLoadMore() {
     const loadMoreBtn = document.getElementById("loadMoreBtn");
     if (!loadMoreBtn) return;
 
     loadMoreBtn.addEventListener("click", async() => {
+        // Filters are still sent so the server can rebuild the selection if the cursor has expired
         const params = new URLSearchParams(window.location.search);
-        params.append("offset", leaderboardOffset);
+        params.set("cursor", loadMoreBtn.dataset.cursor);
 
         try {
             const res = await fetch(`/leaderboard/more?${params.toString()}`);
@@ -17,16 +16,17 @@ function initLoadMore() {
             // Append results
             container.insertAdjacentHTML("beforeend", html);
 
-            leaderboardOffset += 50;
-
-            // If less than 50 rows returned, no more athletes to load, turn off button
-            if (html.trim().length === 0) {
+            // No cursor returned when this was the last page, turn off button
+            const nextCursor = res.headers.get("X-Next-Cursor");
+            if (nextCursor) {
+                loadMoreBtn.dataset.cursor = nextCursor;
+            } else {
                 loadMoreBtn.style.display = "none";
             }
         } catch (err) {
-            console.err("Error loading more athletes", err);
+            console.error("Error loading more athletes", err);
         }
     });
 }
 
-initLoadMore();
\ No newline at end of file
+initLoadMore();
@@ -0,0 +1,107 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import multiprocessing
+import os
+from pathlib import Path
+import pickle
+import shutil
+from typing import Dict, List, Optional
+
+PICKLE_PROTOCOL = 5
+GENERATION_SEP = "-gen-"
+
+"""
+Race pickles are written as a complete generation in a staging directory, which is
+then swapped in by repointing a symlink, e.g.
+
+    data/races -> races-gen-20250101-120000-000000
+    data/races-gen-20250101-120000-000000/{race_id}.pkl
+
+Readers keep using RUNTIME_RACES_DIR / f"{race_id}.pkl" and see either the old or the new
+generation, never a half-written mix. The previous generation is kept for requests still reading it.
+"""
+
+# Objects being written, inherited by forked workers so they don't have to be sent to them
+_objects: Dict[int, object] = {}
+
+def _write_chunk(dir_path: Path, object_ids: List[int]) -> int:
+    """ Pickle one chunk of objects, run in worker processes """
+    for object_id in object_ids:
+        with open(dir_path / f"{object_id}.pkl", 'wb') as f:
+            pickle.dump(_objects[object_id], f, protocol = PICKLE_PROTOCOL)
+    return len(object_ids)
+
+def get_generation_dirs(target_dir: Path) -> List[Path]:
+    """ All generation directories for target_dir, oldest first """
+    return sorted(target_dir.parent.glob(f"{target_dir.name}{GENERATION_SEP}*"))
+
+def write_artifacts(objects: Dict[int, object], target_dir: Path, max_workers: Optional[int] = None) -> Path:
+    """
+    Write {id}.pkl for every object as a new generation of target_dir and swap it in atomically.
+
+    Args:
+        objects: Dict mapping ID to object e.g. race_id -> Race. Must contain every object
+            that should be readable afterwards, anything not included is gone in the new generation
+        target_dir: Path readers use e.g. RUNTIME_RACES_DIR, becomes a symlink to the generation
+        max_workers: Worker processes used for pickling, all CPU cores by default
+
+    Returns:
+        Path of the new generation directory
+    """
+    global _objects
+
+    target_dir.parent.mkdir(parents = True, exist_ok = True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    generation_dir = target_dir.with_name(f"{target_dir.name}{GENERATION_SEP}{stamp}")
+    staging_dir = generation_dir.with_name(f".{generation_dir.name}.staging")
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir()
+
+    # Fork so workers share the objects rather than having them pickled over to each one
+    object_ids = list(objects.keys())
+    _objects = objects
+    max_workers = max_workers or os.cpu_count() or 1
+    try:
+        if max_workers > 1 and len(object_ids) > 1 and "fork" in multiprocessing.get_all_start_methods():
+            chunk_size = max(1, -(-len(object_ids) // (max_workers * 4)))
+            chunks = [object_ids[i:i + chunk_size] for i in range(0, len(object_ids), chunk_size)]
+
+            with ProcessPoolExecutor(max_workers = max_workers, mp_context = multiprocessing.get_context("fork")) as executor:
+                futures = [executor.submit(_write_chunk, staging_dir, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    future.result()
+        else:
+            _write_chunk(staging_dir, object_ids)
+    finally:
+        _objects = {}
+
+    os.rename(staging_dir, generation_dir)
+    swap_generation(target_dir, generation_dir)
+
+    print(f"Saved {len(object_ids)} files to {target_dir} ({generation_dir.name})")
+    return generation_dir
+
+def swap_generation(target_dir: Path, generation_dir: Path) -> None:
+    """ Point target_dir at generation_dir, then remove all but the new and previous generations """
+    previous_dir = None
+    if target_dir.is_symlink():
+        previous_dir = target_dir.parent / os.readlink(target_dir)
+    elif target_dir.is_dir():
+        # Directory from before generations were used, move it aside so the link can replace it
+        previous_dir = target_dir.with_name(f"{target_dir.name}{GENERATION_SEP}legacy")
+        os.rename(target_dir, previous_dir)
+
+    # Relative link so the data directory can be moved, renamed over the old link atomically
+    tmp_link = target_dir.with_name(f".{target_dir.name}.link")
+    if tmp_link.is_symlink() or tmp_link.exists():
+        tmp_link.unlink()
+    os.symlink(generation_dir.name, tmp_link)
+    os.replace(tmp_link, target_dir)
+
+    keep = {generation_dir.resolve()}
+    if previous_dir is not None:
+        keep.add(previous_dir.resolve())
+    for old_dir in get_generation_dirs(target_dir):
+        if old_dir.resolve() not in keep:
+            shutil.rmtree(old_dir)
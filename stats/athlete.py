@@ -6,14 +6,12 @@ from dataclasses import dataclass, asdict
 
 import pandas as pd
 import pycountry
-import requests
 
 # Add the project root to Python path so local config can be imported
 root_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(root_dir))
 
 from config import (
-    RUNTIME_ATHLETE_IMAGES_DIR,
     ELITE_START_RATING,
     AG_START_RATING
 )
@@ -108,7 +106,7 @@ class Athlete:
         self.country_alpha3: str = short[0]
         self.country_emoji: str = short[1]
         self.year_of_birth: int = int(year_of_birth) # YOB is 0 of not provided
-        self.profile_img: str = profile_img # URL to profile image, empty string if no image available
+        self.profile_img: str = profile_img # URL to profile image, empty string if no image available. Downloaded by profile_images.py
         self.active: bool = True
         
         # Race stats
@@ -183,29 +181,6 @@ class Athlete:
         self.notable_results_wc: List[Tuple[int, str]] = []
         self.notable_results_cc: List[Tuple[int, str]] = []
 
-        self.try_get_profile_img()
-        
-    def try_get_profile_img(self) -> None:
-        """
-        Attempt to access and save athlete's profile image URL.
-        """
-        # TODO: Perform compress to 64 and 128 here
-        if self.profile_img:
-            path = RUNTIME_ATHLETE_IMAGES_DIR / f"{self.athlete_id}.jpg"
-            if path.exists():
-                return # Image already saved
-            
-            # Try to access the image URL
-            try:
-                response = requests.get(self.profile_img)
-                if response.status_code == 200:
-                    # Save the image or process it as needed
-                    with open(path, 'wb') as f:
-                        f.write(response.content)
-                        
-            except Exception as e:
-                print(f"Error accessing profile image: {e}")
-
     def initialise_ratings(self, prog_name: str) -> None:
         """
         Initialise athlete ratings based on program name. Elites have higher starting ratings
@@ -224,26 +199,28 @@ class Athlete:
             self.run_rating = ELITE_START_RATING
             self.transition_rating = ELITE_START_RATING
 
-    def add_result(
+    def add_race_result(
         self,
         race_id: int,
         race_date: datetime,
         race_name: str,
         position: str,
-        overall_s: int,
-        swim_s: int,
-        bike_s: int,
-        run_s: int,
-        t1_s: int,
-        t2_s: int,
         cat_ids: List[int],
-        fastest_overall_s: int,
-        fastest_swim_s: int,
-        fastest_bike_s: int,
-        fastest_run_s: int,
-        fastest_t1_s: int,
-        fastest_t2_s: int
+        times: List[float],
+        behind: List[Optional[float]],
+        pct_behind: List[Optional[float]]
     ) -> None:
+        """
+        Add a result with time/pct behind leaders already calculated for the whole race.
+        times, behind and pct_behind are each ordered [overall, swim, bike, run, t1, t2].
+        """
+        self._count_race_start(race_id, race_name, position, cat_ids)
+        self.race_results.append(RaceResult(race_id, race_date, position, *times, *behind, *pct_behind))
+
+    def _count_race_start(self, race_id: int, race_name: str, position: str, cat_ids: List[int]) -> None:
+        """
+        Update start, win, podium, DNF etc. counts and notable results for a new result
+        """
         self.race_starts += 1
 
         self._check_for_notable_result(race_id, race_name, position, cat_ids)
@@ -273,35 +250,6 @@ class Athlete:
         self.dnf_pct = self.dnf_count / self.race_starts
         self.dq_pct = self.dq_count / self.race_starts
         self.lap_pct = self.lap_count / self.race_starts
-        
-        # Calculate pct behind leaders
-        self.race_results.append(
-            RaceResult(
-                race_id = race_id, 
-                race_date = race_date, 
-                position = position, 
-                overall_s = overall_s,
-                swim_s = swim_s,
-                bike_s = bike_s,
-                run_s = run_s,
-                t1_s = t1_s,
-                t2_s = t2_s,
-                # Time behind leaders + checks in case of missing splits
-                overall_behind_s = (overall_s - fastest_overall_s) if overall_s and fastest_overall_s else None,
-                swim_behind_s = (swim_s - fastest_swim_s) if swim_s and fastest_swim_s else None,
-                bike_behind_s = (bike_s - fastest_bike_s) if bike_s and fastest_bike_s else None,
-                run_behind_s = (run_s - fastest_run_s) if run_s and fastest_run_s else None,
-                t1_behind_s = (t1_s - fastest_t1_s) if t1_s and fastest_t1_s else None,
-                t2_behind_s = (t2_s - fastest_t2_s) if t2_s and fastest_t2_s else None,
-                # Pct behind leaders + checks in case of missing splits
-                overall_pct_behind = ((overall_s - fastest_overall_s) / fastest_overall_s) if overall_s else None,
-                swim_pct_behind = ((swim_s - fastest_swim_s) / fastest_swim_s) if swim_s else None,
-                bike_pct_behind = ((bike_s - fastest_bike_s) / fastest_bike_s) if bike_s else None,
-                run_pct_behind = ((run_s - fastest_run_s) / fastest_run_s) if run_s else None,
-                t1_pct_behind = ((t1_s - fastest_t1_s) / fastest_t1_s) if t1_s else None,
-                t2_pct_behind = ((t2_s - fastest_t2_s) / fastest_t2_s) if t2_s else None,
-            )
-        )
 
     def _check_for_notable_result(self, race_id: int, race_name: str, position: str, cat_ids) -> None:
         """
@@ -451,6 +399,13 @@ class Athlete:
         """
         Calculate rating changes over the last year
         """
+        # Reset first so values from an earlier run don't linger for athletes who haven't raced since
+        self.overall_change_1yr = 0.0
+        self.swim_change_1yr = 0.0
+        self.bike_change_1yr = 0.0
+        self.run_change_1yr = 0.0
+        self.transition_change_1yr = 0.0
+        
         if not self.rating_history:
             return
         
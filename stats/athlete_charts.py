@@ -0,0 +1,173 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from stats.packed_arrays import PackedArrays, write_packed_arrays
+
+"""
+Athlete page chart series for every athlete, computed once by stats/elo.py and packed into one
+memory-mapped file (see stats/packed_arrays.py).
+
+Each array holds one column for all athletes, grouped by athlete (sorted by athlete_id) with
+offsets marking where each athlete starts. Dates are days since 1970-01-01, ratings, splits and
+% behind are float32 and race names are indices into one string table in the header. Serving a
+chart is slicing views and encoding JSON.
+"""
+
+CHARTS_MAGIC = b"PTDCHRT1"
+
+RATING_COLUMNS = ["overall_rating", "swim_rating", "bike_rating", "run_rating", "transition_rating"]
+SPLIT_COLUMNS = ["swim_s", "bike_s", "run_s"]
+PCT_BEHIND_COLUMNS = ["overall_pct_behind", "swim_pct_behind", "bike_pct_behind", "run_pct_behind"]
+
+@dataclass
+class AthleteChartSeries:
+    """ One athlete's chart points, most recent race first """
+    rating_dates: List[str] # YYYY-MM-DD
+    rating_race_names: List[str]
+    ratings: np.ndarray # (n x 5) float32 in RATING_COLUMNS order
+    result_dates: List[str]
+    result_race_names: List[str]
+    splits: np.ndarray # (n x 3) float32 seconds in SPLIT_COLUMNS order, 0 if missing
+    pct_behind: np.ndarray # (n x 4) float32 % behind the leader to 1dp in PCT_BEHIND_COLUMNS order, NaN if missing
+
+def is_missing(value) -> bool:
+    """ None, NaN or inf (an unparseable time) """
+    return value is None or not np.isfinite(value)
+
+def to_days(dates: list) -> np.ndarray:
+    return np.array(dates, dtype = "datetime64[D]").astype(np.int32)
+
+def to_date_strings(days: np.ndarray) -> List[str]:
+    return np.datetime_as_string(days.astype("datetime64[D]")).tolist()
+
+def get_race_name(race_lookup: dict, race_id: int) -> str:
+    race_title = race_lookup.get(int(race_id), ['', ''])[1]
+    return race_title if isinstance(race_title, str) else ""
+
+def get_chart_rows(athlete) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Rating rows (race_date, race_id, ratings) and result rows (race_date, race_id, splits, pct_behind)
+    of one athlete, most recent first. Missing splits are 0 and missing % behind NaN.
+    """
+    rating_rows = [
+        (rating.race_date, rating.race_id, tuple(getattr(rating, column) for column in RATING_COLUMNS))
+        for rating in athlete.rating_history[::-1]
+    ]
+
+    result_rows = []
+    for result in sorted(athlete.race_results, key = lambda x: x.race_date, reverse = True):
+        values = [getattr(result, column) for column in SPLIT_COLUMNS]
+        splits = tuple(0 if is_missing(value) else value for value in values)
+        values = [getattr(result, column) for column in PCT_BEHIND_COLUMNS]
+        pct_behind = tuple(np.nan if is_missing(value) else round(value * 100, 1) for value in values)
+        result_rows.append((result.race_date, result.race_id, splits, pct_behind))
+    return rating_rows, result_rows
+
+def make_chart_series(athlete, race_lookup: dict) -> AthleteChartSeries:
+    """ Chart series for one athlete from its record, the same as write_athlete_charts stores """
+    rating_rows, result_rows = get_chart_rows(athlete)
+    return AthleteChartSeries(
+        rating_dates = to_date_strings(to_days([row[0] for row in rating_rows])),
+        rating_race_names = [get_race_name(race_lookup, row[1]) for row in rating_rows],
+        ratings = np.array([row[2] for row in rating_rows], dtype = np.float32).reshape(-1, len(RATING_COLUMNS)),
+        result_dates = to_date_strings(to_days([row[0] for row in result_rows])),
+        result_race_names = [get_race_name(race_lookup, row[1]) for row in result_rows],
+        splits = np.array([row[2] for row in result_rows], dtype = np.float32).reshape(-1, len(SPLIT_COLUMNS)),
+        pct_behind = np.array([row[3] for row in result_rows], dtype = np.float32).reshape(-1, len(PCT_BEHIND_COLUMNS))
+    )
+
+def write_athlete_charts(athletes: Dict[int, object], race_lookup: dict, charts_path: Path) -> None:
+    """
+    Materialize chart series for all athletes, race names from race_lookup (race_id -> (prog_date,
+    race_title, ...)). Replaced atomically.
+    """
+    athlete_ids = sorted(athletes.keys())
+    names: List[str] = []
+    name_indices: Dict[str, int] = {}
+
+    def name_index(race_id: int) -> int:
+        race_title = get_race_name(race_lookup, race_id)
+        if race_title not in name_indices:
+            name_indices[race_title] = len(names)
+            names.append(race_title)
+        return name_indices[race_title]
+
+    rating_counts, rating_dates, rating_races, ratings = [], [], [], []
+    result_counts, result_dates, result_races, splits, pct_behind = [], [], [], [], []
+
+    for athlete_id in athlete_ids:
+        rating_rows, result_rows = get_chart_rows(athletes[athlete_id])
+
+        rating_counts.append(len(rating_rows))
+        for race_date, race_id, values in rating_rows:
+            rating_dates.append(race_date)
+            rating_races.append(name_index(race_id))
+            ratings.append(values)
+
+        result_counts.append(len(result_rows))
+        for race_date, race_id, split_values, pct_values in result_rows:
+            result_dates.append(race_date)
+            result_races.append(name_index(race_id))
+            splits.append(split_values)
+            pct_behind.append(pct_values)
+
+    arrays = {
+        "athlete_ids": np.array(athlete_ids, dtype = "<i8"),
+        "rating_offsets": np.concatenate([[0], np.cumsum(rating_counts, dtype = "<i8")]).astype("<i8"),
+        "rating_days": to_days(rating_dates),
+        "rating_races": np.array(rating_races, dtype = "<i4"),
+        "ratings": np.array(ratings, dtype = "<f4").reshape(-1, len(RATING_COLUMNS)),
+        "result_offsets": np.concatenate([[0], np.cumsum(result_counts, dtype = "<i8")]).astype("<i8"),
+        "result_days": to_days(result_dates),
+        "result_races": np.array(result_races, dtype = "<i4"),
+        "splits": np.array(splits, dtype = "<f4").reshape(-1, len(SPLIT_COLUMNS)),
+        "pct_behind": np.array(pct_behind, dtype = "<f4").reshape(-1, len(PCT_BEHIND_COLUMNS))
+    }
+
+    write_packed_arrays(charts_path, CHARTS_MAGIC, arrays, {"names": names})
+    print(f"Saved chart series for {len(athlete_ids)} athletes to {charts_path}")
+
+class AthleteCharts:
+    """
+    Read-only view of a chart series file, see write_athlete_charts.
+    """
+    def __init__(self, charts_path: Path):
+        self.charts_path: Path = charts_path
+        packed = PackedArrays(charts_path, CHARTS_MAGIC)
+        self.names: np.ndarray = np.array(packed.meta["names"] or [""], dtype = object)
+        self.arrays: Dict[str, np.ndarray] = packed.arrays
+        self.athlete_ids: np.ndarray = self.arrays["athlete_ids"]
+
+    def __len__(self) -> int:
+        return len(self.athlete_ids)
+
+    def __contains__(self, athlete_id: int) -> bool:
+        return self._find(athlete_id) is not None
+
+    def _find(self, athlete_id: int) -> Optional[int]:
+        i = int(np.searchsorted(self.athlete_ids, athlete_id))
+        if i < len(self.athlete_ids) and self.athlete_ids[i] == athlete_id:
+            return i
+        return None
+
+    def get(self, athlete_id: int) -> Optional[AthleteChartSeries]:
+        """ Chart series for one athlete, None if not stored """
+        i = self._find(athlete_id)
+        if i is None:
+            return None
+
+        a = self.arrays
+        ratings = slice(*a["rating_offsets"][i:i + 2].tolist())
+        results = slice(*a["result_offsets"][i:i + 2].tolist())
+        return AthleteChartSeries(
+            rating_dates = to_date_strings(a["rating_days"][ratings]),
+            rating_race_names = self.names[a["rating_races"][ratings]].tolist(),
+            ratings = a["ratings"][ratings],
+            result_dates = to_date_strings(a["result_days"][results]),
+            result_race_names = self.names[a["result_races"][results]].tolist(),
+            splits = a["splits"][results],
+            pct_behind = a["pct_behind"][results]
+        )
@@ -0,0 +1,99 @@
+import io
+import mmap
+import os
+from pathlib import Path
+import pickle
+import struct
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+"""
+All athletes packed into one file, replacing one pickle per athlete:
+
+    [pickled athlete 0][pickled athlete 1]...[ids: int64 x n][offsets: int64 x n + 1][footer]
+
+ids are sorted so a lookup is a binary search over a zero-copy view of the index, followed by
+unpickling only that athlete's bytes. The file is opened once and memory-mapped, so every worker
+shares the same page cache and there are no per-request file opens.
+"""
+
+STORE_MAGIC = b"PTDATHL1"
+FOOTER = struct.Struct("<8sQQ") # magic, athlete count, index offset
+PICKLE_PROTOCOL = 5
+
+class AthleteUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        # Athletes are pickled by stats/elo.py where the module is imported as 'athlete'
+        if module == 'athlete':
+            module = 'stats.athlete'
+        return super().find_class(module, name)
+
+def write_athlete_store(athletes: Dict[int, object], store_path: Path) -> None:
+    """
+    Pack all athletes into a single store file, replaced atomically so open readers keep
+    their (old) mapping and new readers see the complete new file.
+    """
+    athlete_ids = np.array(sorted(athletes.keys()), dtype = "<i8")
+    offsets = np.zeros(len(athlete_ids) + 1, dtype = "<i8")
+
+    store_path.parent.mkdir(parents = True, exist_ok = True)
+    tmp_path = store_path.with_suffix(store_path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        for i, athlete_id in enumerate(athlete_ids.tolist()):
+            f.write(pickle.dumps(athletes[athlete_id], protocol = PICKLE_PROTOCOL))
+            offsets[i + 1] = f.tell()
+
+        index_offset = f.tell()
+        f.write(athlete_ids.tobytes())
+        f.write(offsets.tobytes())
+        f.write(FOOTER.pack(STORE_MAGIC, len(athlete_ids), index_offset))
+    os.replace(tmp_path, store_path)
+
+    print(f"Saved {len(athlete_ids)} athletes to {store_path}")
+
+class AthleteStore:
+    """
+    Read-only view of an athlete store file, see write_athlete_store.
+    """
+    def __init__(self, store_path: Path):
+        self.store_path: Path = store_path
+        with open(store_path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+        magic, count, index_offset = FOOTER.unpack_from(self.mm, len(self.mm) - FOOTER.size)
+        if magic != STORE_MAGIC:
+            raise ValueError(f"{store_path} is not an athlete store")
+
+        # Views straight into the mapping, nothing is copied
+        self.athlete_ids: np.ndarray = np.frombuffer(self.mm, dtype = "<i8", count = count, offset = index_offset)
+        self.offsets: np.ndarray = np.frombuffer(self.mm, dtype = "<i8", count = count + 1, offset = index_offset + 8 * count)
+
+    def __len__(self) -> int:
+        return len(self.athlete_ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.athlete_ids.tolist())
+
+    def __contains__(self, athlete_id: int) -> bool:
+        return self._find(athlete_id) is not None
+
+    def _find(self, athlete_id: int) -> Optional[int]:
+        """ Position of athlete_id in the index, None if not stored """
+        i = int(np.searchsorted(self.athlete_ids, athlete_id))
+        if i < len(self.athlete_ids) and self.athlete_ids[i] == athlete_id:
+            return i
+        return None
+
+    def get(self, athlete_id: int):
+        """ Unpickle a single athlete, None if not stored """
+        i = self._find(athlete_id)
+        if i is None:
+            return None
+
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return AthleteUnpickler(io.BytesIO(self.mm[start:end])).load()
+
+    def items(self) -> Iterator:
+        for athlete_id in self:
+            yield athlete_id, self.get(athlete_id)
@@ -1,4 +1,5 @@
-from functools import lru_cache, partial
+from functools import partial
+import os
 import pickle
 
 from concurrent.futures import ProcessPoolExecutor, as_completed
@@ -11,6 +12,13 @@ from typing import List
 
 # sys.path.append(str(Path(__file__).parent.parent))
 from stats.athlete import Athlete
+from stats.athlete_charts import AthleteCharts
+from stats.athlete_store import AthleteStore
+from stats.generation import generation_cached
+from stats.h2h_pairs import H2HPairs
+from stats.leaderboard_index import LeaderboardIndex
+from stats.name_index import NameIndex
+from stats.race_index import RaceIndex
 
 from config import (
     RUNTIME_FEMALE_SHORT_LEADERBOARD_PATH,
@@ -18,67 +26,135 @@ from config import (
     FEMALE_SHORT_EVENTS_CSV_PATH,
     MALE_SHORT_EVENTS_CSV_PATH,
     RUNTIME_RACE_LOOKUP_PATH,
-    RUNTIME_ATHLETES_DIR,
+    RUNTIME_RACE_LISTING_PATH,
+    RUNTIME_ATHLETE_STORE_PATH,
+    RUNTIME_ATHLETE_CHARTS_PATH,
+    RUNTIME_H2H_PAIRS_PATH,
     RUNTIME_ATHLETE_LOOKUP_PATH,
     RUNTIME_COUNTRY_LIST_PATH
 )
 
-@lru_cache(maxsize=1)
+def use_arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store text columns as Arrow strings (one buffer plus offsets) instead of a Python object per value.
+    Forked workers then share them untouched, reading object columns writes refcounts into shared pages
+    """
+    string_cols = [
+        col for col in df.columns
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna = False) == "string"
+    ]
+    return df.astype({col: "string[pyarrow]" for col in string_cols})
+
+@generation_cached
 def get_female_short_leaderboard() -> pd.DataFrame:
     with open(RUNTIME_FEMALE_SHORT_LEADERBOARD_PATH, "rb") as f:
-        return pickle.load(f)
+        return use_arrow_strings(pickle.load(f))
     
-@lru_cache(maxsize=1)
+@generation_cached
 def get_male_short_leaderboard() -> pd.DataFrame:
     with open(RUNTIME_MALE_SHORT_LEADERBOARD_PATH, "rb") as f:
-        return pickle.load(f)
+        return use_arrow_strings(pickle.load(f))
     
-@lru_cache(maxsize=1)
+@generation_cached
+def get_female_short_leaderboard_index() -> LeaderboardIndex:
+    return LeaderboardIndex(get_female_short_leaderboard())
+
+@generation_cached
+def get_male_short_leaderboard_index() -> LeaderboardIndex:
+    return LeaderboardIndex(get_male_short_leaderboard())
+    
+@generation_cached
 def get_race_lookup():
     with open(RUNTIME_RACE_LOOKUP_PATH, "rb") as f:
         return pickle.load(f)
     
-@lru_cache(maxsize=1)
+@generation_cached
+def get_race_listing() -> List[dict]:
+    """ All races, most recent first, see make_race_listing """
+    with open(RUNTIME_RACE_LISTING_PATH, "rb") as f:
+        return pickle.load(f)
+
+@generation_cached
+def get_race_search_index() -> RaceIndex:
+    return RaceIndex(get_race_lookup())
+
+@generation_cached
 def get_athlete_lookup():
     with open(RUNTIME_ATHLETE_LOOKUP_PATH, "rb") as f:
-        return pickle.load(f)
+        return use_arrow_strings(pickle.load(f))
+
+@generation_cached
+def get_athlete_name_index() -> NameIndex:
+    return NameIndex.from_lookup(get_athlete_lookup())
+
+@generation_cached
+def get_athlete_store() -> AthleteStore:
+    return AthleteStore(RUNTIME_ATHLETE_STORE_PATH)
 
-@lru_cache(maxsize=1)
+@generation_cached
+def get_athlete_charts() -> AthleteCharts:
+    return AthleteCharts(RUNTIME_ATHLETE_CHARTS_PATH)
+
+@generation_cached
+def get_h2h_pairs() -> H2HPairs:
+    return H2HPairs(RUNTIME_H2H_PAIRS_PATH)
+
+@generation_cached
 def get_country_list():
     with open(RUNTIME_COUNTRY_LIST_PATH, "rb") as f:
         return pickle.load(f)
 
+# Loaded into a new generation before it is swapped in (see stats/generation.py), anything else loads on first use
+WARM_LOADERS = [
+    get_female_short_leaderboard_index,
+    get_male_short_leaderboard_index,
+    get_athlete_lookup,
+    get_athlete_name_index,
+    get_athlete_store,
+    get_athlete_charts,
+    get_h2h_pairs,
+    get_race_lookup,
+    get_race_search_index,
+    get_race_listing,
+    get_country_list
+]
+
 def get_athlete_name(athlete_id: int):
     lookup: pd.DataFrame = get_athlete_lookup()
     return lookup.loc[athlete_id, "name"] if athlete_id in lookup.index else None
 
-def process_single_athlete(athlete_file):
-    """ Process a single athlete file and return the lookup data. """
-    with open(athlete_file, "rb") as f:
-        athlete_data = pickle.load(f)
-        return athlete_data.athlete_id, {
+def process_athlete_chunk(athlete_ids: List[int]):
+    """ Get lookup data for a chunk of athletes from the athlete store. """
+    store = AthleteStore(RUNTIME_ATHLETE_STORE_PATH)
+    lookup_data = []
+    for athlete_id in athlete_ids:
+        athlete_data = store.get(athlete_id)
+        lookup_data.append((athlete_data.athlete_id, {
             "name": athlete_data.name,
             "rating": athlete_data.overall_rating, # Save overall rating so results can be filtered
             "country_alpha3": athlete_data.country_alpha3,
             "country_emoji": athlete_data.country_emoji,
             "country_name": athlete_data.country_full,
             "year_of_birth": athlete_data.year_of_birth,
-        }
+        }))
+    return lookup_data
     
 def make_athlete_lookup():
     """ Parallel process athlete lookup creation. """
-    athlete_files = list(RUNTIME_ATHLETES_DIR.glob("*.pkl"))
-    athlete_count = len(athlete_files)
+    athlete_ids = list(AthleteStore(RUNTIME_ATHLETE_STORE_PATH))
+    athlete_count = len(athlete_ids)
     athlete_lookup = {}
     
-    # Use all CPU cores
+    # Use all CPU cores, each worker maps the store itself
+    chunk_size = 1000
+    chunks = [athlete_ids[i:i + chunk_size] for i in range(0, athlete_count, chunk_size)]
     with ProcessPoolExecutor() as executor:
-        futures = {executor.submit(process_single_athlete, f): f for f in athlete_files}
+        futures = {executor.submit(process_athlete_chunk, chunk): chunk for chunk in chunks}
         
-        for i, future in enumerate(as_completed(futures), 1):
-            print(f"Processing athlete {i}/{athlete_count}", end="\r")
-            athlete_id, data = future.result()
-            athlete_lookup[athlete_id] = data
+        for future in as_completed(futures):
+            for athlete_id, data in future.result():
+                athlete_lookup[athlete_id] = data
+            print(f"Processing athlete {len(athlete_lookup)}/{athlete_count}", end="\r")
     
     # Convert to DataFrame for easy handling
     lookup_df: pd.DataFrame = pd.DataFrame.from_dict(athlete_lookup, orient = "index")
@@ -157,8 +233,14 @@ def process_single_race_guide(race_guide: Path):
 
     return partial_lookup
   
-def make_race_lookup(event_guides: List[Path], output_path: Path):
-    """ Parallel race lookup creation. """
+def save_pickle(obj, path: Path) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+def make_race_lookup(event_guides: List[Path], output_path: Path) -> dict:
+    """ Parallel race lookup creation. Returns the lookup """
     race_lookup = {}
 
     with ProcessPoolExecutor() as executor:
@@ -171,10 +253,42 @@ def make_race_lookup(event_guides: List[Path], output_path: Path):
             partial_lookup = future.result()
             race_lookup.update(partial_lookup)
 
-    with open(output_path, "wb") as f:
-        pickle.dump(race_lookup, f)
+    # Listing for /races saved alongside, both replaced atomically so a reader never sees a partial file
+    save_pickle(race_lookup, output_path)
+    save_pickle(make_race_listing(race_lookup), RUNTIME_RACE_LISTING_PATH)
 
     print(f"\nSaved race lookup with {len(race_lookup)} entries.")
+    return race_lookup
+
+def make_race_listing(race_lookup: dict) -> List[dict]:
+    """ Races sorted by most recent program date, formatted for the race listing pages """
+    races = []
+
+    for race_id, race_data in race_lookup.items():
+        prog_date, race_title, race_handle, race_country, prog_name = race_data
+        race_date = (
+            prog_date.to_pydatetime()
+            if hasattr(prog_date, "to_pydatetime")
+            else prog_date
+        )
+        has_date = not pd.isna(race_date)
+
+        races.append(
+            {
+                "race_id": race_id,
+                "race_title": race_title,
+                "race_handle": race_handle,
+                "race_country": race_country,
+                "prog_name": prog_name,
+                "race_date": race_date if has_date else None,
+                "race_date_str": race_date.strftime("%d %B %Y") if has_date else "",
+                "race_year": race_date.year if has_date else "",
+            }
+        )
+
+    # Races without a date last
+    races.sort(key = lambda r: (r["race_date"] is not None, r["race_date"] or 0), reverse = True)
+    return races
         
 if __name__ == "__main__":
     make_athlete_lookup()
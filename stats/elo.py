@@ -1,38 +1,68 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 import math
 import os
+import warnings
 from collections import defaultdict
 from ast import literal_eval
 import pickle
+import argparse
 from tqdm import tqdm
 
 from pathlib import Path
 
 from athlete import Athlete
-from race import Race
+from race import Race, get_behind_leaders
+from race_warnings import WarningsLog
+from time_parsing import time_to_seconds, times_to_seconds, splits_to_seconds
+from profile_images import collect_profile_images, prefetch_profile_images
+from artifacts import write_artifacts
+from athlete_store import write_athlete_store
+from athlete_charts import write_athlete_charts
+from h2h_pairs import write_h2h_pairs
 
 from stats.cache import make_athlete_lookup, make_race_lookup
+from stats.generation import write_manifest
 
 from config import (
     FEMALE_SHORT_EVENTS_CSV_PATH,
     MALE_SHORT_EVENTS_CSV_PATH,
     RUNTIME_FEMALE_SHORT_LEADERBOARD_PATH,
     RUNTIME_MALE_SHORT_LEADERBOARD_PATH,
-    RUNTIME_ATHLETES_DIR,
+    RUNTIME_ATHLETE_STORE_PATH,
+    RUNTIME_ATHLETE_CHARTS_PATH,
+    RUNTIME_H2H_PAIRS_PATH,
     RUNTIME_RACES_DIR,
     FEMALE_SHORT_RESULTS_DIR,
     MALE_SHORT_RESULTS_DIR,
     CORRECTIONS_CSV_PATH,
     RUNTIME_RACE_LOOKUP_PATH,
     WARNINGS_CSV_PATH,
-    IGNORED_RACES_CSV_PATH
+    IGNORED_RACES_CSV_PATH,
+    RUNTIME_FEMALE_SHORT_ELO_STATE_PATH,
+    RUNTIME_MALE_SHORT_ELO_STATE_PATH,
+    RUNTIME_FEMALE_SHORT_CHECKPOINTS_DIR,
+    RUNTIME_MALE_SHORT_CHECKPOINTS_DIR
 )
 
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', 1000)
 
+# Bump when Athlete/Race or the saved state layout changes so stale snapshots are not reused
+STATE_VERSION = 3
+
+# Default number of races between replay checkpoints
+CHECKPOINT_EVERY = 500
+
+# Year checkpoints kept for the most recent years, older years keep only the start of each decade
+CHECKPOINT_KEEP_YEARS = 5
+
+# Column order of the per-race arrays handed to Race/Athlete and the ELO calculations
+RESULT_TIME_COLS = ['overall_s', 'swim_s', 'bike_s', 'run_s', 't1_s', 't2_s']
+ELO_TIME_COLS = ['overall_s', 'swim_s', 'bike_s', 'run_s', 'transition_s']
+
 """
 After full reloads, remember the following need manual changes:
 TODO: Manual change for park: 675869
@@ -48,7 +78,8 @@ class TriathlonELOSystem:
                  race_guide_file: Path, 
                  race_dir: Path,
                  corrections_file: Path = CORRECTIONS_CSV_PATH,
-                 ignored_file: Path = IGNORED_RACES_CSV_PATH
+                 ignored_file: Path = IGNORED_RACES_CSV_PATH,
+                 warnings_file: Path = WARNINGS_CSV_PATH
         ):
         """
         Initialize the ELO system.
@@ -59,11 +90,18 @@ class TriathlonELOSystem:
             race_dir: Directory containing race CSVs
             corrections_file: Path to csv containing manual race corrections
             ignored_file: Path to csv containing races to be ignored from calculations
+            warnings_file: Path to csv that suspicious splits are logged to
         """
         self.scale: float = 46175.8
         self.k_factor: float = k_factor
         self.athletes: Dict[int, Athlete] = {}  
         self.races: Dict[int, Race] = {}
+        
+        # Suspicious splits are collected for the whole run and written once at the end. They are
+        # part of the saved state, so a resumed or replayed run still writes those of earlier races
+        self.warnings_log = WarningsLog(warnings_file)
+        
+        self.reset_state()
         self.progs: pd.DataFrame = pd.read_csv(race_guide_file)
         self.race_dir: Path = race_dir
         
@@ -75,38 +113,349 @@ class TriathlonELOSystem:
         self.ignored_df = pd.read_csv(ignored_file, header = 0)
         self.ignored_race_ids = set(self.ignored_df['race_id'])
         
-    def process_all_races(self) -> None:
-        race_count = len(self.progs)
-        print(f"Found {race_count} races to process.")
-                
-        race_count = len(self.progs)
-        for _, row in tqdm(enumerate(self.progs.itertuples()), total = race_count, desc = "Processing races", unit = "race"):
-            if row.prog_id in self.ignored_race_ids:
-                tqdm.write(f"Skipping ignored race ID: {row.prog_id}")
-                continue
+    def reset_state(self) -> None:
+        """ Clear all athletes, races, their split warnings and replay progress """
+        self.athletes = {}
+        self.races = {}
+        self.warnings_log.clear()
+        
+        # Replay progress, prog IDs in race guide order
+        self.processed_prog_ids: List[int] = []
+        self.last_prog_id: int = -1
+        self.last_prog_date: str = ""
+        self.max_prog_date: str = "" # Race guide is not strictly date ordered
+        self.failed_prog_ids: List[int] = []
+        
+        # Progs processed since the last checkpoint was written
+        self.progs_since_checkpoint: int = 0
+        
+    def process_all_races(self, checkpoint_dir: Optional[Path] = None, checkpoint_every: int = CHECKPOINT_EVERY) -> None:
+        """
+        Replay every race in the race guide from scratch.
+        
+        Args:
+            checkpoint_dir: Directory to write periodic checkpoints to, None for no checkpoints
+            checkpoint_every: Number of races between checkpoints (a checkpoint is also written at each new year)
+        """
+        print(f"Found {len(self.progs)} races to process.")
+        self.replay_progs(self.progs, checkpoint_dir, checkpoint_every)
+    
+    def process_new_races(self, state_path: Path, checkpoint_dir: Optional[Path] = None) -> None:
+        """
+        Load the state saved by a previous run and apply only programs that have been added
+        to the race guide since. Falls back to a full replay when there is no usable state or
+        when already-processed history has changed.
+        
+        Args:
+            state_path: Path to state snapshot written by save_state
+            checkpoint_dir: Directory to write periodic checkpoints to, None for no checkpoints
+        """
+        if not self.load_state(state_path):
+            print(f"No usable ELO state at {state_path}, running full replay.")
+            self.reset_state()
+            self.process_all_races(checkpoint_dir)
+            return
+        
+        new_progs = self.get_unprocessed_progs()
+        
+        replay_reason = self.get_replay_reason(new_progs)
+        if replay_reason is not None:
+            print(f"{replay_reason}, running full replay.")
+            self.reset_state()
+            self.process_all_races(checkpoint_dir)
+            return
+        
+        print(f"Found {len(new_progs)} new races to process.")
+        self.replay_progs(new_progs, checkpoint_dir, desc = "Processing new races")
+    
+    def resume_from_checkpoint(self, checkpoint_path: Path, checkpoint_dir: Optional[Path] = None) -> None:
+        """
+        Continue an interrupted replay from a checkpoint.
+        
+        Args:
+            checkpoint_path: Checkpoint file, or checkpoint directory to use the latest checkpoint in
+            checkpoint_dir: Directory to keep writing checkpoints to, None for no checkpoints
+        """
+        if checkpoint_path.is_dir():
+            checkpoint_path = self.find_checkpoint(checkpoint_path)
             
-            fname: Path = self.race_dir / f"{row.prog_id}.csv"
+        if checkpoint_path is None or not self.load_state(checkpoint_path):
+            print("No usable checkpoint found, running full replay.")
+            self.reset_state()
+            self.process_all_races(checkpoint_dir)
+            return
+        
+        remaining_progs = self.get_unprocessed_progs()
+        print(f"Resuming with {len(remaining_progs)} races left to process.")
+        self.replay_progs(remaining_progs, checkpoint_dir, desc = "Resuming races")
+    
+    def replay_from_date(self, replay_date: datetime, checkpoint_dir: Path) -> None:
+        """
+        Rebuild only history from replay_date onwards, starting from the latest checkpoint that
+        contains no races on or after that date. Used after corrections to recent races.
+        
+        Args:
+            replay_date: Earliest race date that needs recomputing
+            checkpoint_dir: Directory containing checkpoints, new checkpoints are written here too
+        """
+        checkpoint_path = self.find_checkpoint(checkpoint_dir, before = replay_date)
+        
+        if checkpoint_path is None or not self.load_state(checkpoint_path):
+            print(f"No usable checkpoint before {replay_date:%Y-%m-%d}, running full replay.")
+            self.reset_state()
+            self.process_all_races(checkpoint_dir)
+            return
+        
+        # Drop later checkpoints, they describe history that is about to be recomputed
+        for path in self.list_checkpoints(checkpoint_dir):
+            if path.name > checkpoint_path.name:
+                path.unlink()
+        
+        remaining_progs = self.get_unprocessed_progs()
+        print(f"Replaying {len(remaining_progs)} races from {checkpoint_path.name}.")
+        self.replay_progs(remaining_progs, checkpoint_dir, desc = "Replaying races")
+    
+    def replay_progs(self, progs: pd.DataFrame, checkpoint_dir: Optional[Path] = None, checkpoint_every: int = CHECKPOINT_EVERY, desc: str = "Processing races") -> None:
+        """ Process the argument rows of the race guide in order, checkpointing as we go, then post-process """
+        if checkpoint_dir is not None:
+            checkpoint_dir.mkdir(parents = True, exist_ok = True)
+        
+        for row in tqdm(progs.itertuples(), total = len(progs), desc = desc, unit = "race"):
+            checkpoint_kind = self.get_checkpoint_kind(row, checkpoint_every)
+            if checkpoint_dir is not None and checkpoint_kind is not None:
+                self.save_checkpoint(checkpoint_dir, checkpoint_kind)
+            self.process_prog(row)
             
-            # Load race category IDs
-            cat_ids: List[int] = literal_eval(row.cat_id)
+        if checkpoint_dir is not None and self.progs_since_checkpoint > 0:
+            self.save_checkpoint(checkpoint_dir, "interval")
 
-            if fname.exists():
-                race: Race = Race(
-                    race_id = row.prog_id,
-                    race_title = row.race_title,
-                    prog_name = row.prog_name,
-                    date = datetime.strptime(row.prog_date, '%Y-%m-%d'),
-                    location = str(row.race_venue),
-                    country = str(row.race_country)
-                )
-                self.races[row.prog_id] = race
-                self.process_single_race(fname, row, cat_ids)
-            else:
-                tqdm.write(f"Warning: {fname} does not exist, skipping")
+        self.perform_postprocessing()
+        
+        if self.failed_prog_ids:
+            print(f"Failed to process {len(self.failed_prog_ids)} races: {self.failed_prog_ids}")
+    
+    def get_unprocessed_progs(self) -> pd.DataFrame:
+        """ Rows of the race guide not yet processed, in race guide order """
+        return self.progs[~self.progs['prog_id'].isin(set(self.processed_prog_ids))]
+    
+    def get_replay_reason(self, new_progs: pd.DataFrame) -> Optional[str]:
+        """
+        Check whether the loaded state can be extended with new_progs alone.
+        
+        Returns:
+            Description of why a full replay is needed, None if new_progs can simply be applied
+        """
+        processed = set(self.processed_prog_ids)
+        
+        # Corrections added, removed or edited for races already in the ratings
+        if self.get_corrections_state(processed) != self.state_corrections:
+            return "Corrections changed for processed races"
+        
+        # Races ignored or un-ignored after they were processed
+        if (self.ignored_race_ids ^ self.state_ignored_race_ids) & processed:
+            return "Ignored races changed for processed races"
+        
+        # Results that were missing when the race was first seen but have since been fetched
+        for prog_id in processed:
+            if prog_id not in self.races and prog_id not in self.ignored_race_ids and (self.race_dir / f"{prog_id}.csv").exists():
+                return f"Results for race {prog_id} fetched after it was processed"
+        
+        if new_progs.empty:
+            return None
+        
+        # New programs must come after everything already processed, both in the race guide and by date
+        last_position = self.progs.index[self.progs['prog_id'] == self.last_prog_id]
+        if len(last_position) == 0:
+            return f"Last processed race {self.last_prog_id} missing from race guide"
+        if (new_progs.index < last_position[0]).any():
+            return "New races inserted before processed races in race guide"
+        
+        last_date = datetime.strptime(self.last_prog_date, '%Y-%m-%d')
+        for prog_date in new_progs['prog_date']:
+            if datetime.strptime(prog_date, '%Y-%m-%d') < last_date:
+                return f"New race dated {prog_date} is before last processed race ({self.last_prog_date})"
+        
+        return None
+    
+    def get_corrections_state(self, prog_ids: Set[int]) -> Set[tuple]:
+        """ Hashable view of the corrections applied to the argument programs """
+        corrections = self.corrections_df[self.corrections_df['race_id'].isin(prog_ids)]
+        return set(corrections.astype(str).itertuples(index = False, name = None))
+    
+    def process_prog(self, row) -> None:
+        """ Process a single program (row of the race guide) and record it as processed """
+        self.processed_prog_ids.append(row.prog_id)
+        self.last_prog_id = row.prog_id
+        self.last_prog_date = row.prog_date
+        self.max_prog_date = max(self.max_prog_date, row.prog_date)
+        self.progs_since_checkpoint += 1
+        
+        if row.prog_id in self.ignored_race_ids:
+            tqdm.write(f"Skipping ignored race ID: {row.prog_id}")
+            return
+        
+        fname: Path = self.race_dir / f"{row.prog_id}.csv"
+        
+        # Load race category IDs
+        cat_ids: List[int] = literal_eval(row.cat_id)
 
-        # Post-processing
+        if fname.exists():
+            race: Race = Race(
+                race_id = row.prog_id,
+                race_title = row.race_title,
+                prog_name = row.prog_name,
+                date = datetime.strptime(row.prog_date, '%Y-%m-%d'),
+                location = str(row.race_venue),
+                country = str(row.race_country)
+            )
+            self.races[row.prog_id] = race
+            self.process_single_race(fname, row, cat_ids)
+        else:
+            tqdm.write(f"Warning: {fname} does not exist, skipping")
+    
+    def perform_postprocessing(self) -> None:
         self.perform_athlete_postprocessing()
         self.perform_race_postprocessing()
+        
+        # The log holds the warnings of every processed race (restored with the state), so it
+        # replaces what an earlier run wrote for them
+        self.warnings_log.flush(replace_race_ids = set(self.processed_prog_ids))
+    
+    def get_checkpoint_kind(self, row, checkpoint_every: int) -> Optional[str]:
+        """
+        Checkpoint before the first race of each new year and every checkpoint_every races.
+        
+        Returns:
+            "year" or "interval" if a checkpoint is due before processing row, otherwise None
+        """
+        if self.progs_since_checkpoint == 0:
+            return None
+        
+        # Dates are ISO strings so the year is the first 4 chars
+        if row.prog_date[:4] > self.max_prog_date[:4]:
+            return "year"
+        
+        if self.progs_since_checkpoint >= checkpoint_every:
+            return "interval"
+        
+        return None
+    
+    def save_checkpoint(self, checkpoint_dir: Path, kind: str) -> None:
+        """
+        Save state to checkpoint_dir. Checkpoints are named by the number of races processed, so
+        they sort in replay order, and the latest race date they contain.
+        
+        Each checkpoint is a full state snapshot, so only those --replay-from is likely to need are
+        kept: the latest interval checkpoint, year checkpoints for the last CHECKPOINT_KEEP_YEARS
+        years and, before that, the year checkpoint at the start of each decade. Replaying from an
+        older date starts at its decade checkpoint.
+        """
+        checkpoint_path = checkpoint_dir / f"{len(self.processed_prog_ids):06d}-{kind}-{self.max_prog_date}.pkl"
+        
+        self.save_state(checkpoint_path, quiet = True)
+        self.progs_since_checkpoint = 0
+        self.prune_checkpoints(checkpoint_dir, checkpoint_path)
+        
+        tqdm.write(f"Saved checkpoint {checkpoint_path.name} (up to {self.max_prog_date})")
+    
+    def prune_checkpoints(self, checkpoint_dir: Path, latest_path: Path) -> None:
+        """ Delete checkpoints older than latest_path that save_checkpoint doesn't keep """
+        # A year checkpoint is written before the first race of the year after its latest race date
+        latest_year = int(self.max_prog_date[:4])
+        
+        for path in self.list_checkpoints(checkpoint_dir):
+            if path.name >= latest_path.name:
+                continue
+            
+            _, kind, max_prog_date = path.stem.split("-", 2)
+            start_year = int(max_prog_date[:4]) + 1
+            if kind == "year" and (start_year > latest_year - CHECKPOINT_KEEP_YEARS or start_year % 10 == 0):
+                continue
+            path.unlink()
+    
+    @staticmethod
+    def list_checkpoints(checkpoint_dir: Path) -> List[Path]:
+        """ Checkpoints in replay order """
+        return sorted(checkpoint_dir.glob("*.pkl")) if checkpoint_dir.exists() else []
+    
+    @staticmethod
+    def find_checkpoint(checkpoint_dir: Path, before: Optional[datetime] = None) -> Optional[Path]:
+        """
+        Find the latest checkpoint, or the latest one containing only races dated before the argument date.
+        
+        Returns:
+            Path to checkpoint, None if there is no suitable checkpoint
+        """
+        for path in reversed(TriathlonELOSystem.list_checkpoints(checkpoint_dir)):
+            if before is None:
+                return path
+            
+            max_prog_date = path.stem.split("-", 2)[2]
+            if datetime.strptime(max_prog_date, '%Y-%m-%d') < before:
+                return path
+                
+        return None
+    
+    def save_state(self, state_path: Path, quiet: bool = False) -> None:
+        """ Save versioned snapshot of ratings, histories and replay progress for later incremental runs """
+        processed = set(self.processed_prog_ids)
+        state = {
+            "version": STATE_VERSION,
+            "k_factor": self.k_factor,
+            "scale": self.scale,
+            "processed_prog_ids": self.processed_prog_ids,
+            "last_prog_id": self.last_prog_id,
+            "last_prog_date": self.last_prog_date,
+            "max_prog_date": self.max_prog_date,
+            "failed_prog_ids": self.failed_prog_ids,
+            "corrections": self.get_corrections_state(processed),
+            "ignored_race_ids": self.ignored_race_ids & processed,
+            "athletes": self.athletes,
+            "races": self.races,
+            "warnings": self.warnings_log.warnings
+        }
+        
+        # Write to temporary file first so a crash never leaves a half-written state
+        tmp_path = state_path.with_name(f"{state_path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, state_path)
+        
+        if not quiet:
+            print(f"Saved ELO state ({len(self.processed_prog_ids)} races) to {state_path}")
+    
+    def load_state(self, state_path: Path) -> bool:
+        """
+        Load snapshot written by save_state.
+        
+        Returns:
+            False if no snapshot exists or it was made with a different version or parameters
+        """
+        if not state_path.exists():
+            return False
+        
+        with open(state_path, 'rb') as f:
+            state = pickle.load(f)
+            
+        if (state.get("version") != STATE_VERSION 
+            or state["k_factor"] != self.k_factor 
+            or state["scale"] != self.scale):
+            return False
+        
+        self.athletes = state["athletes"]
+        self.races = state["races"]
+        self.processed_prog_ids = state["processed_prog_ids"]
+        self.last_prog_id = state["last_prog_id"]
+        self.last_prog_date = state["last_prog_date"]
+        self.max_prog_date = state["max_prog_date"]
+        self.failed_prog_ids = state["failed_prog_ids"]
+        self.state_corrections = state["corrections"]
+        self.state_ignored_race_ids = state["ignored_race_ids"]
+        self.warnings_log.warnings = list(state["warnings"])
+        self.progs_since_checkpoint = 0
+        
+        print(f"Loaded ELO state ({len(self.processed_prog_ids)} races) from {state_path}")
+        return True
                 
     def process_single_race(self, file_path: str, prog_row, cat_ids) -> None:
         try:
@@ -129,18 +478,20 @@ class TriathlonELOSystem:
             # Store race results and get athlete data
             prog_name = str(prog_row.prog_name) # Pass prog name so we can initialise AG vs. Elite ratings correctly
             race_name = str(prog_row.race_title) # Pass race name so we can check for particular special races
-            athlete_data = self.make_race_and_athletes(race_df, race_id, race_date, race_name, prog_name, cat_ids)
+            athlete_ids, ratings, times = self.make_race_and_athletes(race_df, race_id, race_date, race_name, prog_name, cat_ids)
+            self.check_short_splits(race_id, athlete_ids, times)
             
             # Calculate ELO changes
-            elo_changes = self.calculate_elo_changes(athlete_data)
+            elo_changes = self.calculate_elo_changes(ratings, times)
             
             # Store rating changes in Race
-            self.store_race_ratings(race_id, athlete_data, elo_changes)
+            self.store_race_ratings(race_id, athlete_ids, ratings, elo_changes)
             
             # Update Athlete ratings
-            self.update_athlete_ratings(elo_changes, race_id, race_date)
+            self.update_athlete_ratings(athlete_ids, elo_changes, race_id, race_date)
             
         except Exception as e:
+            self.failed_prog_ids.append(prog_row.prog_id)
             print(f"Error processing file {file_path}: {str(e)}")
             
     def load_race_data(self, file_path: str) -> pd.DataFrame:
@@ -176,14 +527,8 @@ class TriathlonELOSystem:
         race_df['athlete_title'] = race_df['athlete_title'].str.replace('"', '').str.replace("'", "")
         
         # Expand splits list and convert to seconds
-        race_df['split'] = race_df['splits'].apply(literal_eval)
-        
-        race_df[['swim_s', 't1_s', 'bike_s', 't2_s', 'run_s']] = (
-            race_df['split']
-            .apply(lambda lst: [self.time_to_seconds(x) for x in lst])
-            .apply(pd.Series)
-        )
-        race_df['overall_s'] = race_df['total_time'].apply(self.time_to_seconds)
+        race_df[['swim_s', 't1_s', 'bike_s', 't2_s', 'run_s']] = splits_to_seconds(race_df['splits']).to_numpy()
+        race_df['overall_s'] = times_to_seconds(race_df['total_time'])
         
         # Remove all splits in case of DNF/DQ/LAP
         dnf_mask = race_df['overall_s'] == 0
@@ -214,23 +559,28 @@ class TriathlonELOSystem:
         corrections has cols (race_id, athlete_id, swim, t1, bike, t2, run, overall, notes)
         All times in HH:MM:SS
         """
-        for _, row in corrections.iterrows(): 
+        # Convert all corrected times up front
+        corrections = corrections.assign(**{
+            f"{col}_s": times_to_seconds(corrections[col])
+            for col in ['overall', 'swim', 't1', 'bike', 't2', 'run']
+        })
+        
+        for row in corrections.itertuples(): 
             mask = race_df['athlete_id'] == row.athlete_id
             
-            race_df.loc[mask, 'overall_s'] = self.time_to_seconds(row['overall'])
-            race_df.loc[mask, 'swim_s'] = self.time_to_seconds(row['swim'])
-            race_df.loc[mask, 'bike_s'] = self.time_to_seconds(row['bike'])
-            race_df.loc[mask, 'run_s'] = self.time_to_seconds(row['run'])
+            race_df.loc[mask, 'overall_s'] = row.overall_s
+            race_df.loc[mask, 'swim_s'] = row.swim_s
+            race_df.loc[mask, 'bike_s'] = row.bike_s
+            race_df.loc[mask, 'run_s'] = row.run_s
             
             # Only set transition if both splits are available
-            t1_s, t2_s = self.time_to_seconds(row['t1']), self.time_to_seconds(row['t2'])
-            race_df.loc[mask, 'transition_s'] = t1_s + t2_s if t1_s != 0 and t2_s != 0 else 0
+            race_df.loc[mask, 'transition_s'] = row.t1_s + row.t2_s if row.t1_s != 0 and row.t2_s != 0 else 0
             
             tqdm.write(f"Applied corrections to athlete {row.athlete_id} in race {row.race_id}")
         
         return race_df
     
-    def make_race_and_athletes(self, race_df: pd.DataFrame, race_id: int, race_date: datetime, race_name: str, prog_name: str, cat_ids: List[int]) -> Dict:
+    def make_race_and_athletes(self, race_df: pd.DataFrame, race_id: int, race_date: datetime, race_name: str, prog_name: str, cat_ids: List[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         Store race results and athlete data, return data needed for ELO calculations.
 
@@ -243,149 +593,147 @@ class TriathlonELOSystem:
             cat_ids: List of category IDs for this race
 
         Returns:
-            athlete_data: Dict mapping athlete_id to (ratings, times) tuples
+            (athlete_ids, ratings, times) - one row per athlete, ratings and times are (n x 5) arrays
+            ordered [overall, swim, bike, run, transition]
         """
         race: Race = self.races[race_id]
-        athlete_data = {}
         
-        fastest_splits = self.get_fastest_splits(race_df)
+        # Whole race as columns, no per-row Series
+        athlete_ids = race_df['athlete_id'].to_numpy()
+        positions = race_df['position'].tolist()
+        result_times = race_df[RESULT_TIME_COLS].to_numpy(dtype = float)
         
-        for _,row in race_df.iterrows():
-            athlete_id = row['athlete_id']
-            
-            athlete = self.get_or_create_athlete(row)
+        fastest_splits = self.get_fastest_splits(result_times)
+        behind, pct_behind = get_behind_leaders(result_times, fastest_splits)
+        
+        # Save to Race
+        race.add_results_batch(athlete_ids, positions, result_times, behind)
+        
+        # Save to Athletes
+        athlete_columns = zip(
+            athlete_ids.tolist(),
+            race_df['athlete_title'].tolist(),
+            race_df['athlete_country_name'].tolist(),
+            race_df['athlete_yob'].tolist(),
+            race_df['athlete_profile_image'].tolist(),
+            positions,
+            result_times.tolist(),
+            behind.tolist(),
+            pct_behind.tolist()
+        )
+        for athlete_id, name, country, yob, profile_img, position, times, athlete_behind, athlete_pct_behind in athlete_columns:
+            athlete = self.get_or_create_athlete(athlete_id, name, country, yob, profile_img)
             # Set initial ratings for new athletes based on program
             if athlete.overall_rating == float('-inf'):
                 athlete.initialise_ratings(prog_name)
-
-            # Save to Race
-            race.add_result(
-                athlete_id = athlete_id,
-                position = row['position'],
-                overall_s = row['overall_s'],
-                swim_s = row['swim_s'],
-                bike_s = row['bike_s'],
-                run_s = row['run_s'],
-                t1_s = row['t1_s'],
-                t2_s = row['t2_s'],
-                **fastest_splits
-            )
             
-            # Save to Athlete
-            athlete.add_result(
-                race_id = race_id,
-                race_date = race_date,
-                race_name = race_name,
-                position = row['position'],
-                overall_s = row['overall_s'],
-                swim_s = row['swim_s'],
-                bike_s = row['bike_s'],
-                run_s = row['run_s'],
-                t1_s = row['t1_s'],
-                t2_s = row['t2_s'],
-                cat_ids = cat_ids,
-                **fastest_splits
-            )
-            
-            # Store times/ratings for ELO calculations
-            ratings = [
+            athlete.add_race_result(race_id, race_date, race_name, position, cat_ids, times, athlete_behind, athlete_pct_behind)
+        
+        # Athletes listed more than once are rated once, on their last result
+        unique_ids, first_idx = np.unique(athlete_ids, return_index = True)
+        _, last_idx_reversed = np.unique(athlete_ids[::-1], return_index = True)
+        order = np.argsort(first_idx)
+        elo_ids = unique_ids[order]
+        elo_rows = (len(athlete_ids) - 1 - last_idx_reversed)[order]
+        
+        # Store times/ratings for ELO calculations
+        ratings = np.array([
+            [
                 athlete.overall_rating,
                 athlete.swim_rating,
                 athlete.bike_rating,
                 athlete.run_rating,
                 athlete.transition_rating
             ]
-            times = row[['overall_s', 'swim_s', 'bike_s', 'run_s', 'transition_s']].values
-            athlete_data[athlete_id] = (ratings, times)
-        
-        return athlete_data
-    
-    def get_fastest_splits(self, race_df: pd.DataFrame) -> Dict[str, float]:
-        """ Get fastest splits for % behind leader calculations, ignore 0s """
-        return {
-            "fastest_overall_s": race_df[race_df['overall_s'] > 0]['overall_s'].min(),
-            "fastest_swim_s": race_df[race_df['swim_s'] > 0]['swim_s'].min(),
-            "fastest_bike_s": race_df[race_df['bike_s'] > 0]['bike_s'].min(),
-            "fastest_run_s": race_df[race_df['run_s'] > 0]['run_s'].min(),
-            "fastest_t1_s": race_df[race_df['t1_s'] > 0]['t1_s'].min(),
-            "fastest_t2_s": race_df[race_df['t2_s'] > 0]['t2_s'].min()
-        }
+            for athlete in (self.athletes[athlete_id] for athlete_id in elo_ids.tolist())
+        ], dtype = float).reshape(-1, 5)
+        times = race_df[ELO_TIME_COLS].to_numpy(dtype = float)[elo_rows]
         
-    def get_or_create_athlete(self, row) -> Athlete:
+        return elo_ids, ratings, times
+    
+    def get_fastest_splits(self, result_times: np.ndarray) -> np.ndarray:
+        """ Get fastest [overall, swim, bike, run, t1, t2] splits for % behind leader calculations, ignore 0s """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category = RuntimeWarning) # All-NaN columns give NaN
+            return np.nanmin(np.where(result_times > 0, result_times, np.nan), axis = 0)
+        
+    def get_or_create_athlete(self, athlete_id: int, name: str, country: str, year_of_birth: int, profile_img: str) -> Athlete:
         """
-        Get existing Athlete object or create a new one from single result row.
+        Get existing Athlete object or create a new one from the fields of a single result.
         """
-        athlete_id = row['athlete_id']
         if athlete_id not in self.athletes:
             self.athletes[athlete_id] = Athlete(
                 athlete_id = athlete_id,
-                name = row['athlete_title'],
-                country = row['athlete_country_name'],
-                year_of_birth = row['athlete_yob'],
-                profile_img = row['athlete_profile_image']
+                name = name,
+                country = country,
+                year_of_birth = year_of_birth,
+                profile_img = profile_img
             )
         return self.athletes[athlete_id]
     
-    def calculate_elo_changes(self, athlete_data: Dict) -> Dict[int, List[float]]:
+    def check_short_splits(self, race_id: int, athlete_ids: np.ndarray, times: np.ndarray) -> None:
+        """ Log dangerously short (< 3 min) overall, swim, bike and run times to the warnings log """
+        discs = ["overall", "swim", "bike", "run"]
+        short = (times[:, :4] != 0) & (times[:, :4] < 180)
+        for row, disc in zip(*np.nonzero(short)):
+            self.warnings_log.add(race_id, athlete_ids[row], discs[disc], times[row, disc])
+    
+    def calculate_elo_changes(self, ratings: np.ndarray, times: np.ndarray) -> np.ndarray:
         """
         Calculate pairwise ELO changes for all athletes in race.
         
         Args:
-            athlete_data: Dict mapping athlete_id to (ratings, times) tuples
+            ratings: (n x 5) array of pre-race ratings
+            times: (n x 5) array of times in seconds
             Ratings and times correspond to [overall, swim, bike, run, transition]
         Returns:
-            Dict mapping athlete_id to list of ELO changes
+            (n x 5) array of ELO changes, same row order
         """
-        athlete_ids = list(athlete_data.keys())
-        elo_changes = {athlete_id: [0.0] * 5 for athlete_id in athlete_ids}
-        num_athletes = len(athlete_ids)
+        return self.get_elo_change_matrix(ratings, times)
+    
+    def get_elo_change_matrix(self, ratings: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """
+        Batched equivalent of summing get_logtime_elo over every pair of athletes.
         
-        for i in range(num_athletes):
-            id1 = athlete_ids[i]
-            ratings1, times1 = athlete_data[id1]
-            
-            # Test for dangerously short times
-            for disc in range(4):
-                discs = ["overall", "swim","bike", "run"]
-                if times1[disc] != 0 and times1[disc] < 180:
-                    warnings_df = pd.read_csv(WARNINGS_CSV_PATH, header = 0)
-                    warnings_df.loc[len(warnings_df)] = {
-                        "athlete_id": id1,
-                        "discipline": discs[disc]
-                    }
-                    warnings_df.to_csv(WARNINGS_CSV_PATH, index = False)
-            
-            for j in range(i + 1, num_athletes):
-                id2 = athlete_ids[j]
-                ratings2, times2 = athlete_data[id2]
-                
-                # Iterate through disciplines
-                for k in range(5):
-                    time1, time2 = times1[k], times2[k]
-                    
-                    # Skip if either time is invalid
-                    if time1 in set([float('inf'), 0]) or time2 in set([float('inf'), 0]):
-                        continue
-                    
-                    change = self.get_logtime_elo(ratings1[k], ratings2[k], time1, time2)
-                    elo_changes[id1][k] += change
-                    elo_changes[id2][k] -= change
-                    
-        return elo_changes
-    
-    def store_race_ratings(self, race_id: int, athlete_data: Dict, elo_changes: Dict[int, List[float]]) -> None:
+        The pairwise change is antisymmetric, so athlete i's total is the sum over valid
+        opponents j of log(t_j / t_i) - (r_i - r_j) * ln(10) / scale. Per discipline this
+        reduces to column sums over the athletes with a valid time, so no n x n matrix is built.
+        
+        Args:
+            ratings: (n x 5) array of pre-race ratings [overall, swim, bike, run, transition]
+            times: (n x 5) array of times in seconds, same column order
+        Returns:
+            (n x 5) array of unscaled ELO changes, 0 where the athlete has no valid time
+        """
+        # 0 and inf times (DNF/missing splits) take no part in the pairwise comparisons
+        valid = (times != 0) & np.isfinite(times)
+        valid_count = valid.sum(axis = 0)
+        
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            log_times = np.where(valid, np.log(np.where(valid, times, 1.0)), 0.0)
+        masked_ratings = np.where(valid, ratings, 0.0)
+        
+        # Sum over opponents j of log(t_j) - log(t_i), the j = i term is 0
+        actual = log_times.sum(axis = 0) - valid_count * log_times
+        
+        # Sum over opponents j of (r_i - r_j) * ln(10) / scale
+        expected = (valid_count * masked_ratings - masked_ratings.sum(axis = 0)) * (math.log(10) / self.scale)
+        
+        return np.where(valid, actual - expected, 0.0)
+    
+    def store_race_ratings(self, race_id: int, athlete_ids: np.ndarray, ratings: np.ndarray, elo_changes: np.ndarray) -> None:
         """
         Store ratings (post-race) and changes in Race object.
         
         Args:
             race_id: ID
-            athlete_data: Dict mapping athlete_id to (ratings, times) tuples
-            elo_changes: Dict mapping athlete_id to list of ELO changes
+            athlete_ids: Array of athlete IDs
+            ratings: (n x 5) array of pre-race ratings, same order
+            elo_changes: (n x 5) array of ELO changes, same order
         """
         race = self.races[race_id]
         
-        for athlete_id, changes in elo_changes.items():
-            original_ratings = athlete_data[athlete_id][0]
+        for athlete_id, original_ratings, changes in zip(athlete_ids.tolist(), ratings.tolist(), elo_changes.tolist()):
             race.add_rating(athlete_id, *original_ratings, *changes, self.k_factor)
   
     def get_logtime_elo(self, rating1: float, rating2: float, time1: int, time2: int) -> float:
@@ -413,11 +761,11 @@ class TriathlonELOSystem:
         # Measure surprise in log-ratio space
         return actual_log_ratio - expected_log_ratio
         
-    def update_athlete_ratings(self, elo_changes: Dict[int, List[float]], race_prog_id: int, race_date: datetime):
+    def update_athlete_ratings(self, athlete_ids: np.ndarray, elo_changes: np.ndarray, race_prog_id: int, race_date: datetime):
         """
         Update athlete ratings based on calculated ELO changes using Athlete objects.
         """
-        for athlete_id, changes in elo_changes.items():
+        for athlete_id, changes in zip(athlete_ids.tolist(), elo_changes.tolist()):
             athlete = self.athletes[athlete_id]
             athlete.update_rating(race_prog_id, race_date, changes, self.k_factor)
     
@@ -443,60 +791,13 @@ class TriathlonELOSystem:
         leaderboard_df = leaderboard_df.sort_values('Overall Rating', ascending=False)
         return leaderboard_df.head(top_n)
 
-    def save_athlete_data(self, dir_path: Path):
-        """ Save all athletes' data as separate pkl files """
-        for athlete_id, athlete in self.athletes.items():
-            fname = dir_path / f"{athlete_id}.pkl"
-            
-            if os.path.exists(fname):
-                os.remove(fname)
-            
-            with open(fname, 'wb') as f:
-                pickle.dump(athlete, f)
-                
-        print(f"Saved athlete data to {dir_path}")
-        
-    def save_race_data(self, dir_path: Path):
-        """ Save all races' data as separate pkl files """
-        for race_id, race in self.races.items():
-            fname = dir_path / f"{race_id}.pkl"
-            
-            if os.path.exists(fname):
-                os.remove(fname)
-                
-            with open(fname, 'wb') as f:
-                pickle.dump(race, f)
-                
-        print(f"Saved race data to {dir_path}")
-
     def time_to_seconds(self, time_str: str) -> float:
         """
         Convert various time string formats to seconds.
         Returns 0 for DNF/DNS/DQ/LAP, float('inf') for invalid/missing times.
+        Use times_to_seconds for whole columns.
         """
-        try:
-            # Older events include empty string splits, treat as 0 and they won't
-            # be included in later ELO calculations
-            # For DNF/DNS/DQ/LAP/NC, also return 0 to ignore from later calcs
-            if time_str in set(['None', '', 'DNF', 'DQ', 'LAP', 'NC']):
-                return 0
-            
-            if pd.isna(time_str):
-                return float('inf')
-            
-            parts = time_str.strip().split(':')
-            if len(parts) == 3: # HH:MM:SS format
-                hours, minutes, seconds = map(float, parts)
-                return hours * 3600 + minutes * 60 + seconds
-            elif len(parts) == 2: # MM:SS format
-                minutes, seconds = map(float, parts)
-                return minutes * 60 + seconds
-            elif len(parts) == 1: # SS format
-                return float(parts[0])
-            else:   
-                return float('inf')
-        except:
-            return float('inf')
+        return time_to_seconds(time_str)
 
     def perform_athlete_postprocessing(self) -> None:
         self.set_athlete_active_status()
@@ -519,7 +820,8 @@ class TriathlonELOSystem:
       
     def perform_race_postprocessing(self) -> None:
         for _, race in self.races.items():
-            race.get_discipline_standards()  
+            race.get_discipline_standards()
+            race.compute_summaries(bins = 20)
             
     def make_leaderboard(self, leaderboard_path: str) -> None:
         """ 
@@ -583,26 +885,72 @@ class TriathlonELOSystem:
                 athlete.run_rank = row.run_rank 
                 athlete.transition_rank = row.transition_rank
 
-def main():
-    female_short_elo = TriathlonELOSystem(
+def run_short_course_elo(race_guide_file: Path, race_dir: Path, leaderboard_path: Path, state_path: Path, checkpoint_dir: Path, args: argparse.Namespace) -> TriathlonELOSystem:
+    """ Build ratings for one gender, then save state and leaderboard """
+    elo = TriathlonELOSystem(
         k_factor = 16,
+        race_guide_file = race_guide_file,
+        race_dir = race_dir
+    )
+    if args.incremental:
+        elo.process_new_races(state_path, checkpoint_dir)
+    elif args.resume_from is not None:
+        # Bare --resume-from uses the latest checkpoint for this gender
+        resume_path = checkpoint_dir if args.resume_from == "latest" else Path(args.resume_from)
+        elo.resume_from_checkpoint(resume_path, checkpoint_dir)
+    elif args.replay_from is not None:
+        elo.replay_from_date(args.replay_from, checkpoint_dir)
+    else:
+        elo.process_all_races(checkpoint_dir)
+    elo.save_state(state_path)
+    elo.make_leaderboard(leaderboard_path)
+    return elo
+
+def main():
+    parser = argparse.ArgumentParser(description = "Build ELO ratings, leaderboards and lookups")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental",
+        action = "store_true",
+        help = "Only process races added since the last saved state (full replay if history changed)"
+    )
+    mode.add_argument(
+        "--resume-from",
+        nargs = "?",
+        const = "latest",
+        metavar = "CHECKPOINT",
+        help = "Resume an interrupted replay from a checkpoint file, or the latest checkpoint if none given"
+    )
+    mode.add_argument(
+        "--replay-from",
+        type = lambda d: datetime.strptime(d, '%Y-%m-%d'),
+        metavar = "YYYY-MM-DD",
+        help = "Recompute races from this date onwards, starting from the latest checkpoint before it"
+    )
+    parser.add_argument(
+        "--skip-images",
+        action = "store_true",
+        help = "Don't download missing athlete profile images (run stats/profile_images.py later instead)"
+    )
+    args = parser.parse_args()
+    
+    female_short_elo = run_short_course_elo(
         race_guide_file = FEMALE_SHORT_EVENTS_CSV_PATH,
-        race_dir = FEMALE_SHORT_RESULTS_DIR
+        race_dir = FEMALE_SHORT_RESULTS_DIR,
+        leaderboard_path = RUNTIME_FEMALE_SHORT_LEADERBOARD_PATH,
+        state_path = RUNTIME_FEMALE_SHORT_ELO_STATE_PATH,
+        checkpoint_dir = RUNTIME_FEMALE_SHORT_CHECKPOINTS_DIR,
+        args = args
     )
-    female_short_elo.process_all_races()
-    female_short_elo.make_leaderboard(RUNTIME_FEMALE_SHORT_LEADERBOARD_PATH)
-    female_short_elo.save_athlete_data(RUNTIME_ATHLETES_DIR)
-    female_short_elo.save_race_data(RUNTIME_RACES_DIR)
     
-    male_short_elo = TriathlonELOSystem(
-        k_factor = 16,
+    male_short_elo = run_short_course_elo(
         race_guide_file = MALE_SHORT_EVENTS_CSV_PATH,
-        race_dir = MALE_SHORT_RESULTS_DIR
+        race_dir = MALE_SHORT_RESULTS_DIR,
+        leaderboard_path = RUNTIME_MALE_SHORT_LEADERBOARD_PATH,
+        state_path = RUNTIME_MALE_SHORT_ELO_STATE_PATH,
+        checkpoint_dir = RUNTIME_MALE_SHORT_CHECKPOINTS_DIR,
+        args = args
     )
-    male_short_elo.process_all_races()
-    male_short_elo.make_leaderboard(RUNTIME_MALE_SHORT_LEADERBOARD_PATH)
-    male_short_elo.save_athlete_data(RUNTIME_ATHLETES_DIR)
-    male_short_elo.save_race_data(RUNTIME_RACES_DIR)
     
     athlete_count = len(female_short_elo.athletes) + len(male_short_elo.athletes)
     print(f"Total athletes processed: {athlete_count}")
@@ -610,13 +958,31 @@ def main():
     race_count = len(female_short_elo.races) + len(male_short_elo.races)
     print(f"Total races processed: {race_count}")
     
+    # Both genders share the athlete store and race directory so they are written together
+    write_athlete_store({**female_short_elo.athletes, **male_short_elo.athletes}, RUNTIME_ATHLETE_STORE_PATH)
+    write_h2h_pairs({**female_short_elo.athletes, **male_short_elo.athletes}, RUNTIME_H2H_PAIRS_PATH)
+    write_artifacts({**female_short_elo.races, **male_short_elo.races}, RUNTIME_RACES_DIR)
+    
+    # Download profile images once ratings are built, rather than one by one while processing races
+    if not args.skip_images:
+        prefetch_profile_images(
+            collect_profile_images([*female_short_elo.athletes.values(), *male_short_elo.athletes.values()])
+        )
+    
     # # Rebuild athlete lookup after all athletes have been updated
     make_athlete_lookup()
     # Rebuild race lookups
-    make_race_lookup(
+    race_lookup = make_race_lookup(
         event_guides = [FEMALE_SHORT_EVENTS_CSV_PATH, MALE_SHORT_EVENTS_CSV_PATH],
         output_path = RUNTIME_RACE_LOOKUP_PATH
     )
+    # Athlete page charts, named from the race lookup the app serves
+    write_athlete_charts(
+        {**female_short_elo.athletes, **male_short_elo.athletes}, race_lookup, RUNTIME_ATHLETE_CHARTS_PATH
+    )
+
+    # Written last so running apps only reload once everything above is complete
+    write_manifest()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config import RUNTIME_DATA_DIR, RUNTIME_MANIFEST_PATH
+
+"""
+Data generations for the web app.
+
+stats/elo.py writes every runtime artifact and then data/manifest.json naming the new generation.
+Loaders in stats/cache.py (and the routers' small per-object caches) keep their values per generation
+via @generation_cached. A GenerationWatcher polls the manifest, loads the warm loaders into the next
+generation in a background thread and then swaps it in with a single assignment, so requests never
+see a half-loaded generation or pay for the reload themselves. Each request is pinned to the
+generation current when it started (see pinned_generation).
+"""
+
+class Generation:
+    """ Cached loader values for one version of the data """
+    def __init__(self, version: Optional[str]):
+        self.version: Optional[str] = version
+        self.loaded: bool = False # Warm loaders all ran, False for a generation filled lazily
+        self.modified: Optional[float] = None # When the data was published, for Last-Modified headers
+        self.caches: Dict[Callable, OrderedDict] = {}
+        self.lock = threading.Lock()
+
+    def get_cache(self, func: Callable) -> OrderedDict:
+        with self.lock:
+            return self.caches.setdefault(func, OrderedDict())
+
+_current: Generation = Generation(None)
+_active: ContextVar[Optional[Generation]] = ContextVar("active_generation", default = None)
+_MISSING = object()
+
+def current_generation() -> Generation:
+    return _current
+
+def active_generation() -> Generation:
+    """ Generation loaders read from: the one pinned for this request/loader thread, else the current one """
+    return _active.get() or _current
+
+@contextmanager
+def pinned_generation(generation: Optional[Generation] = None) -> Iterator[Generation]:
+    """ Resolve every loader call inside the block against one generation (the current one by default) """
+    generation = generation or _current
+    token = _active.set(generation)
+    try:
+        yield generation
+    finally:
+        _active.reset(token)
+
+def generation_cached(func: Optional[Callable] = None, *, maxsize: Optional[int] = None):
+    """
+    Like functools.lru_cache, but values belong to the active generation so a swap drops them all.
+    Arguments must be hashable, maxsize=None keeps every value for the lifetime of the generation.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            generation = active_generation()
+            cache = generation.get_cache(wrapper)
+            with generation.lock:
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    cache.move_to_end(key)
+                    return value
+
+            # Computed outside the lock, concurrent first calls may both load (as with lru_cache)
+            value = func(*args, **kwargs)
+            with generation.lock:
+                cache[key] = value
+                if maxsize is not None and len(cache) > maxsize:
+                    cache.popitem(last = False)
+            return value
+
+        def cache_clear():
+            with _current.lock:
+                _current.caches.pop(wrapper, None)
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+# --- Manifest ---
+
+def write_manifest(manifest_path: Path = RUNTIME_MANIFEST_PATH) -> str:
+    """ Mark everything written so far as a new generation, replaced atomically. Returns its version """
+    version = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    tmp_path = manifest_path.with_suffix(manifest_path.suffix + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"generation": version, "written_at": datetime.now().isoformat()}, f)
+    os.replace(tmp_path, manifest_path)
+
+    print(f"Published data generation {version}")
+    return version
+
+def read_data_version(manifest_path: Path = RUNTIME_MANIFEST_PATH, data_dir: Path = RUNTIME_DATA_DIR) -> Optional[str]:
+    """
+    Version of the data on disk: the manifest's generation, or the newest modification time in
+    data_dir for data written before manifests existed. None if neither can be read
+    """
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)["generation"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    newest_mtime_ns = get_newest_mtime_ns(data_dir)
+    return None if newest_mtime_ns is None else f"mtime-{newest_mtime_ns}"
+
+def read_data_modified(manifest_path: Path = RUNTIME_MANIFEST_PATH, data_dir: Path = RUNTIME_DATA_DIR) -> Optional[float]:
+    """ When the data on disk was published (epoch seconds), from the same source as read_data_version """
+    try:
+        return os.stat(manifest_path).st_mtime
+    except OSError:
+        pass
+
+    newest_mtime_ns = get_newest_mtime_ns(data_dir)
+    return None if newest_mtime_ns is None else newest_mtime_ns / 1e9
+
+def get_newest_mtime_ns(data_dir: Path) -> Optional[int]:
+    try:
+        with os.scandir(data_dir) as entries:
+            return max(entry.stat().st_mtime_ns for entry in entries)
+    except (OSError, ValueError):
+        return None
+
+# --- Reloading ---
+
+def load_generation(version: Optional[str], warm_loaders: List[Callable]) -> Generation:
+    """ Call every warm loader against a new, not yet visible generation """
+    generation = Generation(version)
+    with pinned_generation(generation):
+        for loader in warm_loaders:
+            start = time.perf_counter()
+            loader()
+            print(f"Loaded {loader.__name__} for generation {version} in {time.perf_counter() - start:.2f}s")
+    generation.loaded = True
+    return generation
+
+def swap_generation(generation: Generation) -> Generation:
+    """ Make generation current, requests already running keep their pinned one. Returns the previous """
+    global _current
+    previous, _current = _current, generation
+    return previous
+
+class GenerationWatcher:
+    """
+    Background thread that loads the data on disk, then polls the data version and loads + swaps in
+    a new generation when it changes. A version that fails to load is retried on the next poll.
+    """
+    def __init__(self, warm_loaders: List[Callable], interval: float = 30.0):
+        self.warm_loaders: List[Callable] = warm_loaders
+        self.interval: float = interval
+        self.loading_version: Optional[str] = None # Being loaded right now
+        self.failed_version: Optional[str] = None # Last version that failed to load, until one loads
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """ Reload if the data version changed, returns True if a new generation was swapped in """
+        version = read_data_version()
+        if version is None or version == _current.version:
+            return False
+        modified = read_data_modified()
+
+        if version == self.failed_version:
+            print(f"Retrying data generation {version}")
+        self.loading_version = version
+        try:
+            generation = load_generation(version, self.warm_loaders)
+        except Exception as e:
+            self.failed_version = version
+            print(f"Failed to load data generation {version}, still serving {_current.version}: {e}")
+            return False
+        finally:
+            self.loading_version = None
+
+        generation.modified = modified
+        previous = swap_generation(generation)
+        self.failed_version = None
+        print(f"Swapped data generation {previous.version} -> {version}")
+        return True
+
+    def status(self) -> str:
+        """
+        "ready" once a generation is fully loaded, else "warming" while one loads (or before the
+        first check), "failed" if the last attempt failed and "missing" if there is no data on disk
+        """
+        if _current.loaded:
+            return "ready"
+        if self.loading_version is None and self.failed_version is not None:
+            return "failed"
+        if self.loading_version is None and read_data_version() is None:
+            return "missing"
+        return "warming"
+
+    def run(self) -> None:
+        # Warm up first, requests arriving meanwhile load lazily and /ready reports "warming"
+        try:
+            self.warm_up()
+        except Exception as e:
+            print(f"Data warm-up failed: {e}")
+
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Data generation check failed: {e}")
+
+    def warm_up(self) -> bool:
+        """ Load the data on disk now, before serving, rather than lazily on first requests """
+        start = time.perf_counter()
+        swapped = self.check()
+        if swapped:
+            print(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+        return swapped
+
+    def start(self) -> None:
+        """ Warm up (a no-op if already warmed up before fork) and watch for new data, in the background """
+        self.thread = threading.Thread(target = self.run, name = "generation-watcher", daemon = True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout = self.interval)
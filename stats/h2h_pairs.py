@@ -0,0 +1,194 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from stats.packed_arrays import PackedArrays, write_packed_arrays
+
+"""
+Head-to-head record of every pair of athletes who shared a race, computed once by stats/elo.py
+and packed into one memory-mapped file (see stats/packed_arrays.py).
+
+Each pair is stored in both directions, grouped by athlete (sorted by athlete_id) with offsets
+marking where each athlete's rivals start, and rivals sorted by athlete_id within the group.
+A pair's record is a binary search within one athlete's rivals, and their most frequent rivals
+a sort of that group only. Wins follow the comparison page: lower overall time wins, a finisher
+beats a non-finisher (0s) and equal times are no result.
+"""
+
+H2H_MAGIC = b"PTDH2HP1"
+REDUCE_EVERY = 2_000_000 # Pair meetings buffered before merging into the running totals
+EPOCH = date(1970, 1, 1)
+
+# Columns of the pair table, one row per (athlete, rival) pair
+PAIR_COLUMNS = {
+    "athlete_id": "<i8",
+    "rival_id": "<i8",
+    "races": "<i4",
+    "wins": "<i4", # Athlete beat rival
+    "losses": "<i4",
+    "last_day": "<i4", # Days since 1970-01-01 of their most recent shared race
+    "last_race_id": "<i8"
+}
+
+@dataclass
+class H2HSummary:
+    """ Record of athlete_id against rival_id """
+    athlete_id: int
+    rival_id: int
+    races: int
+    wins: int
+    losses: int
+    last_date: date
+    last_race_id: int
+
+def get_race_members(athletes: Dict[int, object]) -> Dict[str, np.ndarray]:
+    """ One row per (race, athlete) sorted by race, first result kept if an athlete has two in a race """
+    race_ids, athlete_ids, overall_s, race_dates = [], [], [], []
+    for athlete_id, athlete in athletes.items():
+        seen = set()
+        for result in athlete.race_results:
+            if result.race_id in seen:
+                continue
+            seen.add(result.race_id)
+            race_ids.append(result.race_id)
+            athlete_ids.append(athlete_id)
+            overall_s.append(result.overall_s)
+            race_dates.append(result.race_date)
+
+    race_ids = np.array(race_ids, dtype = np.int64)
+    order = np.argsort(race_ids, kind = "stable")
+    return {
+        "race_id": race_ids[order],
+        "athlete_id": np.array(athlete_ids, dtype = np.int64)[order],
+        "overall_s": np.array(overall_s, dtype = float)[order],
+        "last_day": np.array(race_dates, dtype = "datetime64[D]").astype(np.int32)[order]
+    }
+
+def get_wins(time1_s: np.ndarray, time2_s: np.ndarray) -> np.ndarray:
+    """ Whether time1 beats time2, as format_h2h_times in app/routers/comparison.py """
+    return ((time2_s == 0) & (time1_s != 0)) | ((time1_s != 0) & (time2_s != 0) & (time1_s < time2_s))
+
+def reduce_pairs(pairs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """ Sum rows with the same (athlete_id, rival_id), keeping the most recent meeting """
+    order = np.lexsort((pairs["last_race_id"], pairs["last_day"], pairs["rival_id"], pairs["athlete_id"]))
+    pairs = {column: values[order] for column, values in pairs.items()}
+
+    new_pair = np.ones(len(order), dtype = bool)
+    new_pair[1:] = (np.diff(pairs["athlete_id"]) != 0) | (np.diff(pairs["rival_id"]) != 0)
+    starts = np.flatnonzero(new_pair)
+    ends = np.append(starts[1:], len(order)) - 1
+
+    return {
+        "athlete_id": pairs["athlete_id"][starts],
+        "rival_id": pairs["rival_id"][starts],
+        "races": np.add.reduceat(pairs["races"], starts) if len(starts) else pairs["races"],
+        "wins": np.add.reduceat(pairs["wins"], starts) if len(starts) else pairs["wins"],
+        "losses": np.add.reduceat(pairs["losses"], starts) if len(starts) else pairs["losses"],
+        "last_day": pairs["last_day"][ends],
+        "last_race_id": pairs["last_race_id"][ends]
+    }
+
+def make_h2h_pairs(athletes: Dict[int, object]) -> Dict[str, np.ndarray]:
+    """ Pair table columns (see PAIR_COLUMNS) sorted by athlete_id then rival_id """
+    members = get_race_members(athletes)
+    pairs = {column: np.zeros(0, dtype = dtype) for column, dtype in PAIR_COLUMNS.items()}
+    buffer: List[Dict[str, np.ndarray]] = []
+    buffered = 0
+
+    race_starts = np.flatnonzero(np.diff(members["race_id"], prepend = -1) != 0)
+    race_ends = np.append(race_starts[1:], len(members["race_id"]))
+    for start, end in zip(race_starts.tolist(), race_ends.tolist()):
+        if end - start < 2:
+            continue
+
+        # Every pair in the race, once in each direction
+        first, second = np.triu_indices(end - start, k = 1)
+        first, second = np.concatenate([first, second]) + start, np.concatenate([second, first]) + start
+        buffer.append({
+            "athlete_id": members["athlete_id"][first],
+            "rival_id": members["athlete_id"][second],
+            "races": np.ones(len(first), dtype = np.int32),
+            "wins": get_wins(members["overall_s"][first], members["overall_s"][second]).astype(np.int32),
+            "losses": get_wins(members["overall_s"][second], members["overall_s"][first]).astype(np.int32),
+            "last_day": members["last_day"][first],
+            "last_race_id": members["race_id"][first]
+        })
+        buffered += len(first)
+
+        if buffered >= REDUCE_EVERY:
+            pairs = reduce_pairs({column: np.concatenate([pairs[column], *[b[column] for b in buffer]]) for column in pairs})
+            buffer, buffered = [], 0
+
+    if buffer:
+        pairs = reduce_pairs({column: np.concatenate([pairs[column], *[b[column] for b in buffer]]) for column in pairs})
+    return {column: pairs[column].astype(dtype) for column, dtype in PAIR_COLUMNS.items()}
+
+def write_h2h_pairs(athletes: Dict[int, object], pairs_path: Path) -> None:
+    """ Compute the head-to-head record of every pair of athletes and write it to pairs_path """
+    pairs = make_h2h_pairs(athletes)
+
+    # Offsets of each athlete's rivals, athletes who never shared a race are left out
+    athlete_ids, starts = np.unique(pairs.pop("athlete_id"), return_index = True)
+    arrays = {
+        "athlete_ids": athlete_ids.astype("<i8"),
+        "offsets": np.append(starts, len(pairs["rival_id"])).astype("<i8"),
+        **pairs
+    }
+    write_packed_arrays(pairs_path, H2H_MAGIC, arrays)
+
+    print(f"Saved {len(pairs['rival_id']) // 2} head-to-head pairs for {len(athlete_ids)} athletes to {pairs_path}")
+
+class H2HPairs:
+    """
+    Read-only view of a head-to-head pairs file, see write_h2h_pairs.
+    """
+    def __init__(self, pairs_path: Path):
+        self.pairs_path: Path = pairs_path
+        self.arrays: Dict[str, np.ndarray] = PackedArrays(pairs_path, H2H_MAGIC).arrays
+        self.athlete_ids: np.ndarray = self.arrays["athlete_ids"]
+
+    def __len__(self) -> int:
+        return len(self.athlete_ids)
+
+    def _rivals_slice(self, athlete_id: int) -> Optional[slice]:
+        i = int(np.searchsorted(self.athlete_ids, athlete_id))
+        if i < len(self.athlete_ids) and self.athlete_ids[i] == athlete_id:
+            return slice(*self.arrays["offsets"][i:i + 2].tolist())
+        return None
+
+    def _summary(self, athlete_id: int, row: int) -> H2HSummary:
+        a = self.arrays
+        return H2HSummary(
+            athlete_id = athlete_id,
+            rival_id = int(a["rival_id"][row]),
+            races = int(a["races"][row]),
+            wins = int(a["wins"][row]),
+            losses = int(a["losses"][row]),
+            last_date = EPOCH + timedelta(days = int(a["last_day"][row])),
+            last_race_id = int(a["last_race_id"][row])
+        )
+
+    def get(self, athlete_id: int, rival_id: int) -> Optional[H2HSummary]:
+        """ Record of athlete_id against rival_id, None if they never shared a race """
+        rivals = self._rivals_slice(athlete_id)
+        if rivals is None:
+            return None
+
+        rival_ids = self.arrays["rival_id"][rivals]
+        i = int(np.searchsorted(rival_ids, rival_id))
+        if i < len(rival_ids) and rival_ids[i] == rival_id:
+            return self._summary(athlete_id, rivals.start + i)
+        return None
+
+    def rivals(self, athlete_id: int, limit: int = 10) -> List[H2HSummary]:
+        """ Athletes sharing the most races with athlete_id, most recent meeting first on ties """
+        rivals = self._rivals_slice(athlete_id)
+        if rivals is None:
+            return []
+
+        # np.lexsort sorts by the last key first
+        order = np.lexsort((-self.arrays["last_day"][rivals], -self.arrays["races"][rivals].astype(np.int64)))
+        return [self._summary(athlete_id, rivals.start + i) for i in order[:limit].tolist()]
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+from threading import Lock
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DISCIPLINES = ["overall", "swim", "bike", "run", "transition"]
+ORDERS = ["top", "hot"]
+
+class LeaderboardIndex:
+    """
+    Read-only leaderboard with every ordering and filter facet precomputed once at load.
+
+    For each discipline x {top, hot} the ordering is an array of row positions into the
+    leaderboard DataFrame. Filters resolve to a row mask from packed bitsets (one per country,
+    one for active athletes) and a binary search over sorted years of birth, the mask is then
+    applied along an ordering. Requests never scan or sort the DataFrame and never modify it.
+    """
+    def __init__(self, leaderboard_df: pd.DataFrame):
+        self.df: pd.DataFrame = leaderboard_df
+        self.row_count: int = len(leaderboard_df)
+        self.orderings: Dict[Tuple[str, str], np.ndarray] = {}
+
+        # Few distinct year ranges are requested (the page defaults to 1950-2010) so keep their bitsets
+        self.get_yob_bits = lru_cache(maxsize = 256)(self.get_yob_bits)
+
+        # Columns (athlete_id index first) as arrays for building pages, views where possible. Arrow
+        # string columns are kept as they are, converting them would make a Python object per value
+        self.columns: Dict[str, np.ndarray] = {leaderboard_df.index.name or "index": leaderboard_df.index.to_numpy()}
+        self.columns.update({
+            col: values if isinstance(values, pd.arrays.ArrowStringArray) else np.asarray(values)
+            for col, values in ((col, leaderboard_df[col].array) for col in leaderboard_df.columns)
+        })
+
+        if leaderboard_df.empty:
+            self.active_bits = np.zeros(0, dtype = np.uint8)
+            self.country_bits: Dict[str, np.ndarray] = {}
+            self.yob_order = np.zeros(0, dtype = np.intp)
+            self.yob_sorted = np.zeros(0, dtype = int)
+            for disc in DISCIPLINES:
+                for order in ORDERS:
+                    self.orderings[(disc, order)] = np.zeros(0, dtype = np.intp)
+            return
+
+        # Facets
+        self.active_bits: np.ndarray = np.packbits(leaderboard_df["active"].to_numpy(dtype = bool))
+
+        country_codes, countries = pd.factorize(leaderboard_df["country_full"])
+        self.country_bits: Dict[str, np.ndarray] = {
+            country: np.packbits(country_codes == code) for code, country in enumerate(countries)
+        }
+
+        year_of_birth = leaderboard_df["year_of_birth"].to_numpy()
+        self.yob_order: np.ndarray = np.argsort(year_of_birth, kind = "stable")
+        self.yob_sorted: np.ndarray = year_of_birth[self.yob_order]
+
+        for disc in DISCIPLINES:
+            # Top: everyone by discipline rank, ties keep the overall rank order of the frame
+            ranks = leaderboard_df[f"{disc}_rank"].to_numpy()
+            self.orderings[(disc, "top")] = np.argsort(ranks, kind = "stable")
+
+            # Hot: only athletes with a change in the last year, by change rank
+            changed = np.flatnonzero(leaderboard_df[f"{disc}_change"].to_numpy() != 0)
+            change_ranks = leaderboard_df[f"{disc}_change_rank"].to_numpy()[changed]
+            self.orderings[(disc, "hot")] = changed[np.argsort(change_ranks, kind = "stable")]
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def get_yob_bits(self, yob_start: Optional[int], yob_end: Optional[int]) -> np.ndarray:
+        """ Bitset of rows with yob_start <= year_of_birth <= yob_end (0/None means no bound) """
+        lo = np.searchsorted(self.yob_sorted, yob_start, side = "left") if yob_start else 0
+        hi = np.searchsorted(self.yob_sorted, yob_end, side = "right") if yob_end else self.row_count
+
+        in_range = np.zeros(self.row_count, dtype = bool)
+        in_range[self.yob_order[lo:hi]] = True
+        return np.packbits(in_range)
+
+    def get_filter_bits(self, country: str = "all", yob_start: Optional[int] = None, yob_end: Optional[int] = None, active_only: bool = False) -> Optional[np.ndarray]:
+        """ Intersection of all requested facets as a packed bitset, None if nothing is filtered """
+        bits = None
+        if active_only:
+            bits = self.active_bits
+        if country != "all":
+            country_bits = self.country_bits.get(country, np.zeros_like(self.active_bits))
+            bits = country_bits if bits is None else bits & country_bits
+        if yob_start or yob_end:
+            yob_bits = self.get_yob_bits(yob_start, yob_end)
+            bits = yob_bits if bits is None else bits & yob_bits
+        return bits
+
+    def get_mask(self, country: str = "all", yob_start: Optional[int] = None, yob_end: Optional[int] = None, active_only: bool = False) -> Optional[np.ndarray]:
+        """ Boolean mask of rows passing all filters, None if nothing is filtered """
+        bits = self.get_filter_bits(country, yob_start, yob_end, active_only)
+        if bits is None:
+            return None
+        return np.unpackbits(bits, count = self.row_count).view(bool)
+
+    def select(self, disc: str, order: str, country: str = "all", yob_start: Optional[int] = None, yob_end: Optional[int] = None, active_only: bool = False) -> np.ndarray:
+        """
+        Row positions of the filtered leaderboard in display order.
+        Same filters as the leaderboard page: active only, exact country name and an inclusive
+        year of birth range (0/None means no bound).
+        """
+        ordering = self.orderings[(disc, order)]
+        mask = self.get_mask(country, yob_start, yob_end, active_only)
+        return ordering if mask is None else ordering[mask[ordering]]
+
+    def get_page(self, positions: np.ndarray, offset: int = 0, limit: int = 50) -> List[dict]:
+        """
+        Athlete records for one page of a selection, with rank within the selection
+        (which may differ from global rank if filters are applied).
+        """
+        page_positions = positions[offset:offset + limit]
+        page_columns = {col: values[page_positions].tolist() for col, values in self.columns.items()}
+        page_columns["rank"] = list(range(offset + 1, offset + len(page_positions) + 1))
+        return [dict(zip(page_columns.keys(), row)) for row in zip(*page_columns.values())]
+
+class SelectionCache:
+    """
+    Small TTL/LRU cache of filtered orderings (from LeaderboardIndex.select) so paging through a
+    leaderboard slices one selection instead of re-filtering for every page.
+
+    Selections are keyed by the normalized filter tuple and handed out under an opaque token,
+    which is a hash of that tuple so the same filters always get the same token.
+    """
+    def __init__(self, maxsize: int = 64, ttl: float = 600.0):
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.entries: "OrderedDict[str, Tuple[tuple, np.ndarray, float]]" = OrderedDict()
+        self.lock = Lock()
+
+    @staticmethod
+    def make_token(key: tuple) -> str:
+        return hashlib.blake2b(repr(key).encode(), digest_size = 8).hexdigest()
+
+    def get(self, token: str, key: tuple) -> Optional[np.ndarray]:
+        """ Cached selection for token, None if missing, expired or made for different filters """
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+
+            entry_key, positions, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[token]
+                return None
+            # A cursor kept after the filters changed, the entry is still good for its own filters
+            if entry_key != key:
+                return None
+
+            self.entries.move_to_end(token)
+            return positions
+
+    def put(self, key: tuple, positions: np.ndarray) -> str:
+        """
+        Store a selection unless one is already cached for key, evicting the least recently used
+        beyond maxsize. Returns its token
+        """
+        token = self.make_token(key)
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None or entry[0] != key or entry[2] < time.monotonic():
+                self.entries[token] = (key, positions, time.monotonic() + self.ttl)
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last = False)
+        return token
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,111 @@
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Letters that don't decompose into a base letter + accent under NFKD
+FOLD_TABLE = str.maketrans({
+    "ø": "o", "ł": "l", "đ": "d", "ð": "d", "þ": "th", "æ": "ae", "œ": "oe", "ı": "i"
+})
+
+def fold_name(name: str) -> str:
+    """ Lowercase and strip accents so e.g. 'Štefan' and 'stefan' compare equal """
+    decomposed = unicodedata.normalize("NFKD", str(name).casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).translate(FOLD_TABLE)
+
+def get_ngrams(text: str, n: int) -> Iterable[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+class Postings:
+    """
+    Sorted positions per key, flattened into sorted keys, offsets and one positions array so a large
+    index is a few buffers rather than a Python object per key (cheap to share between forked workers)
+    """
+    def __init__(self, postings: Dict[str, List[int]]):
+        keys = sorted(postings)
+        self.keys: np.ndarray = np.array(keys, dtype = str)
+        self.offsets: np.ndarray = np.zeros(len(keys) + 1, dtype = np.int64)
+        np.cumsum([len(postings[key]) for key in keys], out = self.offsets[1:])
+        self.positions: np.ndarray = np.fromiter(
+            chain.from_iterable(postings[key] for key in keys), dtype = np.int32, count = int(self.offsets[-1])
+        )
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """ Sorted positions for key, None if the key was never seen """
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.positions[self.offsets[i]:self.offsets[i + 1]]
+        return None
+
+class NameIndex:
+    """
+    Inverted index of bigrams and trigrams over accent-folded athlete names.
+
+    Postings are sorted row positions into the athlete lookup, which is pre-sorted by rating, so
+    intersecting the postings of a query's n-grams gives candidates already in result order.
+    Candidates are checked for the full substring (n-grams can match out of order) and the
+    search stops after limit matches, so the cost depends on the rarest n-gram rather than on
+    the number of athletes.
+    """
+    def __init__(self, names: Iterable[str]):
+        folded_names = [fold_name(name) for name in names]
+
+        postings: Dict[str, List[int]] = {}
+        for position, name in enumerate(folded_names):
+            for n in (2, 3):
+                for ngram in get_ngrams(name, n):
+                    postings.setdefault(ngram, []).append(position)
+
+        # Positions are appended in order so every list is already sorted
+        self.postings: Postings = Postings(postings)
+        self.names: pa.StringArray = pa.array(folded_names, type = pa.string())
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_lookup(cls, athlete_lookup: pd.DataFrame) -> "NameIndex":
+        return cls(athlete_lookup["name"].fillna("").tolist())
+
+    def search(self, query: str, limit: int = 50) -> np.ndarray:
+        """
+        Row positions of names containing query (case and accent insensitive), in lookup order.
+        Queries need at least 2 characters after folding, shorter ones match nothing.
+        """
+        query = fold_name(query).strip()
+        if len(query) < 2:
+            return np.zeros(0, dtype = np.int32)
+
+        ngrams = get_ngrams(query, 3 if len(query) >= 3 else 2)
+        ngram_postings = [self.postings.get(ngram) for ngram in ngrams]
+        if any(positions is None for positions in ngram_postings):
+            return np.zeros(0, dtype = np.int32)
+
+        # Walk the rarest n-gram's postings in blocks, keeping positions found in every other
+        # posting list, and stop once limit names are found so common queries stay cheap
+        ngram_postings.sort(key = len)
+        rarest, others = ngram_postings[0], ngram_postings[1:]
+        matches: List[int] = []
+        block_size = max(4 * limit, 256)
+        for block_start in range(0, len(rarest), block_size):
+            candidates = rarest[block_start:block_start + block_size]
+            for positions in others:
+                found = np.searchsorted(positions, candidates).clip(max = len(positions) - 1)
+                candidates = candidates[positions[found] == candidates]
+
+            # n-grams can match out of order, check the full query unless it is a single n-gram
+            if len(query) > 3 and len(candidates):
+                contains = pc.match_substring(self.names.take(candidates), query)
+                candidates = candidates[contains.to_numpy(zero_copy_only = False)]
+
+            matches.extend(candidates[:limit - len(matches)].tolist())
+            if len(matches) == limit:
+                break
+        return np.array(matches, dtype = np.int32)
@@ -0,0 +1,60 @@
+import json
+import mmap
+import os
+from pathlib import Path
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+"""
+Named numpy arrays packed into one memory-mapped file, for precomputed tables the app serves:
+
+    [array 0][array 1]...[header: JSON][footer]
+
+The header holds each array's dtype, shape and offset plus any extra metadata (e.g. a string
+table), the footer holds a magic identifying what the file contains and where the header is.
+Arrays are read as views straight into the mapping, so nothing is copied and every worker
+shares the same page cache.
+"""
+
+FOOTER = struct.Struct("<8sQQ") # magic, header offset, header length
+
+def write_packed_arrays(path: Path, magic: bytes, arrays: Dict[str, np.ndarray], meta: Optional[dict] = None) -> None:
+    """ Write arrays and meta to path, replaced atomically so open readers keep their (old) mapping """
+    meta = meta or {}
+    path.parent.mkdir(parents = True, exist_ok = True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    header = {**meta, "arrays": {}}
+    with open(tmp_path, 'wb') as f:
+        for key, array in arrays.items():
+            header["arrays"][key] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": f.tell()}
+            f.write(np.ascontiguousarray(array).tobytes())
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_offset = f.tell()
+        f.write(header_bytes)
+        f.write(FOOTER.pack(magic, header_offset, len(header_bytes)))
+    os.replace(tmp_path, path)
+
+class PackedArrays:
+    """
+    Read-only view of a file written by write_packed_arrays. arrays maps names to views, meta
+    holds the rest of the header
+    """
+    def __init__(self, path: Path, magic: bytes):
+        self.path: Path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+        file_magic, header_offset, header_length = FOOTER.unpack_from(self.mm, len(self.mm) - FOOTER.size)
+        if file_magic != magic:
+            raise ValueError(f"{path} is not a {magic.decode()} file")
+        self.meta: dict = json.loads(self.mm[header_offset:header_offset + header_length])
+
+        self.arrays: Dict[str, np.ndarray] = {
+            key: np.frombuffer(
+                self.mm, dtype = spec["dtype"], count = int(np.prod(spec["shape"])), offset = spec["offset"]
+            ).reshape(spec["shape"])
+            for key, spec in self.meta.pop("arrays").items()
+        }
@@ -0,0 +1,236 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import shutil
+import sys
+from threading import local
+from time import sleep
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from tqdm import tqdm
+
+# Add the project root to Python path so local config can be imported
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from config import (
+    RUNTIME_ATHLETE_IMAGES_DIR,
+    RUNTIME_ATHLETE_IMAGES_MANIFEST_PATH,
+    RUNTIME_ATHLETE_STORE_PATH
+)
+from stats.athlete_store import AthleteStore
+
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 3
+BACKOFF_S = 0.5
+TIMEOUT_S = 10
+
+# Server-side/rate limit responses worth retrying, anything else (e.g. 404) fails straight away
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+"""
+Profile images used to be downloaded in Athlete.__init__, one blocking request per new athlete
+in the middle of the race loop. They are now fetched in a separate stage once ratings are built:
+
+    pairs = collect_profile_images(athletes)
+    prefetch_profile_images(pairs)
+
+or standalone with `python stats/profile_images.py` from the saved athlete store.
+"""
+
+@dataclass
+class ImageManifest:
+    """
+    Persistent record of image URLs already fetched or that failed, so reruns
+    don't request them again.
+    """
+    path: Path
+    fetched: Dict[str, str] = field(default_factory = dict) # url -> file name
+    failed: Dict[str, str] = field(default_factory = dict) # url -> last error
+
+    @classmethod
+    def load(cls, path: Path) -> "ImageManifest":
+        if not path.exists():
+            return cls(path)
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(path, fetched = data.get("fetched", {}), failed = data.get("failed", {}))
+
+    def save(self) -> None:
+        """ Write via a temporary file so an interrupted run never leaves a partial manifest """
+        self.path.parent.mkdir(parents = True, exist_ok = True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"fetched": self.fetched, "failed": self.failed}, f, indent = 1, sort_keys = True)
+        os.replace(tmp_path, self.path)
+
+@dataclass
+class PrefetchSummary:
+    fetched: int = 0
+    copied: int = 0 # URL shared with another athlete, downloaded once
+    skipped: int = 0 # Already on disk or previously failed
+    failed: int = 0
+
+def collect_profile_images(athletes: Iterable) -> Dict[int, str]:
+    """
+    Collect (athlete_id -> image URL) for all athletes with a profile image.
+    Works with Athlete objects or anything else with athlete_id and profile_img.
+    """
+    return {
+        int(athlete.athlete_id): athlete.profile_img
+        for athlete in athletes
+        if athlete.profile_img
+    }
+
+def load_saved_profile_images(store_path: Path = RUNTIME_ATHLETE_STORE_PATH) -> Dict[int, str]:
+    """ Collect image URLs from the saved athlete store, for running this stage on its own """
+    store = AthleteStore(store_path)
+    return collect_profile_images(athlete for _, athlete in store.items())
+
+def group_by_url(pairs: Dict[int, str]) -> Dict[str, List[int]]:
+    """ De-duplicate URLs, athletes sharing an image URL are downloaded once """
+    athlete_ids_by_url: Dict[str, List[int]] = {}
+    for athlete_id, url in pairs.items():
+        athlete_ids_by_url.setdefault(url.strip(), []).append(athlete_id)
+    return athlete_ids_by_url
+
+_sessions = local()
+
+def get_session() -> requests.Session:
+    """ One session (connection pool) per worker thread """
+    if not hasattr(_sessions, "session"):
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+def fetch_image(url: str, path: Path, max_attempts: int = MAX_ATTEMPTS, backoff_s: float = BACKOFF_S, timeout_s: float = TIMEOUT_S) -> Optional[str]:
+    """
+    Download a single image to path, retrying connection errors and 5xx/429 responses
+    with exponential backoff.
+
+    Returns:
+        None on success, otherwise a short description of the last error
+    """
+    error = None
+    for attempt in range(max_attempts):
+        if attempt > 0:
+            sleep(backoff_s * 2 ** (attempt - 1))
+
+        try:
+            response = get_session().get(url, timeout = timeout_s)
+        except requests.RequestException as e:
+            error = f"{type(e).__name__}: {e}"
+            continue
+
+        if response.status_code == 200:
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_path, path)
+            return None
+
+        error = f"HTTP {response.status_code}"
+        if response.status_code not in RETRY_STATUS_CODES:
+            break
+
+    return error
+
+def prefetch_profile_images(
+    pairs: Dict[int, str],
+    img_dir: Path = RUNTIME_ATHLETE_IMAGES_DIR,
+    manifest_path: Path = RUNTIME_ATHLETE_IMAGES_MANIFEST_PATH,
+    max_workers: int = MAX_WORKERS,
+    max_attempts: int = MAX_ATTEMPTS,
+    backoff_s: float = BACKOFF_S,
+    timeout_s: float = TIMEOUT_S,
+    retry_failed: bool = False
+) -> PrefetchSummary:
+    """
+    Download missing profile images concurrently, saved as img_dir/{athlete_id}.jpg.
+
+    Args:
+        pairs: Dict mapping athlete_id to image URL, see collect_profile_images
+        img_dir: Directory images are saved to
+        manifest_path: JSON manifest of fetched and failed URLs
+        max_workers: Maximum number of downloads in flight at once
+        max_attempts: Attempts per URL before it is recorded as failed
+        backoff_s: Delay before the first retry, doubled for each further retry
+        timeout_s: Per-request timeout
+        retry_failed: Retry URLs that failed in earlier runs, skipped otherwise
+
+    Returns:
+        PrefetchSummary of counts
+    """
+    img_dir.mkdir(parents = True, exist_ok = True)
+    manifest = ImageManifest.load(manifest_path)
+    summary = PrefetchSummary()
+
+    # Only request URLs with at least one athlete still missing an image
+    pending: List[Tuple[str, List[int]]] = []
+    for url, athlete_ids in group_by_url(pairs).items():
+        missing_ids = [a for a in athlete_ids if not (img_dir / f"{a}.jpg").exists()]
+        summary.skipped += len(athlete_ids) - len(missing_ids)
+        if not missing_ids:
+            continue
+
+        # Fetched in an earlier run for another athlete
+        fetched_path = img_dir / manifest.fetched.get(url, "")
+        if url in manifest.fetched and fetched_path.exists():
+            for athlete_id in missing_ids:
+                shutil.copyfile(fetched_path, img_dir / f"{athlete_id}.jpg")
+            summary.copied += len(missing_ids)
+            continue
+
+        if url in manifest.failed and not retry_failed:
+            summary.skipped += len(missing_ids)
+            continue
+        pending.append((url, missing_ids))
+
+    if not pending:
+        return summary
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        futures = {
+            executor.submit(fetch_image, url, img_dir / f"{athlete_ids[0]}.jpg", max_attempts, backoff_s, timeout_s): (url, athlete_ids)
+            for url, athlete_ids in pending
+        }
+        for future in tqdm(as_completed(futures), total = len(futures), desc = "Fetching profile images", unit = "img"):
+            url, athlete_ids = futures[future]
+            error = future.result()
+            if error is not None:
+                manifest.failed[url] = error
+                summary.failed += len(athlete_ids)
+                continue
+
+            first_path = img_dir / f"{athlete_ids[0]}.jpg"
+            for athlete_id in athlete_ids[1:]:
+                shutil.copyfile(first_path, img_dir / f"{athlete_id}.jpg")
+            manifest.fetched[url] = first_path.name
+            manifest.failed.pop(url, None)
+            summary.fetched += 1
+            summary.copied += len(athlete_ids) - 1
+
+    manifest.save()
+    print(
+        f"Profile images: {summary.fetched} fetched, {summary.copied} copied, "
+        f"{summary.skipped} skipped, {summary.failed} failed"
+    )
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description = "Download missing athlete profile images")
+    parser.add_argument("--workers", type = int, default = MAX_WORKERS, help = "Maximum concurrent downloads")
+    parser.add_argument("--retry-failed", action = "store_true", help = "Retry URLs that failed in earlier runs")
+    args = parser.parse_args()
+
+    prefetch_profile_images(
+        load_saved_profile_images(),
+        max_workers = args.workers,
+        retry_failed = args.retry_failed
+    )
+
+if __name__ == "__main__":
+    main()
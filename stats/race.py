@@ -1,10 +1,15 @@
 from datetime import datetime
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Tuple
 
 import pandas as pd
 import numpy as np
 
+TIME_FIELDS = ["overall_s", "swim_s", "bike_s", "run_s", "t1_s", "t2_s"]
+TIME_DISCIPLINES = ["overall", "swim", "bike", "run", "t1", "t2"]
+RATING_FIELDS = ["overall_rating", "swim_rating", "bike_rating", "run_rating", "transition_rating"]
+RATING_DISCIPLINES = ["overall", "swim", "bike", "run", "transition"]
+
 @dataclass(slots=True)
 class Correction:
     athlete_id: int
@@ -66,6 +71,25 @@ class IndividualRating:
     bike_change: float = 0.0
     run_change: float = 0.0
     transition_change: float = 0.0
+
+def get_behind_leaders(times: np.ndarray, fastest: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Time and pct behind the fastest athlete for a whole race.
+
+    Args:
+        times: (n x 6) array of [overall, swim, bike, run, t1, t2] times in seconds, 0 if no time
+        fastest: Array of the 6 fastest times, NaN if nobody has a time for that split
+    Returns:
+        (behind_s, pct_behind) object arrays of the same shape, None where the athlete has no time
+    """
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        behind = times - fastest
+        pct_behind = behind / fastest
+
+    no_time = times == 0
+    behind = np.where(no_time | (fastest == 0), None, behind)
+    pct_behind = np.where(no_time, None, pct_behind)
+    return behind, pct_behind
     
 class Race:
     def __init__(self, race_id: int, race_title: str, prog_name: str, date: datetime, location: str, country: str):
@@ -101,27 +125,28 @@ class Race:
         
         # Corrections
         self.corrections: List[Correction] = []
+
+        # Race page charts, set by compute_summaries once the race is processed
+        self.time_histograms: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.rating_histograms: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.mean_times: Dict[str, float] = {}
     
-    def add_result(self, athlete_id: int, position: str, overall_s: int, swim_s: int, bike_s: int, run_s: int, t1_s: int, t2_s: int, fastest_overall_s: int, fastest_swim_s: int, fastest_bike_s: int, fastest_run_s: int, fastest_t1_s: int, fastest_t2_s: int):
-        self.athlete_count += 1
-        
-        self.results.append(
-            IndividualResult(
-                athlete_id = athlete_id,
-                position = position,
-                overall_s = overall_s,
-                swim_s = swim_s,
-                bike_s = bike_s,
-                run_s = run_s,
-                t1_s = t1_s,
-                t2_s = t2_s,
-                overall_behind_s = (overall_s - fastest_overall_s) if overall_s and fastest_overall_s else None,
-                swim_behind_s = (swim_s - fastest_swim_s) if swim_s and fastest_swim_s else None,
-                bike_behind_s = (bike_s - fastest_bike_s) if bike_s and fastest_bike_s else None,
-                run_behind_s = (run_s - fastest_run_s) if run_s and fastest_run_s else None,
-                t1_behind_s = (t1_s - fastest_t1_s) if t1_s and fastest_t1_s else None,
-                t2_behind_s = (t2_s - fastest_t2_s) if t2_s and fastest_t2_s else None
-            )
+    def add_results_batch(self, athlete_ids: np.ndarray, positions: List[str], times: np.ndarray, behind: np.ndarray) -> None:
+        """
+        Add all results for the race at once.
+
+        Args:
+            athlete_ids: Array of athlete IDs in result order
+            positions: String positions, same order
+            times: (n x 6) array of [overall, swim, bike, run, t1, t2] times in seconds
+            behind: (n x 6) array of times behind leaders, None if no time (see get_behind_leaders)
+        """
+        self.athlete_count += len(athlete_ids)
+
+        self.results.extend(
+            IndividualResult(athlete_id, position, *athlete_times, *athlete_behind)
+            for athlete_id, position, athlete_times, athlete_behind
+            in zip(athlete_ids.tolist(), positions, times.tolist(), behind.tolist())
         )
         
     def add_rating(self, athlete_id: int, overall_rating: float, swim_rating: float, bike_rating: float, run_rating: float, transition_rating: float, overall_change: float, swim_change: float, bike_change: float, run_change: float, transition_change: float, k_factor: float):
@@ -219,45 +244,62 @@ class Race:
             }
             for r in self.ratings
         ])
+
+    def get_times_array(self) -> np.ndarray:
+        """ (n x 6) splits in TIME_FIELDS order, NaN where there is no split time """
+        times = np.array(
+            [(r.overall_s, r.swim_s, r.bike_s, r.run_s, r.t1_s, r.t2_s) for r in self.results], dtype = float
+        ).reshape(-1, len(TIME_FIELDS))
+        times[~(times > 0)] = np.nan
+        return times
+
+    def get_ratings_array(self) -> np.ndarray:
+        """ (n x 5) ratings in RATING_FIELDS order """
+        return np.array(
+            [(r.overall_rating, r.swim_rating, r.bike_rating, r.run_rating, r.transition_rating) for r in self.ratings], dtype = float
+        ).reshape(-1, len(RATING_FIELDS))
         
     def get_mean_times(self) -> dict:
-        """ Calculates mean times for each discipline. """
-        times_df = self.get_times_df()
-        
+        """ Calculates mean times for each discipline, ignoring missing and non-finite times. """
+        times = self.get_times_array()
         return {
-            "overall": times_df['overall_s'].dropna().mean(),
-            "swim": times_df['swim_s'].dropna().mean(),
-            "bike": times_df['bike_s'].dropna().mean(),
-            "run": times_df['run_s'].dropna().mean(),
-            "t1": times_df['t1_s'].dropna().mean(),
-            "t2": times_df['t2_s'].dropna().mean()
-        }    
+            discipline: float(column[np.isfinite(column)].mean()) if np.isfinite(column).any() else np.nan
+            for discipline, column in zip(TIME_DISCIPLINES, times.T)
+        }
         
     def get_time_histograms(self, bins: int = 10) -> dict:
         """ 
         Prepares time histogram data for each discipline. 
+        Non-finite times (e.g. from a malformed correction) are left out, np.histogram can't bin them.
         """
-        times_df = self.get_times_df()
-        
+        times = self.get_times_array()
         return {
-            "overall": np.histogram(times_df['overall_s'].dropna(), bins = bins),
-            "swim": np.histogram(times_df['swim_s'].dropna(), bins = bins),
-            "bike": np.histogram(times_df['bike_s'].dropna(), bins = bins),
-            "run": np.histogram(times_df['run_s'].dropna(), bins = bins),
-            "t1": np.histogram(times_df['t1_s'].dropna(), bins = bins),
-            "t2": np.histogram(times_df['t2_s'].dropna(), bins = bins)
+            discipline: np.histogram(column[np.isfinite(column)], bins = bins)
+            for discipline, column in zip(TIME_DISCIPLINES, times.T)
         }
                 
     def get_rating_histograms(self, bins: int = 10) -> dict:
         """
-        Prepare rating histograms for each discipline.
+        Prepare rating histograms for each discipline, overall always uses 30 bins.
         """
-        ratings_df = self.get_ratings_df()
-        
+        ratings = self.get_ratings_array()
         return {
-            "overall": np.histogram(ratings_df['overall_rating'].dropna(), bins = 30),
-            "swim": np.histogram(ratings_df['swim_rating'].dropna(), bins = bins),
-            "bike": np.histogram(ratings_df['bike_rating'].dropna(), bins = bins),
-            "run": np.histogram(ratings_df['run_rating'].dropna(), bins = bins),
-            "transition": np.histogram(ratings_df['transition_rating'].dropna(), bins = bins),
-        }
\ No newline at end of file
+            discipline: np.histogram(column[np.isfinite(column)], bins = 30 if discipline == "overall" else bins)
+            for discipline, column in zip(RATING_DISCIPLINES, ratings.T)
+        }
+
+    def compute_summaries(self, bins: int = 20) -> None:
+        """
+        Store histograms (int32 counts and bin edges per discipline) and mean times so race pages
+        don't recompute them on every request. Run once all results and ratings have been added.
+        """
+        time_histograms = {
+            discipline: (counts.astype(np.int32), bin_edges)
+            for discipline, (counts, bin_edges) in self.get_time_histograms(bins).items()
+        }
+        rating_histograms = {
+            discipline: (counts.astype(np.int32), bin_edges)
+            for discipline, (counts, bin_edges) in self.get_rating_histograms(bins).items()
+        }
+        # Set together so a failure leaves none of them rather than some
+        self.time_histograms, self.rating_histograms, self.mean_times = time_histograms, rating_histograms, self.get_mean_times()
\ No newline at end of file
@@ -0,0 +1,91 @@
+from datetime import datetime
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from stats.name_index import Postings, fold_name
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+YEAR_SUFFIX_PATTERN = re.compile(r"\s+\d{2}$")
+
+def to_text(value) -> str:
+    """ Missing values in the event guides come through as NaN """
+    return "" if pd.isna(value) else str(value)
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(fold_name(text))
+
+class RaceIndex:
+    """
+    Search index over the race lookup (race_id -> (prog_date, race_title, race_handle, race_country, prog_name)).
+
+    Races are numbered newest first, and every prefix of every word in the title, program name,
+    country and handle maps to the sorted numbers of the races containing it. A query matches
+    races where each of its words is the start of some word, so intersecting postings gives
+    matches already in date order. Races whose handle is the query, with or without its year
+    suffix (e.g. 'Yokohama' or 'Yokohama 24'), are returned first.
+    """
+    def __init__(self, race_lookup: Dict[int, Tuple]):
+        # Newest first, races without a date last
+        def sort_key(item):
+            prog_date = item[1][0]
+            return pd.Timestamp.min if pd.isna(prog_date) else pd.Timestamp(prog_date)
+        races = sorted(race_lookup.items(), key = sort_key, reverse = True)
+
+        # Search results are served as is, so build them once
+        results: List[dict] = []
+        prefix_postings: Dict[str, List[int]] = {}
+        exact_postings: Dict[str, List[int]] = {}
+
+        for position, (race_id, (prog_date, race_title, race_handle, race_country, prog_name)) in enumerate(races):
+            results.append({
+                "race_id": race_id,
+                "race_title": to_text(race_title),
+                "prog_name": to_text(prog_name),
+                "race_country": to_text(race_country),
+                "prog_date": "" if pd.isna(prog_date) else datetime.strftime(prog_date, "%d %B %Y"),
+                "race_handle": to_text(race_handle)
+            })
+
+            prefixes = set()
+            for field in (race_title, prog_name, race_country, race_handle):
+                for token in tokenize(to_text(field)):
+                    prefixes.update(token[:i] for i in range(1, len(token) + 1))
+            for prefix in prefixes:
+                prefix_postings.setdefault(prefix, []).append(position)
+
+            handle = " ".join(tokenize(to_text(race_handle)))
+            for exact in {handle, YEAR_SUFFIX_PATTERN.sub("", handle)}:
+                exact_postings.setdefault(exact, []).append(position)
+
+        self.results: pa.Table = pa.Table.from_pylist(results)
+        self.prefix_postings: Postings = Postings(prefix_postings)
+        self.exact_postings: Postings = Postings(exact_postings)
+
+    def __len__(self) -> int:
+        return self.results.num_rows
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """ Newest races matching every word of query, exact handle matches first """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        postings = [self.prefix_postings.get(token) for token in set(tokens)]
+        if any(positions is None for positions in postings):
+            return []
+
+        postings.sort(key = len)
+        matches = postings[0]
+        for positions in postings[1:]:
+            found = np.searchsorted(positions, matches).clip(max = len(positions) - 1)
+            matches = matches[positions[found] == matches]
+
+        exact = self.exact_postings.get(" ".join(tokens))
+        exact = [] if exact is None else exact[:limit].tolist()
+        exact_set = set(exact)
+        ordered = exact + [position for position in matches[:limit + len(exact)].tolist() if position not in exact_set]
+        return self.results.take(pa.array(ordered[:limit], type = pa.int64())).to_pylist()
@@ -0,0 +1,79 @@
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Optional, Set
+
+import pandas as pd
+
+WARNING_COLS = ["race_id", "athlete_id", "discipline", "value"]
+
+@dataclass(slots=True, frozen=True)
+class SplitWarning:
+    """
+    Suspicious split found while processing a race e.g. a run under 3 minutes.
+    """
+    race_id: int
+    athlete_id: int
+    discipline: str
+    value: float # Split time in seconds
+
+class WarningsLog:
+    """
+    In-memory collection of split warnings for a whole run of the ELO system.
+    Warnings are only written to disk once, on flush.
+    """
+    def __init__(self, warnings_file: Path):
+        self.warnings_file: Path = warnings_file
+        self.warnings: List[SplitWarning] = []
+
+    def __len__(self) -> int:
+        return len(self.warnings)
+
+    def clear(self) -> None:
+        self.warnings = []
+
+    def add(self, race_id: int, athlete_id: int, discipline: str, value: float) -> None:
+        self.warnings.append(
+            SplitWarning(
+                race_id = int(race_id),
+                athlete_id = int(athlete_id),
+                discipline = discipline,
+                value = float(value)
+            )
+        )
+
+    def get(self, race_id: Optional[int] = None, athlete_id: Optional[int] = None) -> List[SplitWarning]:
+        """ Return warnings collected so far, optionally filtered by race and/or athlete """
+        return [
+            w for w in self.warnings
+            if (race_id is None or w.race_id == race_id)
+            and (athlete_id is None or w.athlete_id == athlete_id)
+        ]
+
+    def to_df(self) -> pd.DataFrame:
+        return pd.DataFrame([asdict(w) for w in self.warnings], columns = WARNING_COLS)
+
+    def flush(self, replace_race_ids: Optional[Set[int]] = None) -> None:
+        """
+        Merge collected warnings into the warnings file, dropping rows already present.
+        Rows already in the file for replace_race_ids are dropped first, so races that were
+        processed again only keep their current warnings.
+        """
+        if not self.warnings and not (replace_race_ids and self.warnings_file.exists()):
+            return
+
+        warnings_df = self.to_df()
+        if self.warnings_file.exists():
+            existing_df = pd.read_csv(self.warnings_file, header = 0)
+            if replace_race_ids and "race_id" in existing_df.columns:
+                existing_df = existing_df[~existing_df["race_id"].isin(replace_race_ids)]
+            # Either side can be empty now, leave it out as concat won't infer dtypes from it
+            frames = [df for df in (existing_df, warnings_df) if not df.empty]
+            warnings_df = pd.concat(frames, ignore_index = True) if frames else warnings_df
+
+        # Older files only have athlete_id and discipline columns
+        warnings_df = warnings_df.reindex(columns = WARNING_COLS)
+        warnings_df = warnings_df.astype({"race_id": "Int64", "athlete_id": "Int64"})
+        warnings_df = warnings_df.drop_duplicates(subset = WARNING_COLS)
+        warnings_df.to_csv(self.warnings_file, index = False)
+
+        print(f"Saved {len(self.warnings)} split warnings to {self.warnings_file}")
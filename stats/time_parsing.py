@@ -0,0 +1,146 @@
+from ast import literal_eval
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Older events include empty string splits, DNF/DQ/LAP/NC have no time either.
+# All are treated as 0 so they are ignored in later ELO calculations
+ZERO_TIME_STRINGS = frozenset(['None', '', 'DNF', 'DQ', 'LAP', 'NC'])
+
+# Layout of almost every time and split list returned by the results API.
+# Values matching these exactly are converted with array arithmetic, anything else
+# goes through the original scalar parsing so the results are identical
+TIME_TEMPLATE = "00:00:00"
+SPLITS_TEMPLATE = "[" + ", ".join(f"'{TIME_TEMPLATE}'" for _ in range(5)) + "]"
+SPLIT_COUNT = 5
+
+def time_to_seconds(time_str: str) -> float:
+    """
+    Convert various time string formats to seconds.
+    Returns 0 for DNF/DNS/DQ/LAP, float('inf') for invalid/missing times.
+    """
+    try:
+        if time_str in ZERO_TIME_STRINGS:
+            return 0
+
+        if pd.isna(time_str):
+            return float('inf')
+
+        parts = time_str.strip().split(':')
+        if len(parts) == 3: # HH:MM:SS format
+            hours, minutes, seconds = map(float, parts)
+            return hours * 3600 + minutes * 60 + seconds
+        elif len(parts) == 2: # MM:SS format
+            minutes, seconds = map(float, parts)
+            return minutes * 60 + seconds
+        elif len(parts) == 1: # SS format
+            return float(parts[0])
+        else:
+            return float('inf')
+    except:
+        return float('inf')
+
+def _to_code_points(values: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert object array to an (n x width) array of unicode code points.
+
+    Returns:
+        (code points, mask of values that are strings of exactly width characters)
+    """
+    fixed = values.astype(f"U{width}")
+    codes = fixed.view(np.uint32).reshape(len(values), width)
+
+    # Longer strings are truncated and non-strings stringified by astype, both fail this
+    is_exact = (fixed == values) & (codes[:, -1] != 0)
+    return codes, is_exact
+
+def _hhmmss_to_seconds(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert (n x 8) code points in HH:MM:SS layout to seconds.
+
+    Returns:
+        (mask of rows in valid HH:MM:SS layout, seconds)
+    """
+    # Unsigned subtraction wraps anything below '0' to a large value
+    digits = codes[:, [0, 1, 3, 4, 6, 7]] - ord('0')
+    is_valid = (
+        (digits <= 9).all(axis = 1)
+        & (codes[:, 2] == ord(':'))
+        & (codes[:, 5] == ord(':'))
+    )
+
+    digits = digits.astype(float)
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 2] * 10 + digits[:, 3]
+    seconds = digits[:, 4] * 10 + digits[:, 5]
+    return is_valid, hours * 3600 + minutes * 60 + seconds
+
+def times_to_seconds(times: pd.Series) -> pd.Series:
+    """
+    Vectorised time_to_seconds for a whole column, same result element by element.
+    HH:MM:SS strings are converted with array arithmetic, DNF etc. map to 0 and
+    anything else falls back to time_to_seconds.
+    """
+    times = pd.Series(times, dtype = object)
+    values = times.to_numpy()
+    seconds = np.full(len(values), np.inf)
+    if len(values) == 0:
+        return pd.Series(seconds, index = times.index)
+
+    codes, is_exact = _to_code_points(values, len(TIME_TEMPLATE))
+    is_valid, parsed = _hhmmss_to_seconds(codes)
+    is_parsed = is_exact & is_valid
+    seconds[is_parsed] = parsed[is_parsed]
+
+    is_zero = times.isin(ZERO_TIME_STRINGS).to_numpy()
+    seconds[is_zero] = 0.0
+
+    # MM:SS, SS, decimals, whitespace, None/NaN etc.
+    for i in np.flatnonzero(~is_parsed & ~is_zero):
+        seconds[i] = time_to_seconds(values[i])
+
+    return pd.Series(seconds, index = times.index)
+
+def splits_to_seconds(splits: pd.Series) -> pd.DataFrame:
+    """
+    Convert a column of split list strings e.g. "['00:09:29', '00:00:42', ...]" into a DataFrame
+    of [swim, t1, bike, t2, run] times in seconds (columns 0-4).
+
+    Rows of five HH:MM:SS strings are converted with array arithmetic. Other rows go
+    through literal_eval and time_to_seconds, as before, so malformed lists still raise.
+    """
+    values = splits.to_numpy(dtype = object)
+    seconds = np.full((len(values), SPLIT_COUNT), np.nan)
+
+    codes, is_standard = _to_code_points(values, len(SPLITS_TEMPLATE))
+
+    # Brackets, quotes and separators must match the template exactly
+    template = np.array([ord(c) for c in SPLITS_TEMPLATE], dtype = np.uint32)
+    time_starts = [SPLITS_TEMPLATE.index(TIME_TEMPLATE, 2 + 12 * i) for i in range(SPLIT_COUNT)]
+    is_separator = np.ones(len(SPLITS_TEMPLATE), dtype = bool)
+    for start in time_starts:
+        is_separator[start:start + len(TIME_TEMPLATE)] = False
+    is_standard &= (codes[:, is_separator] == template[is_separator]).all(axis = 1)
+
+    for i, start in enumerate(time_starts):
+        is_valid, parsed = _hhmmss_to_seconds(codes[:, start:start + len(TIME_TEMPLATE)])
+        is_standard &= is_valid
+        seconds[:, i] = parsed
+
+    # Anything else e.g. DNF rows with empty splits, None splits, lists of a different length
+    other_idx = np.flatnonzero(~is_standard)
+    other_seconds = [[time_to_seconds(x) for x in literal_eval(values[i])] for i in other_idx]
+
+    split_count = max(
+        [SPLIT_COUNT if is_standard.any() else 0] + [len(row) for row in other_seconds]
+    )
+    if split_count != SPLIT_COUNT:
+        raise ValueError(f"Expected {SPLIT_COUNT} splits per result, found {split_count}")
+
+    # Short lists are padded with NaN, as expanding them with pd.Series did
+    for i, row in zip(other_idx, other_seconds):
+        seconds[i] = np.nan
+        seconds[i, :len(row)] = row
+
+    return pd.DataFrame(seconds, index = splits.index)
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# stats/elo.py is run as a script from stats/, so its sibling modules import without the package prefix
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "stats")]
+
+@pytest.fixture
+def leaderboard_df() -> pd.DataFrame:
+    """ Synthetic leaderboard with the columns stats/elo.py writes, sorted by overall rank """
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "athlete_id": np.arange(n) + 1000,
+        "name": [f"Athlete {i}" for i in range(n)],
+        "country_full": rng.choice(["Great Britain", "France", "Spain", "New Zealand", "Japan"], n, p = [0.4, 0.3, 0.1, 0.1, 0.1]),
+        "country_alpha3": "GBR",
+        "country_emoji": "🇬🇧",
+        "year_of_birth": np.where(rng.random(n) < 0.1, 0, rng.integers(1940, 2012, n)),
+        "active": rng.random(n) < 0.4,
+        "race_starts": rng.integers(1, 50, n)
+    })
+    for disc in ["overall", "swim", "bike", "run", "transition"]:
+        df[f"{disc}_rating"] = rng.integers(1000, 3000, n).astype(float)
+        df[f"{disc}_change"] = np.where(rng.random(n) < 0.3, rng.normal(0, 50, n).round(1), 0.0)
+        df[f"{disc}_rank"] = df[f"{disc}_rating"].rank(method = "min", ascending = False).astype(int)
+        df[f"{disc}_change_rank"] = df[f"{disc}_change"].rank(method = "min", ascending = False).astype(int)
+    return df.set_index("athlete_id").sort_values("overall_rank", kind = "stable")
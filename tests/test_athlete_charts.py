@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from stats.athlete_charts import PCT_BEHIND_COLUMNS, RATING_COLUMNS, SPLIT_COLUMNS, AthleteCharts, make_chart_series, write_athlete_charts
+
+def random_athlete(rng: np.random.Generator, n_races: int) -> SimpleNamespace:
+    """ Only what the chart series read, fractional, missing (NaN/None) and unparseable (inf) splits included """
+    def value(low, high):
+        return rng.choice([np.nan, np.inf, None, round(float(rng.uniform(low, high)), 1)], p = [0.05, 0.05, 0.05, 0.85])
+    dates = sorted(datetime(2015, 1, 1) + timedelta(days = int(day)) for day in rng.integers(0, 3000, n_races))
+    rating_history = [
+        SimpleNamespace(race_id = int(rng.integers(0, 40)), race_date = race_date, **{column: float(rng.uniform(500, 2500)) for column in RATING_COLUMNS})
+        for race_date in dates
+    ]
+    race_results = [
+        SimpleNamespace(
+            race_id = int(rng.integers(0, 40)), race_date = race_date,
+            **{column: value(500, 4000) for column in SPLIT_COLUMNS}, **{column: value(0, 0.3) for column in PCT_BEHIND_COLUMNS}
+        )
+        for race_date in dates
+    ]
+    return SimpleNamespace(rating_history = rating_history, race_results = race_results)
+
+@pytest.fixture(scope = "module")
+def athletes() -> dict:
+    rng = np.random.default_rng(0)
+    return {athlete_id: random_athlete(rng, int(rng.integers(0, 30))) for athlete_id in range(1000, 1060)}
+
+@pytest.fixture(scope = "module")
+def race_lookup() -> dict:
+    return {race_id: (None, f"Race {race_id}" if race_id % 7 else np.nan) for race_id in range(35)}
+
+def test_stored_series_match_athlete_record(tmp_path, athletes, race_lookup):
+    """ The page falls back to make_chart_series for athletes missing from the file, both must agree """
+    charts_path = tmp_path / "athletes.charts"
+    write_athlete_charts(athletes, race_lookup, charts_path)
+    charts = AthleteCharts(charts_path)
+
+    assert len(charts) == len(athletes)
+    assert charts.get(999) is None
+    for athlete_id, athlete in athletes.items():
+        stored, built = charts.get(athlete_id), make_chart_series(athlete, race_lookup)
+        assert stored.rating_dates == built.rating_dates
+        assert stored.rating_race_names == built.rating_race_names
+        assert stored.result_dates == built.result_dates
+        assert stored.result_race_names == built.result_race_names
+        for column in ("ratings", "splits", "pct_behind"):
+            np.testing.assert_array_equal(getattr(stored, column), getattr(built, column))
+
+def test_fractional_splits_kept(athletes, race_lookup):
+    for athlete in athletes.values():
+        series = make_chart_series(athlete, race_lookup)
+        results = sorted(athlete.race_results, key = lambda x: x.race_date, reverse = True)
+        expected = [[0 if value is None or not np.isfinite(value) else value for value in (getattr(result, column) for column in SPLIT_COLUMNS)] for result in results]
+        np.testing.assert_allclose(series.splits.reshape(-1, len(SPLIT_COLUMNS)), np.array(expected, dtype = float).reshape(-1, len(SPLIT_COLUMNS)), atol = 1e-3)
+        assert series.result_dates == [result.race_date.strftime("%Y-%m-%d") for result in results]
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from elo import TriathlonELOSystem
+from race_warnings import WarningsLog
+
+@pytest.fixture
+def elo_system() -> TriathlonELOSystem:
+    # Only the scale is needed to compute changes, skip loading the race guide
+    system = TriathlonELOSystem.__new__(TriathlonELOSystem)
+    system.scale = 46175.8
+    return system
+
+def pairwise_elo_changes(system: TriathlonELOSystem, ratings: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """ The original loop over every pair of athletes that get_elo_change_matrix replaces """
+    elo_changes = np.zeros(ratings.shape)
+    for i in range(len(ratings)):
+        for j in range(i + 1, len(ratings)):
+            for k in range(ratings.shape[1]):
+                time1, time2 = times[i, k], times[j, k]
+                if time1 in (float('inf'), 0) or time2 in (float('inf'), 0):
+                    continue
+
+                change = system.get_logtime_elo(ratings[i, k], ratings[j, k], time1, time2)
+                elo_changes[i, k] += change
+                elo_changes[j, k] -= change
+    return elo_changes
+
+def random_race(rng: np.random.Generator, n: int):
+    ratings = rng.normal(1500, 150, size = (n, 5))
+    times = rng.uniform(20, 7200, size = (n, 5)).round()
+
+    # DNFs and missing splits
+    times[rng.random(size = times.shape) < 0.1] = 0
+    times[rng.random(size = times.shape) < 0.1] = np.inf
+    return ratings, times
+
+@pytest.mark.parametrize("seed", range(20))
+def test_elo_change_matrix_matches_pairwise(elo_system, seed):
+    rng = np.random.default_rng(seed)
+    ratings, times = random_race(rng, int(rng.integers(1, 60)))
+
+    expected = pairwise_elo_changes(elo_system, ratings, times)
+    actual = elo_system.get_elo_change_matrix(ratings, times)
+
+    np.testing.assert_allclose(actual, expected, rtol = 1e-9, atol = 1e-9)
+
+def test_elo_change_matrix_invalid_times(elo_system):
+    ratings = np.full((3, 5), 1500.0)
+    times = np.array([
+        [3600, 600, 1800, 1200, 60],
+        [0, 0, 0, 0, 0], # DNF
+        [3700, np.inf, 1900, 1250, 65] # Missing swim
+    ], dtype = float)
+
+    changes = elo_system.get_elo_change_matrix(ratings, times)
+
+    assert np.all(changes[1] == 0)
+    assert changes[0, 1] == 0 and changes[2, 1] == 0
+    np.testing.assert_allclose(changes[0] + changes[2], 0, atol = 1e-12)
+    assert changes[0, 0] > 0
+
+def make_state_system(warnings_file) -> TriathlonELOSystem:
+    """ Just enough of the system to save and load state, skip loading the race guide """
+    system = TriathlonELOSystem.__new__(TriathlonELOSystem)
+    system.scale = 46175.8
+    system.k_factor = 16
+    system.corrections_df = pd.DataFrame(columns = ["race_id"])
+    system.ignored_race_ids = set()
+    system.warnings_log = WarningsLog(warnings_file)
+    system.reset_state()
+    return system
+
+def test_checkpoint_keeps_split_warnings(tmp_path):
+    """ Warnings of races before a checkpoint are written by the run that resumes from it, once """
+    warnings_file = tmp_path / "warnings.csv"
+    system = make_state_system(warnings_file)
+    system.processed_prog_ids = [1, 2]
+    system.warnings_log.add(1, 100, "run", 150.0)
+    system.warnings_log.add(2, 101, "swim", 30.0)
+    system.save_state(tmp_path / "checkpoint.pkl", quiet = True)
+    system.warnings_log.add(3, 102, "bike", 60.0) # After the checkpoint, lost with the crashed run
+
+    resumed = make_state_system(warnings_file)
+    assert resumed.load_state(tmp_path / "checkpoint.pkl")
+    assert resumed.warnings_log.get() == system.warnings_log.get()[:2]
+
+    resumed.processed_prog_ids.append(3)
+    resumed.warnings_log.add(3, 102, "bike", 60.0)
+    resumed.warnings_log.flush(replace_race_ids = set(resumed.processed_prog_ids))
+    assert pd.read_csv(warnings_file).values.tolist() == [[1, 100, "run", 150.0], [2, 101, "swim", 30.0], [3, 102, "bike", 60.0]]
+
+    # A full replay after loading state starts without the restored warnings
+    resumed.reset_state()
+    assert len(resumed.warnings_log) == 0
+
+def test_flush_replaces_reprocessed_races(tmp_path):
+    warnings_file = tmp_path / "warnings.csv"
+    pd.DataFrame(
+        [[1, 100, "run", 150.0], [2, 101, "swim", 30.0], [9, 103, "run", 140.0]],
+        columns = ["race_id", "athlete_id", "discipline", "value"]
+    ).to_csv(warnings_file, index = False)
+
+    # Race 2 was reprocessed with a corrected split and race 1 no longer has a warning
+    log = WarningsLog(warnings_file)
+    log.add(2, 101, "swim", 31.0)
+    log.flush(replace_race_ids = {1, 2})
+    assert pd.read_csv(warnings_file).values.tolist() == [[9, 103, "run", 140.0], [2, 101, "swim", 31.0]]
+
+    # Without replace_race_ids rows are merged as before
+    log.clear()
+    log.add(9, 104, "bike", 50.0)
+    log.flush()
+    assert len(pd.read_csv(warnings_file)) == 3
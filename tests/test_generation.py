@@ -0,0 +1,94 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.routers import health
+from stats import generation
+from stats.generation import Generation, GenerationWatcher, generation_cached, swap_generation
+
+@pytest.fixture
+def data_version(monkeypatch):
+    """ Version of the data "on disk", set through the returned dict """
+    disk = {"version": "v1"}
+    monkeypatch.setattr(generation, "read_data_version", lambda: disk["version"])
+    monkeypatch.setattr(generation, "read_data_modified", lambda: 0.0)
+
+    previous = swap_generation(Generation(None))
+    yield disk
+    swap_generation(previous)
+
+def ready_client(watcher: GenerationWatcher) -> TestClient:
+    app = FastAPI()
+    app.include_router(health.router)
+    app.state.watcher = watcher
+    return TestClient(app)
+
+def test_ready_reports_warming_then_ready(data_version):
+    release = threading.Event()
+    loading = threading.Event()
+
+    def slow_loader():
+        loading.set()
+        assert release.wait(5)
+
+    watcher = GenerationWatcher([slow_loader], interval = 60)
+    client = ready_client(watcher)
+    watcher.start()
+    try:
+        assert loading.wait(5)
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"status": "warming", "generation": "v1"}
+
+        release.set()
+        for _ in range(500):
+            if generation.current_generation().loaded:
+                break
+            watcher.stop_event.wait(0.01)
+        assert client.get("/ready").json() == {"status": "ready", "generation": "v1"}
+    finally:
+        release.set()
+        watcher.stop()
+
+def test_failed_generation_retried_on_next_check(data_version):
+    attempts = []
+
+    def flaky_loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("half-written file")
+
+    watcher = GenerationWatcher([flaky_loader])
+    client = ready_client(watcher)
+
+    assert not watcher.check()
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "failed", "generation": "v1"}
+
+    assert watcher.check()
+    assert client.get("/ready").json() == {"status": "ready", "generation": "v1"}
+    assert watcher.failed_version is None
+
+def test_missing_data(data_version):
+    data_version["version"] = None
+    watcher = GenerationWatcher([])
+    assert not watcher.check()
+    assert ready_client(watcher).get("/ready").json()["status"] == "missing"
+
+def test_swap_drops_cached_values(data_version):
+    calls = []
+
+    @generation_cached
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    watcher = GenerationWatcher([loader])
+    assert watcher.check() and loader() == 1
+
+    data_version["version"] = "v2"
+    assert watcher.check() and loader() == 2
+    assert not watcher.check() and loader() == 2
@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.routers.comparison import format_h2h_times
+from stats.h2h_pairs import H2HPairs, write_h2h_pairs
+
+def random_athletes(rng: np.random.Generator, n_athletes: int = 30, n_races: int = 40) -> dict:
+    """ Athletes with only what the pair table reads, DNFs (0), unparseable times (inf) and repeated results included """
+    athletes = {athlete_id: SimpleNamespace(race_results = []) for athlete_id in range(100, 100 + n_athletes)}
+    for race_id in range(n_races):
+        race_date = date(2020, 1, 1) + timedelta(days = int(rng.integers(0, 1500)))
+        starters = rng.choice(list(athletes), size = int(rng.integers(1, 12)), replace = False)
+        for athlete_id in starters.tolist():
+            overall_s = float(rng.choice([0, np.inf, *rng.integers(3500, 3700, size = 8)]))
+            athletes[athlete_id].race_results.append(SimpleNamespace(race_id = race_id, race_date = race_date, overall_s = overall_s))
+            if rng.random() < 0.05:
+                athletes[athlete_id].race_results.append(SimpleNamespace(race_id = race_id, race_date = race_date, overall_s = 1.0))
+    return athletes
+
+def merged_record(results1: list, results2: list):
+    """ Record as the compare page works it out: first result per race, winner from format_h2h_times """
+    first1 = {r.race_id: r for r in reversed(results1)}
+    first2 = {r.race_id: r for r in reversed(results2)}
+    races, wins, losses, last = 0, 0, 0, None
+    for race_id in first1.keys() & first2.keys():
+        time1, time2 = format_h2h_times(first1[race_id].overall_s, first2[race_id].overall_s)
+        races += 1
+        wins += time1.get("css_class") == "h2h-winner"
+        losses += time2.get("css_class") == "h2h-winner"
+        last = max(last or first1[race_id].race_date, first1[race_id].race_date)
+    return races, wins, losses, last
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pair_table_matches_race_merge(tmp_path, seed):
+    athletes = random_athletes(np.random.default_rng(seed))
+    write_h2h_pairs(athletes, tmp_path / "athletes.h2h")
+    pairs = H2HPairs(tmp_path / "athletes.h2h")
+
+    for athlete_id, athlete in athletes.items():
+        for rival_id, rival in athletes.items():
+            races, wins, losses, last = merged_record(athlete.race_results, rival.race_results)
+            summary = pairs.get(athlete_id, rival_id)
+            if athlete_id == rival_id or races == 0:
+                assert summary is None
+                continue
+            assert (summary.races, summary.wins, summary.losses, summary.last_date) == (races, wins, losses, last)
+
+def test_rivals_most_races_first(tmp_path):
+    athletes = random_athletes(np.random.default_rng(0))
+    write_h2h_pairs(athletes, tmp_path / "athletes.h2h")
+    pairs = H2HPairs(tmp_path / "athletes.h2h")
+
+    rivals = pairs.rivals(100, limit = 100)
+    assert [(r.races, r.last_date) for r in rivals] == sorted(((r.races, r.last_date) for r in rivals), reverse = True)
+    assert {r.rival_id for r in rivals} == {
+        rival_id for rival_id in athletes
+        if rival_id != 100 and merged_record(athletes[100].race_results, athletes[rival_id].race_results)[0]
+    }
+    assert pairs.rivals(1) == []
@@ -0,0 +1,95 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.routers import leaderboard
+from stats.leaderboard_index import LeaderboardIndex, SelectionCache
+from test_leaderboard_index import filter_with_pandas
+
+@pytest.fixture
+def selection_cache(monkeypatch, leaderboard_df) -> SelectionCache:
+    """ Both leaderboards served from the synthetic one, with a fresh selection cache counting stores """
+    index = LeaderboardIndex(leaderboard_df)
+    monkeypatch.setattr(leaderboard, "get_female_short_leaderboard_index", lambda: index)
+    monkeypatch.setattr(leaderboard, "get_male_short_leaderboard_index", lambda: index)
+
+    cache = SelectionCache(maxsize = 4, ttl = 600)
+    cache.stores = 0
+    store = cache.put
+    def counting_put(key, positions):
+        cache.stores += 1
+        return store(key, positions)
+    cache.put = counting_put
+    monkeypatch.setattr(leaderboard, "get_selection_cache", lambda: cache)
+    return cache
+
+def walk_pages(filters: dict) -> list:
+    """ Athlete ids of every page, following the cursor like "load more" does """
+    athletes, cursor = leaderboard.get_leaderboard_athletes(**filters)
+    athlete_ids = [athlete["athlete_id"] for athlete in athletes]
+    while cursor:
+        token, offset = leaderboard.parse_cursor(cursor)
+        athletes, cursor = leaderboard.get_leaderboard_athletes(**filters, offset = offset, token = token)
+        assert athletes, "Cursor pointed past the end"
+        assert athletes[0]["rank"] == len(athlete_ids) + 1
+        athlete_ids.extend(athlete["athlete_id"] for athlete in athletes)
+    return athlete_ids
+
+FILTERS = [
+    dict(gender = "female", disc = "overall", order = "top", country = "all", yob_start = 1950, yob_end = 2010, active_only = False),
+    dict(gender = "male", disc = "run", order = "hot", country = "all", yob_start = None, yob_end = None, active_only = False),
+    dict(gender = "female", disc = "swim", order = "top", country = "France", yob_start = 1980, yob_end = 2000, active_only = True),
+    dict(gender = "female", disc = "bike", order = "top", country = "Atlantis", yob_start = 1950, yob_end = 2010, active_only = False),
+    dict(gender = "female", disc = "transition", order = "top", country = "Japan", yob_start = None, yob_end = None, active_only = False)
+]
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_cursor_walk_returns_every_row_once_in_order(selection_cache, leaderboard_df, filters):
+    expected = filter_with_pandas(leaderboard_df, filters["disc"], filters["order"], filters["country"], filters["yob_start"], filters["yob_end"], filters["active_only"])
+    athlete_ids = walk_pages(filters)
+    assert athlete_ids == expected.index.tolist()
+    # Stored on the first page only, later pages are cache hits
+    assert selection_cache.stores == 1
+
+def test_cursor_from_other_filters(selection_cache, leaderboard_df):
+    """ A cursor kept after the filters change pages through the new filters, not the old selection """
+    first, second = FILTERS[0], FILTERS[2]
+    _, cursor = leaderboard.get_leaderboard_athletes(**first)
+    token, offset = leaderboard.parse_cursor(cursor)
+
+    athletes, _ = leaderboard.get_leaderboard_athletes(**second, offset = offset, token = token)
+    expected = filter_with_pandas(leaderboard_df, second["disc"], second["order"], second["country"], second["yob_start"], second["yob_end"], second["active_only"])
+    assert [athlete["athlete_id"] for athlete in athletes] == expected.index[offset:offset + leaderboard.PAGE_SIZE].tolist()
+
+    # The first selection is still cached for whoever is paging through it
+    assert selection_cache.get(token, selection_cache.entries[token][0]) is not None
+    assert walk_pages(first) == filter_with_pandas(leaderboard_df, "overall", "top", "all", 1950, 2010, False).index.tolist()
+    assert selection_cache.stores == 2
+
+def test_cursor_after_eviction(selection_cache, leaderboard_df):
+    """ The filter params rebuild the selection when the cursor's entry is gone """
+    filters = FILTERS[0]
+    _, cursor = leaderboard.get_leaderboard_athletes(**filters)
+    selection_cache.clear()
+    token, offset = leaderboard.parse_cursor(cursor)
+    athletes, _ = leaderboard.get_leaderboard_athletes(**filters, offset = offset, token = token)
+    expected = filter_with_pandas(leaderboard_df, "overall", "top", "all", 1950, 2010, False)
+    assert [athlete["athlete_id"] for athlete in athletes] == expected.index[offset:offset + leaderboard.PAGE_SIZE].tolist()
+
+def test_more_endpoint_follows_cursor_header(selection_cache, leaderboard_df):
+    app = FastAPI()
+    app.include_router(leaderboard.router)
+    client = TestClient(app)
+
+    params = {"gender": "female", "disc": "overall", "order": "top", "country": "Great Britain"}
+    expected = filter_with_pandas(leaderboard_df, "overall", "top", "Great Britain", 1950, 2010, False)
+    pages, cursor = 0, ""
+    while True:
+        response = client.get("/leaderboard/more", params = {**params, "cursor": cursor} if cursor else params)
+        assert response.status_code == 200
+        pages += 1
+        cursor = response.headers["X-Next-Cursor"]
+        if not cursor:
+            break
+    assert pages == -(-len(expected) // leaderboard.PAGE_SIZE)
+    assert selection_cache.stores == 1
@@ -0,0 +1,71 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats.cache import use_arrow_strings
+from stats.leaderboard_index import DISCIPLINES, ORDERS, LeaderboardIndex
+
+FILTERS = [
+    # country, yob_start, yob_end, active_only
+    ("all", None, None, False),
+    ("all", 1950, 2010, False),
+    ("France", 1950, 2010, True),
+    ("Great Britain", None, 1990, False),
+    ("Japan", 1985, None, True),
+    ("Atlantis", 1950, 2010, False), # No athletes
+    ("all", 2000, 1990, False), # Empty range
+    ("all", 0, 0, True) # 0 means no bound
+]
+
+def filter_with_pandas(df: pd.DataFrame, disc: str, order: str, country: str, yob_start, yob_end, active_only: bool) -> pd.DataFrame:
+    """ The DataFrame filters and sorts the leaderboard page used to run per request """
+    if active_only:
+        df = df[df["active"]]
+    if country != "all":
+        df = df[df["country_full"] == country]
+    if yob_start:
+        df = df[df["year_of_birth"] >= yob_start]
+    if yob_end:
+        df = df[df["year_of_birth"] <= yob_end]
+    if order == "top":
+        df = df.sort_values(f"{disc}_rank", kind = "stable")
+    if order == "hot":
+        df = df[df[f"{disc}_change"] != 0].sort_values(f"{disc}_change_rank", kind = "stable")
+    return df
+
+@pytest.mark.parametrize("disc,order", list(itertools.product(DISCIPLINES, ORDERS)))
+def test_select_matches_dataframe_filters(leaderboard_df, disc, order):
+    index = LeaderboardIndex(leaderboard_df)
+    for filters in FILTERS:
+        expected = filter_with_pandas(leaderboard_df, disc, order, *filters)
+        positions = index.select(disc, order, *filters)
+        assert leaderboard_df.index[positions].tolist() == expected.index.tolist(), filters
+
+def test_mask_matches_dataframe_facets(leaderboard_df):
+    index = LeaderboardIndex(leaderboard_df)
+    df = leaderboard_df
+    assert index.get_mask() is None
+    np.testing.assert_array_equal(index.get_mask(active_only = True), df["active"].to_numpy())
+    np.testing.assert_array_equal(index.get_mask(country = "Spain"), (df["country_full"] == "Spain").to_numpy())
+    np.testing.assert_array_equal(
+        index.get_mask(country = "France", yob_start = 1970, yob_end = 1990, active_only = True),
+        (df["active"] & (df["country_full"] == "France") & df["year_of_birth"].between(1970, 1990)).to_numpy()
+    )
+
+def test_page_matches_dataframe_records(leaderboard_df):
+    df = use_arrow_strings(leaderboard_df)
+    index = LeaderboardIndex(df)
+    positions = index.select("swim", "hot", "France", 1950, 2010, False)
+    expected = filter_with_pandas(df, "swim", "hot", "France", 1950, 2010, False)
+
+    for offset in (0, 50, len(positions) - 10):
+        chunk = expected.iloc[offset:offset + 50].copy()
+        chunk["rank"] = range(offset + 1, offset + len(chunk) + 1)
+        assert index.get_page(positions, offset, 50) == chunk.reset_index().to_dict(orient = "records")
+
+def test_empty_leaderboard(leaderboard_df):
+    index = LeaderboardIndex(leaderboard_df.iloc[:0])
+    assert len(index) == 0
+    assert len(index.select("overall", "top", "France", 1950, 2010, True)) == 0
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats.name_index import NameIndex, fold_name
+
+SYLLABLES = ["an", "mar", "son", "ton", "el", "li", "ber", "ro", "ka", "ie", "van", "de"]
+
+@pytest.fixture(scope = "module")
+def athlete_lookup() -> pd.DataFrame:
+    """ ASCII names sorted by rating like the real lookup, some shared syllables so queries hit many names """
+    rng = np.random.default_rng(0)
+    def word():
+        return "".join(rng.choice(SYLLABLES, size = int(rng.integers(1, 4)))).title()
+    names = [f"{word()} {word()}" for _ in range(3000)]
+    return pd.DataFrame({"name": names, "rating": np.sort(rng.random(3000))[::-1]}, index = pd.Index(np.arange(3000) + 1000, name = "athlete_id"))
+
+@pytest.fixture(scope = "module")
+def name_index(athlete_lookup) -> NameIndex:
+    return NameIndex.from_lookup(athlete_lookup)
+
+def contains_positions(names: pd.Series, query: str, limit: int) -> list:
+    """ The str.contains filter the search endpoints used to run over the whole lookup """
+    return np.flatnonzero(names.str.contains(query, case = False, regex = False).to_numpy())[:limit].tolist()
+
+@pytest.mark.parametrize("query", ["an", "ma", "mar", "Son", "ANTON", "berro", "n m", " e m ", "ton van", "xyz", "qq"])
+@pytest.mark.parametrize("limit", [5, 50, 10_000])
+def test_search_matches_str_contains(athlete_lookup, name_index, query, limit):
+    expected = contains_positions(athlete_lookup["name"], query.strip(), limit)
+    assert name_index.search(query, limit).tolist() == expected
+
+def test_search_ignores_accents():
+    names = pd.Series(["Martin Štefan", "Stefan Søren", "Luka Dumančić", "Ana Muñoz", "Jörg Æbelø", "Stefano Rossi"])
+    index = NameIndex(names)
+    folded = names.map(fold_name)
+    for query in ["stefan", "ŠTEF", "soren", "dumancic", "munoz", "ñoz", "aebelo", "jorg"]:
+        assert index.search(query).tolist() == contains_positions(folded, fold_name(query), 50), query
+    assert index.search("stefan").tolist() == [0, 1, 5]
+
+def test_search_is_literal_and_needs_two_characters():
+    index = NameIndex(["Anna (Jr) Smith", "A.J. Smith", "Ajax Smith", None])
+    assert index.search("(jr)").tolist() == [0]
+    assert index.search("a.j").tolist() == [1] # Not a regex
+    assert index.search("a").tolist() == []
+    assert index.search("  ").tolist() == []
+
+def test_missing_names_from_lookup():
+    lookup = pd.DataFrame({"name": ["Ana Lima", np.nan, "Lima Ana"]})
+    index = NameIndex.from_lookup(lookup)
+    assert len(index) == 3
+    assert index.search("lima").tolist() == [0, 2]
+    assert index.search("nan").tolist() == []
@@ -0,0 +1,96 @@
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+
+from stats.profile_images import prefetch_profile_images
+
+IMAGE = b"\xff\xd8\xff\xe0 fixture jpeg \xff\xd9"
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """ Local stand-in for the image host """
+    requests = Counter()
+
+    def do_GET(self):
+        self.requests[self.path] += 1
+        if self.path == "/slow.jpg":
+            time.sleep(1)
+        if self.path == "/flaky.jpg" and self.requests[self.path] == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path in ("/a.jpg", "/flaky.jpg", "/slow.jpg"):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.end_headers()
+            self.wfile.write(IMAGE)
+            return
+        self.send_response(404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def image_host():
+    ImageHandler.requests = Counter()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", ImageHandler.requests
+    server.shutdown()
+    server.server_close()
+
+def prefetch(pairs, tmp_path, **kwargs):
+    return prefetch_profile_images(
+        pairs, img_dir = tmp_path / "imgs", manifest_path = tmp_path / "manifest.json",
+        max_workers = 4, backoff_s = 0, timeout_s = 0.3, **kwargs
+    )
+
+def load_manifest(tmp_path) -> dict:
+    with open(tmp_path / "manifest.json") as f:
+        return json.load(f)
+
+def test_fetches_and_shares_urls(tmp_path, image_host):
+    host, requests = image_host
+    summary = prefetch({1: f"{host}/a.jpg", 2: f"{host}/a.jpg", 3: f"{host}/flaky.jpg"}, tmp_path)
+
+    assert (summary.fetched, summary.copied, summary.failed) == (2, 1, 0)
+    for athlete_id in (1, 2, 3):
+        assert (tmp_path / "imgs" / f"{athlete_id}.jpg").read_bytes() == IMAGE
+    assert requests["/a.jpg"] == 1
+    assert requests["/flaky.jpg"] == 2 # 503 retried
+    assert not list((tmp_path / "imgs").glob("*.tmp"))
+    assert set(load_manifest(tmp_path)["fetched"]) == {f"{host}/a.jpg", f"{host}/flaky.jpg"}
+
+def test_not_found_and_timeout_recorded_as_failed(tmp_path, image_host):
+    host, requests = image_host
+    summary = prefetch({1: f"{host}/missing.jpg", 2: f"{host}/slow.jpg"}, tmp_path)
+
+    assert (summary.fetched, summary.failed) == (0, 2)
+    assert requests["/missing.jpg"] == 1 # 404 not retried
+    assert requests["/slow.jpg"] == 3 # Timeouts retried up to MAX_ATTEMPTS
+    assert not list((tmp_path / "imgs").iterdir())
+    failed = load_manifest(tmp_path)["failed"]
+    assert failed[f"{host}/missing.jpg"] == "HTTP 404"
+    assert "Timeout" in failed[f"{host}/slow.jpg"]
+
+    # Skipped on the next run unless asked to retry
+    assert prefetch({1: f"{host}/missing.jpg"}, tmp_path).skipped == 1
+    assert requests["/missing.jpg"] == 1
+    prefetch({1: f"{host}/missing.jpg"}, tmp_path, retry_failed = True)
+    assert requests["/missing.jpg"] == 2
+
+def test_cached_images_not_requested_again(tmp_path, image_host):
+    host, requests = image_host
+    prefetch({1: f"{host}/a.jpg"}, tmp_path)
+
+    # Already on disk, and a new athlete sharing a fetched URL is copied
+    summary = prefetch({1: f"{host}/a.jpg", 4: f"{host}/a.jpg"}, tmp_path)
+    assert (summary.fetched, summary.copied, summary.skipped) == (0, 1, 1)
+    assert (tmp_path / "imgs" / "4.jpg").read_bytes() == IMAGE
+    assert requests["/a.jpg"] == 1
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats.race_index import RaceIndex, YEAR_SUFFIX_PATTERN, tokenize
+
+VENUES = ["Yokohama", "Hamburg", "Abu Dhabi", "Cagliari", "Montréal", "Hamilton", "Yokosuka", "Weihai"]
+SERIES = ["World Triathlon Championship Series", "World Triathlon Cup", "Europe Triathlon Cup", "Continental Cup"]
+PROGRAMS = ["Elite Men", "Elite Women", "U23 Men", "Junior Women"]
+
+@pytest.fixture(scope = "module")
+def race_lookup() -> dict:
+    """ race_id -> (prog_date, race_title, race_handle, race_country, prog_name), some fields missing """
+    rng = np.random.default_rng(0)
+    lookup = {}
+    for race_id in range(500000, 501500):
+        venue = str(rng.choice(VENUES))
+        prog_date = pd.NaT if rng.random() < 0.02 else pd.Timestamp("2005-01-01") + pd.Timedelta(days = int(rng.integers(0, 7000)))
+        year = "" if pd.isna(prog_date) else prog_date.year
+        lookup[race_id] = (
+            prog_date,
+            f"{year} {rng.choice(SERIES)} {venue}" if rng.random() > 0.02 else np.nan,
+            f"{venue} {str(year)[-2:]}".strip(),
+            str(rng.choice(["Japan", "Germany", "Italy", "Canada"])) if rng.random() > 0.05 else np.nan,
+            str(rng.choice(PROGRAMS))
+        )
+    return lookup
+
+@pytest.fixture(scope = "module")
+def race_index(race_lookup) -> RaceIndex:
+    return RaceIndex(race_lookup)
+
+def search_by_scan(race_lookup: dict, query: str, limit: int) -> list:
+    """
+    Every word of the query must start some word of the title, program, country or handle.
+    Newest first (undated last), races whose handle is the query (with or without its year) first
+    """
+    def newest_first(item):
+        prog_date = item[1][0]
+        return pd.Timestamp.min if pd.isna(prog_date) else prog_date
+    query_tokens = tokenize(query)
+    exact, matches = [], []
+    for race_id, (prog_date, race_title, race_handle, race_country, prog_name) in sorted(race_lookup.items(), key = newest_first, reverse = True):
+        words = set()
+        for field in (race_title, prog_name, race_country, race_handle):
+            words.update(tokenize("" if pd.isna(field) else str(field)))
+        if not all(any(word.startswith(token) for word in words) for token in query_tokens):
+            continue
+        handle = " ".join(tokenize(race_handle))
+        is_exact = " ".join(query_tokens) in (handle, YEAR_SUFFIX_PATTERN.sub("", handle))
+        (exact if is_exact else matches).append(race_id)
+    return (exact + matches)[:limit]
+
+@pytest.mark.parametrize("query", [
+    "yokohama", "Yoko", "yokohama 18", "HAMBURG", "cup hamburg", "world cup", "abu dh", "montreal", "MONTRÉAL",
+    "elite men japan", "u23", "2019 cup", "junior women canada", "series weihai 21", "cup-cagliari", "zzz", "", "  "
+])
+def test_search_matches_word_prefix_scan(race_lookup, race_index, query):
+    if not tokenize(query):
+        assert race_index.search(query, 20) == []
+        return
+    for limit in (5, 20, 2000):
+        assert [race["race_id"] for race in race_index.search(query, limit)] == search_by_scan(race_lookup, query, limit), limit
+
+def test_word_prefix_not_substring(race_index):
+    """ Matching changed from substring to word prefix: 'kohama' used to match Yokohama """
+    assert race_index.search("kohama") == []
+    assert race_index.search("burg") == []
+    assert race_index.search("yoko")
+    assert {race["race_handle"].split()[0] for race in race_index.search("yoko", 2000)} == {"Yokohama", "Yokosuka"}
+
+def test_exact_handle_first():
+    lookup = {
+        1: (pd.Timestamp("2024-05-01"), "2024 World Triathlon Cup Yokohama", "Yokohama 24", "Japan", "Elite Men"),
+        2: (pd.Timestamp("2025-05-01"), "2025 Yokohama City Sprint", "Yokohama Sprint 25", "Japan", "Elite Men"),
+        3: (pd.Timestamp("2023-05-01"), "2023 World Triathlon Cup Yokohama", "Yokohama 23", "Japan", "Elite Women")
+    }
+    index = RaceIndex(lookup)
+    assert [race["race_id"] for race in index.search("yokohama")] == [1, 3, 2]
+    assert [race["race_id"] for race in index.search("yokohama 23")] == [3]
+    assert index.search("yokohama", 1)[0] == {
+        "race_id": 1, "race_title": "2024 World Triathlon Cup Yokohama", "prog_name": "Elite Men",
+        "race_country": "Japan", "prog_date": "01 May 2024", "race_handle": "Yokohama 24"
+    }
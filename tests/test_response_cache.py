@@ -0,0 +1,79 @@
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+import pytest
+
+from app.response_cache import cache_response, get_response_cache
+from stats.generation import Generation, pinned_generation, swap_generation
+
+@pytest.fixture
+def client():
+    """ App with an athlete page that counts renders, served through the response cache like app/main.py """
+    generation = Generation("v1")
+    generation.modified = 1_700_000_000.0
+    previous = swap_generation(generation)
+
+    app = FastAPI()
+    app.state.renders = 0
+
+    @app.get("/athlete/{athlete_id}")
+    def athlete(athlete_id: int):
+        app.state.renders += 1
+        response = Response(content = f"<p>Athlete {athlete_id}</p>", media_type = "text/html")
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["X-Robots-Tag"] = "noarchive"
+        response.raw_headers.append((b"link", b"</static/a.css>; rel=preload"))
+        response.raw_headers.append((b"link", b"</static/b.js>; rel=preload"))
+        return response
+
+    app.middleware("http")(cache_response)
+
+    @app.middleware("http")
+    async def pin_data_generation(request, call_next):
+        with pinned_generation():
+            return await call_next(request)
+
+    yield TestClient(app)
+    swap_generation(previous)
+
+def get_replayed_headers(response) -> list:
+    return [(name, value) for name, value in response.headers.items() if name in ("content-type", "vary", "x-robots-tag", "link")]
+
+def test_cached_response_replays_all_headers(client):
+    first = client.get("/athlete/1")
+    second = client.get("/athlete/1")
+    assert client.app.state.renders == 1
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content == b"<p>Athlete 1</p>"
+    assert get_replayed_headers(second) == get_replayed_headers(first)
+    assert second.headers.get_list("link") == ["</static/a.css>; rel=preload", "</static/b.js>; rel=preload"]
+    assert second.headers["content-length"] == str(len(second.content))
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["last-modified"] == "Tue, 14 Nov 2023 22:13:20 GMT"
+
+def test_revalidation_does_not_render(client):
+    etag = client.get("/athlete/1").headers["etag"]
+    get_response_cache().entries.clear()
+
+    response = client.get("/athlete/1", headers = {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert client.app.state.renders == 1
+
+    # Only the page the ETag was issued for
+    assert client.get("/athlete/2", headers = {"If-None-Match": etag}).status_code == 200
+    assert client.app.state.renders == 2
+
+def test_new_generation_changes_etag(client):
+    etag = client.get("/athlete/1").headers["etag"]
+    swap_generation(Generation("v2"))
+    response = client.get("/athlete/1", headers = {"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert client.app.state.renders == 2
+
+def test_unversioned_data_hashes_body(client):
+    swap_generation(Generation(None))
+    etag = client.get("/athlete/1").headers["etag"]
+    assert client.get("/athlete/1", headers = {"If-None-Match": etag}).status_code == 304
+    assert client.get("/athlete/1", headers = {"If-None-Match": '"other"'}).status_code == 200
+    assert client.app.state.renders == 1
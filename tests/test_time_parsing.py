@@ -0,0 +1,83 @@
+from ast import literal_eval
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats.time_parsing import SPLIT_COUNT, splits_to_seconds, time_to_seconds, times_to_seconds
+
+TIME_VALUES = [
+    "01:02:03", "00:00:00", "23:59:59", "99:99:99", # HH:MM:SS, parsed as arrays
+    "1:02:03", "12:34", "45", "00:09:29.5", " 00:10:00", "00:10:00 ", "000:10:00", # Scalar fallback
+    "DNF", "DQ", "LAP", "NC", "None", "", # 0
+    None, np.nan, float("inf"), "nan", "inf", # Missing
+    "xx", "00:0x:00", "00-10-00", "1:2:3:4", "::", "0１:02:03", 3600, 12.5 # Malformed
+]
+
+def random_times(rng: np.random.Generator, n: int) -> list:
+    standard = [f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in rng.integers(0, 60, size = (n, 3))]
+    return [
+        standard[i] if rng.random() < 0.7 else TIME_VALUES[int(rng.integers(len(TIME_VALUES)))]
+        for i in range(n)
+    ]
+
+def assert_same_seconds(actual, expected):
+    np.testing.assert_array_equal(np.asarray(actual, dtype = float), np.asarray(expected, dtype = float))
+
+def test_times_to_seconds_matches_scalar_values():
+    times = pd.Series(TIME_VALUES, dtype = object)
+    assert_same_seconds(times_to_seconds(times), [time_to_seconds(t) for t in TIME_VALUES])
+
+@pytest.mark.parametrize("seed", range(5))
+def test_times_to_seconds_matches_scalar_random(seed):
+    times = pd.Series(random_times(np.random.default_rng(seed), 500), index = np.arange(500) * 3, dtype = object)
+    seconds = times_to_seconds(times)
+    assert seconds.index.equals(times.index)
+    assert_same_seconds(seconds, [time_to_seconds(t) for t in times])
+
+def test_times_to_seconds_examples():
+    seconds = times_to_seconds(pd.Series(["01:02:03", "DNF", None, "xx", "12:34"])).tolist()
+    assert seconds == [3723.0, 0.0, float("inf"), float("inf"), 754.0]
+    assert times_to_seconds(pd.Series([], dtype = object)).empty
+
+def scalar_splits_to_seconds(splits: list) -> np.ndarray:
+    """ literal_eval + time_to_seconds per split, padded with NaN as the old pd.Series expansion did """
+    seconds = np.full((len(splits), SPLIT_COUNT), np.nan)
+    for i, row in enumerate(splits):
+        row = [time_to_seconds(x) for x in literal_eval(row)]
+        seconds[i, :len(row)] = row
+    return seconds
+
+@pytest.mark.parametrize("seed", range(5))
+def test_splits_to_seconds_matches_scalar(seed):
+    rng = np.random.default_rng(seed)
+    splits = []
+    for _ in range(300):
+        kind = rng.random()
+        if kind < 0.1:
+            splits.append("['', '', '', '', '']") # DNF
+        elif kind < 0.15:
+            splits.append("['00:09:29', '00:00:42']") # Short list
+        elif kind < 0.2:
+            splits.append("[None, '00:00:42', '00:26:47', '00:00:36', '00:16:18']")
+        elif kind < 0.25:
+            # Any of the string TIME_VALUES, NaN etc. can't appear in a list literal
+            values = [t for t in TIME_VALUES if isinstance(t, str)]
+            splits.append(str([values[i] for i in rng.integers(len(values), size = SPLIT_COUNT)]))
+        elif kind < 0.3:
+            splits.append('["00:09:29", "00:00:42", "00:26:47", "00:00:36", "00:16:18"]') # Other quotes
+        else:
+            splits.append(str([f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in rng.integers(0, 60, size = (SPLIT_COUNT, 3))]))
+
+    seconds = splits_to_seconds(pd.Series(splits))
+    assert list(seconds.columns) == list(range(SPLIT_COUNT))
+    assert_same_seconds(seconds.to_numpy(), scalar_splits_to_seconds(splits))
+
+@pytest.mark.parametrize("splits", [
+    ["['00:09:29', '00:00:42', '00:26:47', '00:00:36', '00:16:18', '00:00:01']"], # Too many
+    ["[00:09:29]"], # Not a list literal
+    ["['00:09:29', "] # Truncated
+])
+def test_splits_to_seconds_malformed_lists_raise(splits):
+    with pytest.raises((ValueError, SyntaxError)):
+        splits_to_seconds(pd.Series(splits))